@@ -0,0 +1,66 @@
+import time
+
+
+class AccountSnapshot:
+    """
+    Point-in-time view of the USDT-settled linear account, fetched once per cycle.
+
+    Indexes active positions, resting orders and leverage by Bybit symbol ('SOLUSDT') and
+    carries the free USDT margin, so per-order exposure checks and sizing need no extra
+    calls. Accepts OKX style ids ('SOL-USDT') in every lookup.
+    """
+
+    def __init__(self, positions, orders, free_margin):
+        self.positions = {}  # symbol -> [active position dicts]
+        self.orders = {}     # symbol -> [open order dicts]
+        self.leverage = {}   # symbol -> leverage string as reported by the exchange
+        self.free_margin = free_margin  # float USDT, or None if the wallet could not be read
+        self.fetched_at = time.time()
+
+        for pos in positions:
+            symbol = pos.get("symbol")
+            if pos.get("leverage"):
+                self.leverage[symbol] = pos["leverage"]
+            if float(pos.get("size", 0) or 0) > 0:
+                self.positions.setdefault(symbol, []).append(pos)
+        for order in orders:
+            self.orders.setdefault(order.get("symbol"), []).append(order)
+
+    @classmethod
+    def from_stream(cls, stream):
+        """ Builds a snapshot from a fresh BybitPrivateStream without any REST call. """
+        return cls(stream.get_positions(), stream.get_open_orders(), stream.get_available_balance("USDT"))
+
+    @staticmethod
+    def _symbol(instrument_id):
+        return instrument_id.replace("-", "").upper() if instrument_id else None
+
+    def has_open_position(self, instrument_id):
+        return bool(self.positions.get(self._symbol(instrument_id)))
+
+    def has_open_order(self, instrument_id):
+        return bool(self.orders.get(self._symbol(instrument_id)))
+
+    def position_side(self, instrument_id):
+        """ 'Buy' or 'Sell' for the symbol's active position, or None when it is flat. """
+        positions = self.positions.get(self._symbol(instrument_id))
+        return positions[0].get("side") if positions else None
+
+    def has_exposure(self, instrument_id):
+        """ True if the symbol has an active position or a resting order. """
+        return self.has_open_position(instrument_id) or self.has_open_order(instrument_id)
+
+    def get_leverage(self, instrument_id):
+        """ Leverage currently set on the symbol as a float, or None if unknown. """
+        value = self.leverage.get(self._symbol(instrument_id))
+        try:
+            return float(value) if value not in (None, "") else None
+        except (TypeError, ValueError):
+            return None
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def __repr__(self):
+        return (f"AccountSnapshot(positions={sum(len(v) for v in self.positions.values())}, "
+                f"orders={sum(len(v) for v in self.orders.values())}, free_margin={self.free_margin})")
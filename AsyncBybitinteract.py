@@ -0,0 +1,426 @@
+import asyncio
+import threading
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from Bybitinteract import BybitTraderBase
+from AccountSnapshot import AccountSnapshot
+from RetryPolicy import call_with_retry_async
+from bybit_config import (
+    BYBIT_API_KEY, BYBIT_SECRET_KEY, BYBIT_IS_DEMO,
+    HTTP_TIMEOUT, BYBIT_POOL_SIZE, BYBIT_HTTP_RETRIES, BYBIT_HTTP_DEADLINE,
+)
+
+# Network errors, timeouts and bad JSON are retried like the sync client's requests errors.
+ASYNC_RETRYABLE_EXCEPTIONS = (aiohttp.ClientError, asyncio.TimeoutError, ValueError) if aiohttp else (ValueError,)
+
+
+class AsyncBybitTrader(BybitTraderBase):
+    """
+    asyncio twin of BybitTrader with the same method surface (every call is awaitable).
+
+    Signing, quantization, validation and result shapes come from BybitTraderBase, so the
+    sync and async clients behave identically; only the transport differs (aiohttp).
+    Calls for different symbols can run concurrently with asyncio.gather.
+
+    Use as an async context manager so the connection pool is closed with the event loop:
+        async with AsyncBybitTrader.from_trader(trader) as client:
+            await asyncio.gather(client.has_open_position('SOL-USDT'), ...)
+    """
+
+    def __init__(self, api_key, secret_key, is_demo=True):
+        if aiohttp is None:
+            raise RuntimeError("'aiohttp' is not installed; AsyncBybitTrader is unavailable.")
+        super().__init__(api_key, secret_key, is_demo)
+        self._session = None
+
+    @classmethod
+    def from_trader(cls, trader):
+        """ Builds an async client sharing a sync trader's keys, clock, caches, limiter and private stream. """
+        client = cls(trader.api_key, trader.secret_key, is_demo=trader.is_demo)
+        client.base_url = trader.base_url
+        client._filters_cache = trader._filters_cache
+        client.stream = trader.stream
+        client.rate_limiter = trader.rate_limiter
+        client._leverage_cache = trader._leverage_cache
+        client.clock = trader.clock
+        return client
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self):
+        # Created lazily so it binds to the running event loop.
+        if self._session is None or self._session.closed:
+            connect_timeout, read_timeout = HTTP_TIMEOUT
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=BYBIT_POOL_SIZE),
+                timeout=aiohttp.ClientTimeout(connect=connect_timeout, sock_read=read_timeout),
+            )
+        return self._session
+
+    async def close(self):
+        """ Closes the aiohttp session and its keep-alive connections. """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def sync_clock(self):
+        """ Measures the offset between the local clock and Bybit's server time. Returns True on success. """
+        try:
+            sent_at = time.time()
+            async with self._get_session().get(self.base_url + "/v5/market/time") as response:
+                result = await response.json(content_type=None)
+            received_at = time.time()
+            ok = self._apply_server_time(result, sent_at, received_at)
+            error = None if ok else "unexpected response"
+        except Exception as e:
+            ok, error = False, e
+        self._report_clock_sync(ok, error)
+        return ok
+
+    async def _request(self, method, endpoint, params=None, _retry=True):
+        """ Handles authentication and sends request to Bybit V5 API """
+        if self._clock_sync_due(endpoint):
+            await self.sync_clock()
+
+        delay = self._throttle_delay(method, endpoint)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        async def send(timeout):
+            # Sign per attempt (after any throttle wait) so the timestamp is fresh.
+            url, headers, body = self._sign_request(method, endpoint, params)
+            self._request_count += 1
+            session = self._get_session()
+            request_timeout = aiohttp.ClientTimeout(total=timeout, connect=min(HTTP_TIMEOUT[0], timeout),
+                                                    sock_read=min(HTTP_TIMEOUT[1], timeout))
+            if method == "GET":
+                request = session.get(url, headers=headers, timeout=request_timeout)
+            else:
+                request = session.post(url, headers=headers, data=body, timeout=request_timeout)
+            async with request as response:
+                return response.status, response.headers, await response.json(content_type=None)
+
+        try:
+            # Same policy as BybitTrader._request: shared 'bybit' breaker, one deadline,
+            # and only reads are retried; an order POST is sent at most once.
+            _, response_headers, result = await call_with_retry_async(
+                "bybit", send, BYBIT_HTTP_DEADLINE, attempts=BYBIT_HTTP_RETRIES + 1 if method == "GET" else 1,
+                retry_result=lambda r: r[0] >= 500, retryable=ASYNC_RETRYABLE_EXCEPTIONS)
+            self.rate_limiter.update_from_headers(endpoint, response_headers)
+        except Exception as e:
+            return self._request_error(e)
+
+        if _retry:
+            wait = self._retry_delay_after(endpoint, result, response_headers)
+            if wait is not None:
+                return await self._request(method, endpoint, params, _retry=False)
+        return result
+
+    async def _request_all_pages(self, endpoint, params, limit):
+        """
+        GETs every page of a cursor-paginated V5 list endpoint.
+        Returns (items, last_result); items is None if any page fails.
+        """
+        items = []
+        params = dict(params, limit=limit)
+        while True:
+            result = await self._request("GET", endpoint, params)
+            if str(result.get("retCode")) != "0":
+                return None, result
+            page = result.get("result", {})
+            items.extend(page.get("list", []))
+            cursor = page.get("nextPageCursor")
+            if not cursor or not page.get("list"):
+                return items, result
+            params["cursor"] = cursor
+
+    async def _set_trading_stop(self, symbol, stop_loss_price_str):
+        params = self._trading_stop_params(symbol, stop_loss_price_str)
+        result = await self._request("POST", "/v5/position/trading-stop", params)
+        self._report_trading_stop(result, stop_loss_price_str)
+
+    async def update_stop_loss_to_breakeven(self, instrument_id, atr_value):
+        """ Async version of BybitTrader.update_stop_loss_to_breakeven. """
+        symbol = self._format_symbol(instrument_id)
+        stream = self._fresh_stream()
+        if stream is not None and not stream.has_open_position(symbol):
+            return
+
+        result = await self._request("GET", "/v5/position/list",
+                                     {"category": "linear", "symbol": symbol, "settleCoin": "USDT"})
+        for avg_price_str in self._breakeven_targets(symbol, result, atr_value):
+            await self._set_trading_stop(symbol, avg_price_str)
+
+    async def get_instrument_filters(self, instrument_id):
+        """ Cached per-symbol filters (shared with the sync trader when built via from_trader). """
+        symbol = self._format_symbol(instrument_id)
+        if not symbol:
+            return None
+        if symbol in self._filters_cache:
+            return self._filters_cache[symbol]
+
+        result = await self._request(
+            "GET", "/v5/market/instruments-info",
+            {"category": "linear", "symbol": symbol},
+        )
+        return self._filters_from_result(symbol, result)
+
+    async def round_qty(self, instrument_id, raw_qty):
+        filters = await self.get_instrument_filters(instrument_id)
+        if not filters:
+            return None
+        return self._quantize_down(raw_qty, filters["qtyStep"])
+
+    async def round_price(self, instrument_id, raw_price):
+        filters = await self.get_instrument_filters(instrument_id)
+        if not filters:
+            return None
+        return self._quantize_nearest(raw_price, filters["tickSize"])
+
+    async def set_leverage(self, instrument_id, leverage, force=False):
+        symbol = self._format_symbol(instrument_id)
+        if not force and self._leverage_is_set(symbol, leverage):
+            return True
+        result = await self._request("POST", "/v5/position/set-leverage", self._leverage_params(symbol, leverage))
+        return self._apply_leverage_result(symbol, leverage, result)
+
+    async def has_open_position(self, instrument_id):
+        symbol = self._format_symbol(instrument_id)
+        stream = self._fresh_stream()
+        if stream is not None:
+            return stream.has_open_position(symbol)
+        result = await self._request(
+            "GET", "/v5/position/list",
+            {"category": "linear", "symbol": symbol, "settleCoin": "USDT"},
+        )
+        return self._position_exists(symbol, result)
+
+    async def has_open_order(self, instrument_id):
+        symbol = self._format_symbol(instrument_id)
+        stream = self._fresh_stream()
+        if stream is not None:
+            return stream.has_open_order(symbol)
+        result = await self._request(
+            "GET", "/v5/order/realtime",
+            {"category": "linear", "symbol": symbol},
+        )
+        return self._order_exists(symbol, result)
+
+    async def _prepare_limit_order(self, instrument_id, side, size, price, take_profit_price, stop_loss_price):
+        filters = await self.get_instrument_filters(instrument_id)
+        return self._build_limit_order(
+            filters, instrument_id, side, size, price, take_profit_price, stop_loss_price)
+
+    async def place_limit_order_with_tp_sl(self, instrument_id, side, size, price, take_profit_price, stop_loss_price):
+        """ Async version of BybitTrader.place_limit_order_with_tp_sl (same result dict). """
+        params, error = await self._prepare_limit_order(
+            instrument_id, side, size, price, take_profit_price, stop_loss_price)
+        if error is not None:
+            return error
+
+        self._announce_order(side, params)
+        result = await self._request("POST", "/v5/order/create", params)
+        return self._order_create_result(params, result)
+
+    async def place_limit_orders_batch(self, orders):
+        """ Async version of BybitTrader.place_limit_orders_batch (one result per input order). """
+        results = [None] * len(orders)
+        prepared = await asyncio.gather(*(self._prepare_limit_order(**order) for order in orders))
+        pending = []  # (input index, params)
+        for i, (params, error) in enumerate(prepared):
+            if error is not None:
+                results[i] = error
+            else:
+                pending.append((i, params))
+
+        for chunk, batch_params in self._batch_chunks(pending):
+            result = await self._request("POST", "/v5/order/create-batch", batch_params)
+            unresolved = self._apply_batch_result(chunk, result, results)
+            lookups = await asyncio.gather(*(
+                self._request("GET", "/v5/order/realtime", self._reconcile_params(params))
+                for _, params in unresolved))
+            for (i, params), lookup in zip(unresolved, lookups):
+                results[i] = self._reconciled_order_result(params, lookup)
+
+        return results
+
+    async def cancel_order(self, instrument_id, order_id):
+        symbol = self._format_symbol(instrument_id)
+        print(f"\n-> Attempting to cancel ID: {order_id} for {symbol}...")
+        result = await self._request("POST", "/v5/order/cancel",
+                                     {"category": "linear", "symbol": symbol, "orderId": order_id})
+        return self._cancel_result_message(order_id, result)
+
+    async def get_open_orders(self, instrument_id=None):
+        symbol = self._format_symbol(instrument_id)
+        print(f"\n-> Requesting open orders{' for ' + symbol if symbol else ''}...")
+        params = {"category": "linear"}
+        if symbol:
+            params["symbol"] = symbol
+        result = await self._request("GET", "/v5/order/realtime", params)
+        return self._format_open_orders(result)
+
+    async def get_open_positions(self, instrument_id=None):
+        symbol = self._format_symbol(instrument_id)
+        print(f"\n-> Requesting open positions{' for ' + symbol if symbol else ''}...")
+        params = {"category": "linear", "settleCoin": "USDT"}
+        if symbol:
+            params["symbol"] = symbol
+        result = await self._request("GET", "/v5/position/list", params)
+        if str(result.get("retCode")) == "0":
+            self._remember_leverage(result.get("result", {}).get("list", []))
+        return self._format_open_positions(result)
+
+    async def get_available_balance(self, coin_pair):
+        """ Async version of BybitTrader.get_available_balance (None when undeterminable). """
+        try:
+            if not coin_pair or coin_pair.lower() == "null":
+                return 0.0
+
+            quote_currency = self._quote_currency(coin_pair)
+
+            stream = self._fresh_stream()
+            if stream is not None:
+                cached = stream.get_available_balance(quote_currency)
+                if cached is not None:
+                    return cached
+
+            print(f"\n-> Fetching balance for {quote_currency}...")
+            params = {"accountType": "UNIFIED", "coin": quote_currency}
+            result = await self._request("GET", "/v5/account/wallet-balance", params)
+            if str(result.get("retCode")) != "0":
+                params["accountType"] = "CONTRACT"
+                result = await self._request("GET", "/v5/account/wallet-balance", params)
+
+            return self._balance_from_result(result, quote_currency)
+
+        except Exception as e:
+            print(f"Exception inside get_available_balance: {e}")
+            return None
+
+    async def get_account_snapshot(self):
+        """ Async version of BybitTrader.get_account_snapshot; the three reads run concurrently. """
+        stream = self._fresh_stream()
+        if stream is not None:
+            return AccountSnapshot.from_stream(stream)
+
+        (positions, pos_result), (orders, order_result), free_margin = await asyncio.gather(
+            self._request_all_pages("/v5/position/list", {"category": "linear", "settleCoin": "USDT"}, limit=200),
+            self._request_all_pages("/v5/order/realtime", {"category": "linear", "settleCoin": "USDT"}, limit=50),
+            self.get_available_balance('USDT'),
+        )
+        if positions is None:
+            print(f"   ⚠️ [Bybit] Could not fetch positions for snapshot: {pos_result.get('retMsg')}")
+            return None
+        self._remember_leverage(positions)
+        if orders is None:
+            print(f"   ⚠️ [Bybit] Could not fetch open orders for snapshot: {order_result.get('retMsg')}")
+            return None
+        return AccountSnapshot(positions, orders, free_margin)
+
+    async def close_all_orders_and_positions(self):
+        """ Cancels all open orders, then closes every active position concurrently. """
+        print("\n🚨 Initiating full closure of all open orders and positions on Bybit...")
+
+        print("\n-> Step 1: Canceling all open orders...")
+        cancel_result = await self._request("POST", "/v5/order/cancel-all", {"category": "linear", "settleCoin": "USDT"})
+        if str(cancel_result.get("retCode")) == "0":
+            print("   ✅ All open orders canceled successfully.")
+        else:
+            print(f"   ❌ Error canceling orders: {cancel_result.get('retMsg')}")
+
+        await asyncio.sleep(1)
+
+        print("\n-> Step 2: Closing all open positions...")
+        pos_result = await self._request("GET", "/v5/position/list", {"category": "linear", "settleCoin": "USDT"})
+        if str(pos_result.get("retCode")) != "0":
+            print(f"   ❌ Error fetching positions to close: {pos_result.get('retMsg')}")
+            return
+
+        positions = pos_result.get("result", {}).get("list", [])
+        active_positions = [p for p in positions if float(p.get("size", 0)) > 0]
+        if not active_positions:
+            print("   ✅ No active positions to close.")
+            return
+
+        async def _close(pos):
+            symbol = pos.get('symbol')
+            print(f"   - Closing {pos.get('size')} {symbol} ({pos.get('side')} position)...")
+            close_req = await self._request("POST", "/v5/order/create", self._close_position_params(pos))
+            if str(close_req.get("retCode")) == "0":
+                print(f"   ✅ Successfully closed {symbol}.")
+            else:
+                print(f"   ❌ Failed to close {symbol}: {close_req.get('retMsg')}")
+
+        await asyncio.gather(*(_close(pos) for pos in active_positions))
+
+
+
+class AsyncTraderLoop:
+    """
+    One long-lived event loop (in a daemon thread) holding one AsyncBybitTrader built from a
+    sync trader. Sync code fans out per-symbol calls through run() with asyncio.gather, and
+    the aiohttp session with its keep-alive connections lives across cycles instead of
+    being rebuilt (new TCP+TLS handshakes) by every asyncio.run.
+
+        loop = AsyncTraderLoop(trader)
+        exposed = loop.run(lambda client: asyncio.gather(*(client.has_open_order(s) for s in symbols)))
+    """
+
+    def __init__(self, trader):
+        self.trader = trader
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._client = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is None:
+                self._client = AsyncBybitTrader.from_trader(self.trader)
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+                self._thread.start()
+            # The private stream may have been started after the client was built.
+            self._client.stream = self.trader.stream
+
+    def run(self, fn, timeout=60):
+        """ Runs fn(client) (returning an awaitable) on the shared loop and returns its result. """
+        self._ensure_started()
+        async def _call():
+            return await fn(self._client)
+        return asyncio.run_coroutine_threadsafe(_call(), self._loop).result(timeout)
+
+    def close(self):
+        """ Closes the client's session and stops the loop thread. """
+        with self._lock:
+            loop, client, thread = self._loop, self._client, self._thread
+            self._loop = self._client = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(client.close(), loop).result(5)
+        finally:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(5)
+            loop.close()
+
+
+# --- USAGE EXAMPLE / TEST ---
+if __name__ == "__main__":
+    async def _demo():
+        async with AsyncBybitTrader(BYBIT_API_KEY, BYBIT_SECRET_KEY, is_demo=BYBIT_IS_DEMO) as client:
+            symbols = ['SOL-USDT', 'BTC-USDT', 'ETH-USDT']
+            exposure = await asyncio.gather(*(client.has_open_position(s) for s in symbols))
+            print(dict(zip(symbols, exposure)))
+            print(await client.get_available_balance('USDT'))
+
+    asyncio.run(_demo())
@@ -0,0 +1,302 @@
+"""
+Offline backtest of the HInfoSend strategy on archived candles.
+
+Features and the Python guardrails are computed for the whole history at once
+(IndicatorKernels + SignalRules.signal_masks). Only the decision step runs per bar, and only
+on bars where the symbol is flat and the guardrails allow a trade. Everywhere else any LLM
+answer would be forced to WAIT. Entries are limit orders at the ParseFuncLLM multipliers with
+ATR-based SL/TP. Fills and exits are found by scanning the bar arrays, including the live
+breakeven rule (SL moved to entry after 1.5 ATR of profit).
+
+    python Backtest.py SOL-USDT BTC-USDT --bar 15m --days 365
+    python Backtest.py --synthetic 20 --synthetic-days 1095
+    python Backtest.py SOL-USDT --decisions data/decisions.jsonl
+"""
+import argparse
+import json
+import re
+import time
+
+import numpy as np
+
+from Config import (
+    SL_MULTIPLIER, TP_MULTIPLIER, LONG_ENTRY_MULTIPLIER, SHORT_ENTRY_MULTIPLIER,
+    BACKTEST_MAKER_FEE, BACKTEST_TAKER_FEE,
+)
+from bybit_config import LEVERAGE, RISK_FRACTION, MAX_MARGIN_FRACTION
+from IndicatorKernels import compute_indicators, INDICATOR_COLUMNS
+from SignalRules import signal_masks
+
+BREAKEVEN_ATR = 1.5  # BybitTraderBase._breakeven_targets threshold
+FEATURE_KEYS = ('timestamp', 'close', 'volume') + tuple(INDICATOR_COLUMNS)
+
+
+def prepare_features(columns):
+    """
+    Bulk features for a whole history. `columns` holds oldest-first arrays timestamp, open,
+    high, low, close, volume (e.g. CandleArchive.range()). Adds the indicator arrays, the
+    guardrail masks 'buy'/'sell' and 'valid' (indicators warmed up).
+    """
+    data = {name: np.asarray(values) for name, values in columns.items()}
+    data.update(compute_indicators(data['high'], data['low'], data['close'], data['volume']))
+    data['valid'] = np.logical_and.reduce([np.isfinite(data[c]) for c in INDICATOR_COLUMNS])
+    data.update(signal_masks(data))
+    return data
+
+
+def rules_policy(instId, ts, features):
+    """ Stub LLM that always takes the trade the guardrails allow. """
+    return 'BUY' if features['close'] > features['EMA_50'] else 'SELL'
+
+
+def wait_policy(instId, ts, features):
+    """ Stub LLM that never trades (baseline / timing of the decision loop). """
+    return 'WAIT'
+
+
+def _parse_action(answer):
+    """ The action of an LLM answer, extracted like ParseFuncLLM.parse_and_execute_commands. """
+    match = re.search(r'\{.*\}', answer or '', re.DOTALL)
+    if not match:
+        return 'WAIT'
+    try:
+        return str(json.loads(match.group(0)).get('action', 'WAIT')).upper()
+    except (ValueError, AttributeError):
+        return 'WAIT'
+
+
+class RecordedDecisions:
+    """
+    Replays decisions logged by algomain (DECISION_LOG_ENABLED -> data/decisions.jsonl):
+    the action recorded for (instId, candle timestamp), WAIT for bars without a record.
+    """
+
+    def __init__(self, path):
+        self.actions = {}
+        with open(path, 'r') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                self.actions[(record['instId'], int(record['ts']))] = _parse_action(record.get('answer'))
+
+    def __call__(self, instId, ts, features):
+        return self.actions.get((instId, int(ts)), 'WAIT')
+
+
+def _first_true(test, start, stop, chunk=64):
+    """
+    First index in [start, stop) where test(lo, hi) -- a bool array for that slice -- is True,
+    or None. Scans in doubling chunks so short trades only touch a few bars.
+    """
+    lo = start
+    while lo < stop:
+        hi = min(stop, lo + chunk)
+        hits = test(lo, hi)
+        if hits.any():
+            return lo + int(hits.argmax())
+        lo, chunk = hi, chunk * 2
+    return None
+
+
+def _exit(side, entry, sl, tp, fill, data, breakeven):
+    """ (exit bar, exit price, reason) of a position filled at bar `fill`. """
+    o, h, l, c, atr = data['open'], data['high'], data['low'], data['close'], data['ATR']
+    n = len(c)
+
+    # On the fill bar the order of the intrabar moves is unknown: only the stop counts.
+    if (l[fill] <= sl) if side > 0 else (h[fill] >= sl):
+        return fill, sl, 'sl'
+
+    start, armed = fill + 1, breakeven
+    while start < n:
+        if side > 0:
+            def test(lo, hi, sl=sl, armed=armed):
+                hits = (l[lo:hi] <= sl) | (h[lo:hi] >= tp)
+                if armed:
+                    hits |= (c[lo:hi] - entry) >= BREAKEVEN_ATR * atr[lo:hi]
+                return hits
+        else:
+            def test(lo, hi, sl=sl, armed=armed):
+                hits = (h[lo:hi] >= sl) | (l[lo:hi] <= tp)
+                if armed:
+                    hits |= (entry - c[lo:hi]) >= BREAKEVEN_ATR * atr[lo:hi]
+                return hits
+
+        e = _first_true(test, start, n)
+        if e is None:
+            break
+        # A bar touching both levels is counted as a stop (conservative).
+        if (l[e] <= sl) if side > 0 else (h[e] >= sl):
+            price = min(sl, o[e]) if side > 0 else max(sl, o[e])  # gaps through the stop fill at the open
+            return e, price, 'breakeven' if sl == entry else 'sl'
+        if (h[e] >= tp) if side > 0 else (l[e] <= tp):
+            return e, (max(tp, o[e]) if side > 0 else min(tp, o[e])), 'tp'
+        # Breakeven: the live bot moves the SL to the entry price from the next cycle on.
+        sl, armed, start = entry, False, e + 1
+    return n - 1, c[n - 1], 'open'
+
+
+def simulate(instId, data, decide=rules_policy, order_ttl_bars=None, breakeven=True,
+             maker_fee=BACKTEST_MAKER_FEE, taker_fee=BACKTEST_TAKER_FEE):
+    """
+    Runs the strategy over prepare_features() output for one symbol. `decide(instId, ts,
+    features)` plays the LLM and returns BUY/SELL/WAIT; the guardrails override it like in
+    HInfoSend. Decisions are made at bar close, the limit order rests from the next bar and,
+    as live, is never cancelled unless `order_ttl_bars` is set.
+    Returns {'instId', 'bars', 'decisions', 'unfilled', 'trades'}.
+    """
+    ts, o, h, l, c, atr = (data[k] for k in ('timestamp', 'open', 'high', 'low', 'close', 'ATR'))
+    buy, sell = data['buy'], data['sell']
+    n = len(c)
+    candidates = np.flatnonzero(data['valid'] & (buy | sell))
+
+    trades, decisions, unfilled, t = [], 0, 0, 0
+    while True:
+        k = int(np.searchsorted(candidates, t))
+        if k >= len(candidates):
+            break
+        i = int(candidates[k])
+        features = {key: data[key][i].item() for key in FEATURE_KEYS}
+        action = decide(instId, features['timestamp'], features)
+        decisions += 1
+        if not ((action == 'BUY' and buy[i]) or (action == 'SELL' and sell[i])):
+            t = i + 1
+            continue
+
+        side = 1 if action == 'BUY' else -1
+        if side > 0:
+            entry = c[i] * LONG_ENTRY_MULTIPLIER
+            sl, tp = entry - atr[i] * SL_MULTIPLIER, entry + atr[i] * TP_MULTIPLIER
+            fill = _first_true(lambda lo, hi: l[lo:hi] <= entry, i + 1,
+                               n if order_ttl_bars is None else min(n, i + 1 + order_ttl_bars))
+        else:
+            entry = c[i] * SHORT_ENTRY_MULTIPLIER
+            sl, tp = entry + atr[i] * SL_MULTIPLIER, entry - atr[i] * TP_MULTIPLIER
+            fill = _first_true(lambda lo, hi: h[lo:hi] >= entry, i + 1,
+                               n if order_ttl_bars is None else min(n, i + 1 + order_ttl_bars))
+        if fill is None:
+            unfilled += 1
+            if order_ttl_bars is None:
+                break  # the resting order blocks the symbol for the rest of the data
+            t = i + 1 + order_ttl_bars
+            continue
+
+        fill_price = min(entry, o[fill]) if side > 0 else max(entry, o[fill])
+        exit_bar, exit_price, reason = _exit(side, entry, sl, tp, fill, data, breakeven)
+        gross = side * (exit_price - fill_price) / fill_price
+        fees = maker_fee + (taker_fee * exit_price / fill_price if reason != 'open' else 0.0)
+        trades.append({
+            "side": action, "signal_ts": int(ts[i]), "entry_ts": int(ts[fill]), "exit_ts": int(ts[exit_bar]),
+            "entry": float(fill_price), "sl": float(sl), "tp": float(tp), "exit": float(exit_price),
+            "reason": reason, "net": float(gross - fees),
+        })
+        if reason == 'open':
+            break
+        t = exit_bar
+    return {"instId": instId, "bars": n, "decisions": decisions, "unfilled": unfilled, "trades": trades}
+
+
+def summarize(result):
+    """ Trade statistics; equity compounds each trade at the live margin fraction and leverage. """
+    closed = [t for t in result["trades"] if t["reason"] != 'open']
+    rets = np.array([t["net"] for t in closed], dtype=np.float64)
+    summary = {"instId": result["instId"], "bars": result["bars"], "decisions": result["decisions"],
+               "trades": len(closed), "unfilled": result["unfilled"],
+               "win_rate": 0.0, "return_pct": 0.0, "max_dd_pct": 0.0, "profit_factor": 0.0}
+    if not len(rets):
+        return summary
+    exposure = min(RISK_FRACTION, MAX_MARGIN_FRACTION) * LEVERAGE
+    equity = np.cumprod(1 + rets * exposure)
+    drawdown = 1 - equity / np.maximum.accumulate(np.r_[1.0, equity])[1:]
+    losses = -rets[rets < 0].sum()
+    summary.update({
+        "win_rate": float((rets > 0).mean() * 100),
+        "return_pct": float((equity[-1] - 1) * 100),
+        "max_dd_pct": float(drawdown.max() * 100),
+        "profit_factor": float(rets[rets > 0].sum() / losses) if losses > 0 else float('inf'),
+    })
+    return summary
+
+
+def run_backtest(histories, decide=rules_policy, **kwargs):
+    """
+    Backtests every {instId: columns} history and prints one line per symbol.
+    Extra keyword arguments go to simulate(). Returns {instId: summary}.
+    """
+    summaries = {}
+    started = time.perf_counter()
+    total_bars = 0
+    print(f"{'symbol':<14}{'bars':>9}{'decisions':>10}{'trades':>8}{'unfilled':>9}{'win %':>8}"
+          f"{'return %':>10}{'max DD %':>10}{'PF':>7}")
+    for instId, columns in histories.items():
+        summary = summaries[instId] = summarize(simulate(instId, prepare_features(columns), decide, **kwargs))
+        total_bars += summary["bars"]
+        print(f"{instId:<14}{summary['bars']:>9}{summary['decisions']:>10}{summary['trades']:>8}"
+              f"{summary['unfilled']:>9}{summary['win_rate']:>8.1f}{summary['return_pct']:>10.1f}{summary['max_dd_pct']:>10.1f}"
+              f"{summary['profit_factor']:>7.2f}")
+    elapsed = time.perf_counter() - started
+    print(f"\n⏱️ {len(histories)} symbols, {total_bars:,} bars in {elapsed:.2f}s")
+    return summaries
+
+
+def load_history(instId, bar='15m', start_ts=None, end_ts=None):
+    """
+    Columns of the archived `bar` candles, or of the 1m archive resampled to `bar` when the
+    bar itself was never archived (an incomplete trailing bar is dropped).
+    """
+    from CandleArchive import get_candle_archive
+    from CandleStore import BAR_MS, resample
+
+    archive = get_candle_archive(instId, bar)
+    if len(archive) or bar == '1m' or bar not in BAR_MS:
+        return archive.range(start_ts, end_ts)
+
+    minutes = get_candle_archive(instId, '1m').rows(start_ts, end_ts)
+    rows = resample(minutes, BAR_MS[bar])
+    if len(rows) and minutes[-1, 0] < rows[-1, 0] + BAR_MS[bar] - BAR_MS['1m']:
+        rows = rows[:-1]
+    return {'timestamp': rows[:, 0].astype(np.int64), 'open': rows[:, 1], 'high': rows[:, 2],
+            'low': rows[:, 3], 'close': rows[:, 4], 'volume': rows[:, 5]}
+
+
+def synthetic_history(bars, bar_ms=900_000, seed=0):
+    """ Random-walk candles with drifting trend regimes, for timing runs without an archive. """
+    rng = np.random.default_rng(seed)
+    drift = np.repeat(rng.normal(0, 0.0006, bars // 500 + 1), 500)[:bars]
+    close = 100 * np.exp(np.cumsum(drift + rng.normal(0, 0.004, bars)))
+    open_ = np.r_[100.0, close[:-1]]
+    spread = np.abs(rng.normal(0, 0.002, (2, bars)))
+    return {'timestamp': 1_600_000_000_000 // bar_ms * bar_ms + np.arange(bars, dtype=np.int64) * bar_ms,
+            'open': open_, 'high': np.maximum(open_, close) * (1 + spread[0]),
+            'low': np.minimum(open_, close) * (1 - spread[1]), 'close': close,
+            'volume': rng.lognormal(7, 0.5, bars)}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Vectorized backtest of the HInfoSend strategy")
+    parser.add_argument("symbols", nargs="*", help="archived instruments, e.g. SOL-USDT")
+    parser.add_argument("--bar", default="15m")
+    parser.add_argument("--days", type=float, default=None, help="only the last N days of the archive")
+    parser.add_argument("--synthetic", type=int, default=0, help="N synthetic symbols instead of the archive")
+    parser.add_argument("--synthetic-days", type=float, default=365)
+    parser.add_argument("--decisions", help="decisions.jsonl to replay instead of the rules stub")
+    parser.add_argument("--policy", choices=("rules", "wait"), default="rules")
+    parser.add_argument("--order-ttl", type=int, default=None, help="cancel unfilled entries after N bars")
+    parser.add_argument("--no-breakeven", action="store_true")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        from CandleStore import BAR_MS
+        bars = int(args.synthetic_days * 86_400_000 // BAR_MS[args.bar])
+        histories = {f"SYN{i}-USDT": synthetic_history(bars, BAR_MS[args.bar], seed=i)
+                     for i in range(args.synthetic)}
+    else:
+        start = int((time.time() - args.days * 86400) * 1000) if args.days else None
+        histories = {s: load_history(s, args.bar, start_ts=start) for s in args.symbols}
+
+    if args.decisions:
+        policy = RecordedDecisions(args.decisions)
+    else:
+        policy = rules_policy if args.policy == "rules" else wait_policy
+    run_backtest(histories, policy, order_ttl_bars=args.order_ttl, breakeven=not args.no_breakeven)
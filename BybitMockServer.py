@@ -0,0 +1,417 @@
+import hmac
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Instruments served by default: symbol -> (tickSize, qtyStep, minOrderQty, maxOrderQty, minNotionalValue, mark price)
+DEFAULT_INSTRUMENTS = {
+    "BTCUSDT": ("0.10", "0.001", "0.001", "1190", "5", 65000.0),
+    "ETHUSDT": ("0.01", "0.01", "0.01", "7240", "5", 3200.0),
+    "SOLUSDT": ("0.010", "0.1", "0.1", "79770", "5", 150.0),
+    "XRPUSDT": ("0.0001", "1", "1", "5180000", "5", 0.55),
+}
+
+
+class BybitMockServer:
+    """
+    Local stand-in for the Bybit V5 REST endpoints BybitTrader uses, for load tests and
+    benchmarks without touching testnet. Market endpoints (time, instruments, kline,
+    tickers) are public; kline serves deterministic synthetic candles around the mark price.
+
+    Keeps positions, resting orders and leverage in memory; new limit orders rest on the
+    book (they never fill). Every request can be delayed by `latency` (+ up to `jitter`)
+    seconds, failed with probability `error_rate` (returning `error_code`), or failed
+    deterministically through inject_error(). Signatures and timestamps are checked when
+    a `secret` is given. HTTP/1.1 keep-alive is supported so connection reuse shows up.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0,
+                 error_code=10006, secret=None, clock_skew_ms=0, balance=1000.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.secret = secret
+        self.clock_skew_ms = clock_skew_ms  # server clock = local clock + skew
+        self.initial_balance = balance
+
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._injected = {}   # endpoint -> [(retCode, retMsg), ...] returned by the next calls
+        self._counts = {}     # endpoint -> requests served
+        self.instruments = dict(DEFAULT_INSTRUMENTS)
+        self.reset_state()
+
+        server = self
+        class _Handler(_MockHandler):
+            mock = server
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """ Serves in a daemon thread. Returns the base URL to point a trader at. """
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    # --- Test controls ---
+
+    def reset_state(self, keep_leverage=False):
+        """ Clears positions and orders (and leverage unless kept) and restores the starting balance. """
+        with self._lock:
+            self.positions = {}  # symbol -> position dict
+            self.orders = {}     # orderId -> order dict
+            if not keep_leverage:
+                self.leverage = {}  # symbol -> leverage string
+            self.balance = float(self.initial_balance)
+
+    def inject_error(self, endpoint, ret_code, count=1, ret_msg="injected error"):
+        """ Makes the next `count` calls to `endpoint` fail with `ret_code`. """
+        with self._lock:
+            self._injected.setdefault(endpoint, []).extend([(ret_code, ret_msg)] * count)
+
+    def add_position(self, symbol, side="Buy", size="1", avg_price=None, leverage="2"):
+        with self._lock:
+            self.positions[symbol] = self._position(symbol, side, size, avg_price, leverage)
+
+    def request_counts(self):
+        """ Requests served per endpoint since the last reset_counts(). """
+        with self._lock:
+            return dict(self._counts)
+
+    def total_requests(self):
+        with self._lock:
+            return sum(self._counts.values())
+
+    def reset_counts(self):
+        with self._lock:
+            self._counts = {}
+
+    # --- Request handling ---
+
+    def _now_ms(self):
+        return int(time.time() * 1000 + self.clock_skew_ms)
+
+    def _envelope(self, result=None, ret_code=0, ret_msg="OK", ext=None):
+        return {"retCode": ret_code, "retMsg": ret_msg, "result": result if result is not None else {},
+                "retExtInfo": ext or {}, "time": self._now_ms()}
+
+    def _check_auth(self, headers, payload):
+        """ Returns an error envelope if the request is unsigned, stale or badly signed. """
+        api_key = headers.get("X-BAPI-API-KEY")
+        timestamp = headers.get("X-BAPI-TIMESTAMP")
+        recv_window = headers.get("X-BAPI-RECV-WINDOW", "5000")
+        sign = headers.get("X-BAPI-SIGN")
+        if not api_key or not timestamp or not sign:
+            return self._envelope(ret_code=10003, ret_msg="API key is invalid.")
+        try:
+            drift = self._now_ms() - int(timestamp)
+        except ValueError:
+            return self._envelope(ret_code=10002, ret_msg="invalid request, please check your timestamp")
+        if drift > int(recv_window) or drift < -1000:
+            return self._envelope(ret_code=10002, ret_msg=(
+                "invalid request, please check your server timestamp or recv_window param. "
+                f"req_timestamp[{timestamp}],server_timestamp[{self._now_ms()}],recv_window[{recv_window}]"))
+        expected = hmac.new(self.secret.encode("utf-8"),
+                            (timestamp + api_key + recv_window + payload).encode("utf-8"),
+                            hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, sign):
+            return self._envelope(ret_code=10004, ret_msg="error sign!")
+        return None
+
+    def handle(self, method, path, raw_query, body, headers):
+        """ Dispatches one request and returns the response envelope. """
+        query = {k: v[-1] for k, v in parse_qs(raw_query).items()}
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+        with self._lock:
+            self._counts[path] = self._counts.get(path, 0) + 1
+            injected = self._injected.get(path)
+            error = injected.pop(0) if injected else None
+            if error is None and self.error_rate and self._random.random() < self.error_rate:
+                error = (self.error_code, "random injected error")
+        if error is not None:
+            return self._envelope(ret_code=int(error[0]), ret_msg=error[1])
+
+        if path == "/v5/market/time":
+            now = self._now_ms()
+            return self._envelope({"timeSecond": str(now // 1000), "timeNano": str(now * 1_000_000)})
+        if path == "/v5/market/instruments-info":
+            return self._instruments_info(query)
+        if path == "/v5/market/kline":
+            return self._kline(query)
+        if path == "/v5/market/tickers":
+            return self._tickers(query)
+
+        if self.secret is not None:
+            payload = body if method != "GET" else raw_query
+            failed = self._check_auth(headers, payload)
+            if failed is not None:
+                return failed
+
+        try:
+            params = json.loads(body) if method != "GET" and body else {}
+        except ValueError:
+            return self._envelope(ret_code=10001, ret_msg="invalid JSON body")
+
+        route = _ROUTES.get((method, path))
+        if route is None:
+            return self._envelope(ret_code=10001, ret_msg=f"mock: unsupported endpoint {method} {path}")
+        with self._lock:
+            return route(self, query if method == "GET" else params)
+
+    def _instruments_info(self, query):
+        symbol = query.get("symbol")
+        symbols = [symbol] if symbol else sorted(self.instruments)
+        limit = int(query.get("limit", 500))
+        start = int(query.get("cursor") or 0)
+        page = [s for s in symbols[start:start + limit] if s in self.instruments]
+        items = []
+        for s in page:
+            tick, step, min_qty, max_qty, min_notional, _ = self.instruments[s]
+            items.append({
+                "symbol": s, "status": "Trading", "settleCoin": "USDT",
+                "priceFilter": {"tickSize": tick},
+                "lotSizeFilter": {"qtyStep": step, "minOrderQty": min_qty, "maxOrderQty": max_qty,
+                                  "minNotionalValue": min_notional},
+            })
+        cursor = str(start + limit) if start + limit < len(symbols) else ""
+        return self._envelope({"category": "linear", "list": items, "nextPageCursor": cursor})
+
+    def _candle(self, symbol, ts, interval_ms):
+        """ Deterministic synthetic candle around the instrument's mark price. """
+        mark = self.instruments[symbol][5]
+        phase = ts / interval_ms
+        open_ = mark * (1 + 0.01 * math.sin(phase / 10))
+        close = mark * (1 + 0.01 * math.sin((phase + 1) / 10))
+        return [str(ts), repr(open_), repr(max(open_, close) * 1.001), repr(min(open_, close) * 0.999),
+                repr(close), "100", repr(100 * close)]
+
+    def _kline(self, query):
+        symbol = query.get("symbol")
+        if symbol not in self.instruments:
+            return self._envelope(ret_code=10001, ret_msg="Not supported symbols")
+        interval = query.get("interval", "1")
+        interval_ms = {"D": 86_400_000}.get(interval) or int(interval) * 60_000
+        limit = min(int(query.get("limit", 200)), 1000)
+        end = min(int(query.get("end") or self._now_ms()), self._now_ms())
+        start = int(query.get("start") or 0)
+        ts = end // interval_ms * interval_ms
+        items = []
+        while ts >= start and len(items) < limit:
+            items.append(self._candle(symbol, ts, interval_ms))
+            ts -= interval_ms
+        return self._envelope({"category": "linear", "symbol": symbol, "list": items})
+
+    def _tickers(self, query):
+        symbol = query.get("symbol")
+        symbols = [symbol] if symbol else sorted(self.instruments)
+        items = [{"symbol": s, "lastPrice": repr(self.instruments[s][5]), "markPrice": repr(self.instruments[s][5]),
+                  "turnover24h": repr(self.instruments[s][5] * 1e6), "volume24h": "1000000"}
+                 for s in symbols if s in self.instruments]
+        return self._envelope({"category": "linear", "list": items})
+
+    # The route handlers below run under self._lock.
+
+    def _position(self, symbol, side, size, avg_price, leverage):
+        mark = self.instruments.get(symbol, (None,) * 5 + (0.0,))[5]
+        return {"symbol": symbol, "side": side, "size": str(size), "avgPrice": str(avg_price or mark),
+                "markPrice": str(mark), "leverage": str(leverage), "positionIdx": 0,
+                "stopLoss": "", "takeProfit": "", "updatedTime": str(self._now_ms())}
+
+    def _position_list(self, query):
+        symbol = query.get("symbol")
+        if symbol:
+            pos = self.positions.get(symbol) or {
+                "symbol": symbol, "side": "", "size": "0", "avgPrice": "0",
+                "leverage": self.leverage.get(symbol, "10"), "positionIdx": 0}
+            items = [pos]
+        else:
+            items = [p for p in self.positions.values() if float(p["size"]) > 0]
+        return self._envelope({"category": "linear", "list": items, "nextPageCursor": ""})
+
+    def _order_realtime(self, query):
+        symbol = query.get("symbol")
+        link_id = query.get("orderLinkId")
+        items = [o for o in self.orders.values() if (not symbol or o["symbol"] == symbol)
+                 and (not link_id or o["orderLinkId"] == link_id)]
+        return self._envelope({"category": "linear", "list": items, "nextPageCursor": ""})
+
+    def _wallet_balance(self, query):
+        if query.get("accountType") not in ("UNIFIED", None):
+            return self._envelope(ret_code=10001, ret_msg="accountType only support UNIFIED.")
+        coin = {"coin": "USDT", "walletBalance": f"{self.balance:.4f}",
+                "availableToWithdraw": f"{self.balance:.4f}"}
+        return self._envelope({"list": [{"accountType": "UNIFIED", "totalAvailableBalance": f"{self.balance:.4f}",
+                                         "coin": [coin]}]})
+
+    def _validate_order(self, params):
+        """ Returns (code, msg) for an order the exchange would reject, else None. """
+        symbol = params.get("symbol")
+        if symbol not in self.instruments:
+            return 10001, "params error: symbol invalid"
+        try:
+            qty, price = float(params.get("qty")), float(params.get("price"))
+        except (TypeError, ValueError):
+            return 10001, "params error: qty or price invalid"
+        _, _, min_qty, _, min_notional, _ = self.instruments[symbol]
+        if qty < float(min_qty):
+            return 110017, "Order quantity is lower than the minimum"
+        if qty * price < float(min_notional):
+            return 110094, "Order does not meet minimum order value"
+        return None
+
+    def _rest_order(self, params):
+        order_id = str(uuid.uuid4())
+        now = str(self._now_ms())
+        self.orders[order_id] = {
+            "orderId": order_id, "orderLinkId": params.get("orderLinkId", ""),
+            "symbol": params["symbol"], "side": params.get("side"),
+            "orderType": params.get("orderType", "Limit"), "price": params.get("price"),
+            "qty": params.get("qty"), "takeProfit": params.get("takeProfit", ""),
+            "stopLoss": params.get("stopLoss", ""), "orderStatus": "New",
+            "createdTime": now, "updatedTime": now,
+        }
+        return order_id
+
+    def _order_create(self, params):
+        rejected = self._validate_order(params)
+        if rejected:
+            return self._envelope(ret_code=rejected[0], ret_msg=rejected[1])
+        order_id = self._rest_order(params)
+        return self._envelope({"orderId": order_id, "orderLinkId": params.get("orderLinkId", "")})
+
+    def _order_create_batch(self, params):
+        placed, statuses = [], []
+        for request in params.get("request", []):
+            rejected = self._validate_order(request)
+            if rejected:
+                placed.append({"symbol": request.get("symbol"), "orderId": "", "orderLinkId": ""})
+                statuses.append({"code": rejected[0], "msg": rejected[1]})
+            else:
+                order_id = self._rest_order(request)
+                placed.append({"symbol": request["symbol"], "orderId": order_id,
+                               "orderLinkId": request.get("orderLinkId", "")})
+                statuses.append({"code": 0, "msg": "OK"})
+        return self._envelope({"list": placed}, ext={"list": statuses})
+
+    def _order_cancel(self, params):
+        order = self.orders.pop(params.get("orderId"), None)
+        if order is None:
+            return self._envelope(ret_code=110001, ret_msg="order not exists or too late to cancel")
+        return self._envelope({"orderId": order["orderId"], "orderLinkId": ""})
+
+    def _order_cancel_all(self, params):
+        symbol = params.get("symbol")
+        cancelled = [oid for oid, o in self.orders.items() if not symbol or o["symbol"] == symbol]
+        for oid in cancelled:
+            del self.orders[oid]
+        return self._envelope({"list": [{"orderId": oid, "orderLinkId": ""} for oid in cancelled]})
+
+    def _set_leverage(self, params):
+        symbol = params.get("symbol")
+        leverage = str(params.get("buyLeverage"))
+        if self.leverage.get(symbol) == leverage:
+            return self._envelope(ret_code=110043, ret_msg="leverage not modified")
+        self.leverage[symbol] = leverage
+        if symbol in self.positions:
+            self.positions[symbol]["leverage"] = leverage
+        return self._envelope()
+
+    def _trading_stop(self, params):
+        pos = self.positions.get(params.get("symbol"))
+        if pos is None or float(pos["size"]) <= 0:
+            return self._envelope(ret_code=10001, ret_msg="can not set tp/sl/ts for zero position")
+        for field in ("stopLoss", "takeProfit"):
+            if field in params:
+                pos[field] = str(params[field])
+        return self._envelope()
+
+
+_ROUTES = {
+    ("GET", "/v5/position/list"): BybitMockServer._position_list,
+    ("GET", "/v5/order/realtime"): BybitMockServer._order_realtime,
+    ("GET", "/v5/account/wallet-balance"): BybitMockServer._wallet_balance,
+    ("POST", "/v5/order/create"): BybitMockServer._order_create,
+    ("POST", "/v5/order/create-batch"): BybitMockServer._order_create_batch,
+    ("POST", "/v5/order/cancel"): BybitMockServer._order_cancel,
+    ("POST", "/v5/order/cancel-all"): BybitMockServer._order_cancel_all,
+    ("POST", "/v5/position/set-leverage"): BybitMockServer._set_leverage,
+    ("POST", "/v5/position/trading-stop"): BybitMockServer._trading_stop,
+}
+
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    # TCP_NODELAY: with keep-alive, a response split over several sends would otherwise wait
+    # out Nagle + the client's delayed ACK (~40 ms) on every request.
+    disable_nagle_algorithm = True
+    mock = None
+
+    def _serve(self, method):
+        parsed = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+
+        result = self.mock.handle(method, parsed.path, parsed.query, body, self.headers)
+
+        data = json.dumps(result).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._serve("GET")
+
+    def do_POST(self):
+        self._serve("POST")
+
+    def log_message(self, format, *args):
+        pass  # keep benchmark output clean
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local Bybit V5 mock server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency (seconds)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a random error")
+    parser.add_argument("--error-code", type=int, default=10006)
+    args = parser.parse_args()
+
+    mock = BybitMockServer(port=args.port, latency=args.latency, jitter=args.jitter,
+                           error_rate=args.error_rate, error_code=args.error_code)
+    print(f"Bybit mock server listening on {mock.url} (Ctrl+C to stop)")
+    try:
+        mock._httpd.serve_forever()
+    except KeyboardInterrupt:
+        mock.stop()
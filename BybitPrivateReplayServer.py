@@ -0,0 +1,246 @@
+import asyncio
+import hmac
+import hashlib
+import json
+import threading
+import time
+
+import websockets
+
+PRIVATE_TOPICS = ("position", "order", "wallet")
+
+
+class BybitPrivateReplayServer:
+    """
+    Local stand-in for Bybit's private WebSocket (/v5/private), for testing BybitPrivateStream
+    without the exchange.
+
+    Answers the `auth` op (checking the signature and expiry when a `secret` is given),
+    acknowledges `subscribe` and `ping`, then replays recorded topic messages
+    ({"topic": "position"|"order"|"wallet", "data": [...]}) to every authenticated client
+    subscribed to their topic, `interval` seconds apart. push() sends snapshots or deltas
+    live; drop_connections() simulates a disconnect to exercise the REST re-seed.
+    """
+
+    def __init__(self, messages=(), host="127.0.0.1", port=0, interval=0.0, secret=None):
+        self.messages = list(messages)
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.secret = secret
+        self.auth_count = 0
+        self.subscribe_count = 0
+
+        self._clients = {}  # websocket -> set of subscribed topics
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_jsonl(cls, path, **kwargs):
+        with open(path, "r") as f:
+            return cls([json.loads(line) for line in f if line.strip()], **kwargs)
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/v5/private"
+
+    def start(self):
+        """ Serves in a daemon thread; returns once the socket is listening. """
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self.url
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        async with websockets.serve(self._handler, self.host, self.port) as server:
+            self._server = server
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await server.wait_closed()
+
+    def _auth_error(self, args):
+        """ Why an auth request ([api_key, expires, signature]) is rejected, or None. """
+        if self.secret is None:
+            return None
+        try:
+            api_key, expires, signature = args
+            expires = int(expires)
+        except (TypeError, ValueError):
+            return "Params Error"
+        if expires < time.time() * 1000:
+            return "Params Error: expired"
+        expected = hmac.new(self.secret.encode("utf-8"), f"GET/realtime{expires}".encode("utf-8"),
+                            hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(expected, str(signature)):
+            return "Invalid sign"
+        return None
+
+    async def _handler(self, ws, path=None):
+        authenticated = False
+        try:
+            async for raw in ws:
+                try:
+                    request = json.loads(raw)
+                except ValueError:
+                    continue
+                op = request.get("op")
+                reply = {"req_id": request.get("req_id", ""), "op": op, "conn_id": "replay"}
+                if op == "ping":
+                    await ws.send(json.dumps(dict(reply, op="pong", args=[str(int(time.time() * 1000))])))
+                elif op == "auth":
+                    error = self._auth_error(request.get("args"))
+                    authenticated = error is None
+                    self.auth_count += int(authenticated)
+                    await ws.send(json.dumps(dict(reply, success=authenticated, ret_msg=error or "")))
+                elif op == "subscribe":
+                    topics = {t for t in request.get("args", []) if t in PRIVATE_TOPICS}
+                    if not authenticated:
+                        await ws.send(json.dumps(dict(reply, success=False, ret_msg="Request not authorized")))
+                        continue
+                    self._clients.setdefault(ws, set()).update(topics)
+                    self.subscribe_count += 1
+                    await ws.send(json.dumps(dict(reply, success=True, ret_msg="")))
+                    asyncio.ensure_future(self._replay(ws, topics))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._clients.pop(ws, None)
+
+    @staticmethod
+    def _envelope(message):
+        now = int(time.time() * 1000)
+        return dict({"id": f"replay-{now}", "creationTime": now}, **message)
+
+    async def _replay(self, ws, topics):
+        for message in self.messages:
+            if message.get("topic") not in topics:
+                continue
+            if self.interval:
+                await asyncio.sleep(self.interval)
+            try:
+                await ws.send(json.dumps(self._envelope(message)))
+            except websockets.ConnectionClosed:
+                return
+
+    async def _broadcast(self, message):
+        for ws, topics in list(self._clients.items()):
+            if message.get("topic") in topics:
+                try:
+                    await ws.send(json.dumps(self._envelope(message)))
+                except websockets.ConnectionClosed:
+                    pass
+
+    def push(self, message):
+        """ Sends one topic message to the subscribed clients now (thread-safe). """
+        asyncio.run_coroutine_threadsafe(self._broadcast(message), self._loop).result(5)
+
+    def drop_connections(self):
+        """ Closes every client connection (thread-safe). """
+        async def _drop():
+            for ws in list(self._clients):
+                await ws.close()
+        asyncio.run_coroutine_threadsafe(_drop(), self._loop).result(5)
+
+
+def _position(symbol, side, size, price, leverage="5"):
+    return {"topic": "position", "data": [{
+        "category": "linear", "symbol": symbol, "side": side, "size": str(size), "entryPrice": str(price),
+        "leverage": leverage, "positionIdx": 0, "stopLoss": "", "takeProfit": "",
+        "updatedTime": str(int(time.time() * 1000))}]}
+
+
+def _order(symbol, order_id, status, price, qty):
+    return {"topic": "order", "data": [{
+        "category": "linear", "symbol": symbol, "orderId": order_id, "side": "Buy", "orderType": "Limit",
+        "price": str(price), "qty": str(qty), "orderStatus": status, "updatedTime": str(int(time.time() * 1000))}]}
+
+
+def _wallet(balance):
+    coin = {"coin": "USDT", "walletBalance": f"{balance:.4f}", "availableToWithdraw": f"{balance:.4f}"}
+    return {"topic": "wallet", "data": [{"accountType": "UNIFIED", "totalAvailableBalance": f"{balance:.4f}",
+                                         "coin": [coin]}]}
+
+
+if __name__ == '__main__':
+    # Self-test: BybitTrader + BybitPrivateStream against this server and the REST mock.
+    # Checks that position/order/balance lookups answer from memory while the stream is fresh,
+    # fall back to REST once it goes stale, re-seed after a disconnect, and that stop() returns.
+    import contextlib
+    import io
+
+    from BybitMockServer import BybitMockServer
+    from BybitPrivateStream import BybitPrivateStream
+    from Bybitinteract import BybitTrader
+
+    API_KEY, SECRET = "replay-key", "replay-secret"
+    mock = BybitMockServer(secret=SECRET, balance=1000.0)
+    mock.start()
+    mock.add_position("SOLUSDT", side="Buy", size="2", leverage="5")
+
+    server = BybitPrivateReplayServer([_wallet(990.0)], secret=SECRET)
+    server.start()
+
+    def wait_for(check, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if check():
+                return True
+            time.sleep(0.05)
+        return False
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        trader = BybitTrader(API_KEY, SECRET, is_demo=True)
+        trader.base_url = mock.url
+        trader.sync_clock()
+        # No pings and a 1 s staleness window, so silence makes the stream stale quickly.
+        stream = trader.stream = BybitPrivateStream(trader, url=server.url, stale_after=1.0, ping_interval=3600)
+        stream.start()
+
+    assert wait_for(stream.is_fresh), "stream never synced"
+    assert server.auth_count == 1, "auth op not accepted"
+    assert wait_for(lambda: trader.get_available_balance("SOL-USDT") == 990.0), "wallet snapshot not applied"
+
+    # Fresh stream: seeded state plus live deltas, with no REST traffic.
+    mock.reset_counts()
+    server.push(_position("BTCUSDT", "Sell", "0.01", 65000))
+    server.push(_order("ETHUSDT", "order-1", "New", 3100, "0.5"))
+    server.push(_wallet(975.5))
+    assert wait_for(lambda: trader.has_open_position("BTC-USDT")), "position delta not applied"
+    assert wait_for(lambda: trader.has_open_order("ETH-USDT")), "order delta not applied"
+    assert wait_for(lambda: trader.get_available_balance("SOL-USDT") == 975.5), "wallet delta not applied"
+    assert trader.has_open_position("SOL-USDT"), "seeded position missing"
+    server.push(_order("ETHUSDT", "order-1", "Cancelled", 3100, "0.5"))
+    assert wait_for(lambda: not trader.has_open_order("ETH-USDT")), "terminal order not removed"
+    assert mock.total_requests() == 0, f"fresh stream still hit REST: {mock.request_counts()}"
+
+    # Stale stream: the same lookups go back to REST (which knows nothing about BTC).
+    assert wait_for(lambda: not stream.is_fresh(), timeout=3), "stream never went stale"
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert not trader.has_open_position("BTC-USDT"), "stale stream answered from memory"
+        assert trader.get_available_balance("SOL-USDT") == 1000.0, "stale balance not fetched over REST"
+    rest_calls = mock.request_counts()
+    assert rest_calls.get("/v5/position/list") and rest_calls.get("/v5/account/wallet-balance"), rest_calls
+
+    # Disconnect: the stream reconnects, re-authenticates and re-seeds from REST.
+    with contextlib.redirect_stdout(io.StringIO()):
+        server.drop_connections()
+        assert wait_for(lambda: server.auth_count >= 2 and stream.is_fresh(), timeout=10), "no re-seed after drop"
+    assert not trader.has_open_position("BTC-USDT") and trader.has_open_position("SOL-USDT")
+
+    started = time.time()
+    stream.stop()
+    assert not stream._thread.is_alive(), "stream thread still running after stop()"
+    print(f"   stop() returned in {(time.time() - started) * 1000:.0f} ms")
+
+    trader.close()
+    server.stop()
+    mock.stop()
+    print("✅ BybitPrivateStream passed the replay test (auth, snapshot/deltas from memory, "
+          "stale REST fallback, re-seed, stop).")
@@ -0,0 +1,260 @@
+import asyncio
+import hmac
+import hashlib
+import json
+import threading
+import time
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+from bybit_config import BYBIT_WS_STALE_SECONDS, BYBIT_WS_PING_INTERVAL
+
+MAINNET_PRIVATE_URL = "wss://stream.bybit.com/v5/private"
+TESTNET_PRIVATE_URL = "wss://stream-testnet.bybit.com/v5/private"
+
+# Orders in these states are no longer resting on the book.
+TERMINAL_ORDER_STATUSES = {"Filled", "Cancelled", "Rejected", "Deactivated", "PartiallyFilledCanceled"}
+
+
+class BybitPrivateStream:
+    """
+    In-memory view of positions, open orders and wallet balances fed by Bybit's private
+    `position`, `order` and `wallet` WebSocket topics.
+
+    The private topics only push changes, so the full state is seeded over REST right after
+    subscribing (and again after every reconnect). Readers must check is_fresh() and fall
+    back to REST when the stream is disconnected, unsynced or silent for too long.
+    """
+
+    def __init__(self, trader, url=None, stale_after=BYBIT_WS_STALE_SECONDS,
+                 ping_interval=BYBIT_WS_PING_INTERVAL):
+        self.trader = trader
+        self.url = url or (TESTNET_PRIVATE_URL if trader.is_demo else MAINNET_PRIVATE_URL)
+        self.stale_after = stale_after
+        self.ping_interval = ping_interval
+
+        self._lock = threading.Lock()
+        self._positions = {}  # symbol -> position dict
+        self._orders = {}     # orderId -> order dict (resting orders only)
+        self._accounts = {}   # accountType -> wallet account dict
+        self._synced = False
+        self._connected = False
+        self._last_message = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._loop = None  # the stream thread's event loop and open socket, so stop() can close it
+        self._ws = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """ Runs the stream in a daemon thread with its own event loop. """
+        if websockets is None:
+            print("   ⚠️ [Bybit WS] 'websockets' is not installed; private stream disabled.")
+            return False
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        self._stop.clear()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run_forever()), daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self, timeout=5):
+        """ Stops the stream: closes the open socket from its own loop and waits for the thread. """
+        self._stop.set()
+        loop, ws = self._loop, self._ws
+        if loop is not None and ws is not None and loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(ws.close(), loop).result(timeout)
+            except Exception as e:
+                print(f"   ⚠️ [Bybit WS] Error closing private stream: {e}")
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def is_fresh(self):
+        """ True when the cached state is connected, seeded and recently heard from. """
+        return (self._connected and self._synced
+                and (time.time() - self._last_message) < self.stale_after)
+
+    async def _run_forever(self):
+        self._loop = asyncio.get_running_loop()
+        delay = 1
+        while not self._stop.is_set():
+            try:
+                await self._run_once()
+                delay = 1
+            except Exception as e:
+                print(f"   ⚠️ [Bybit WS] Private stream error: {e}. Reconnecting in {delay}s...")
+            finally:
+                self._connected = False
+                self._synced = False
+            if self._stop.is_set():
+                break
+            # Sleep in short steps so stop() does not wait out the whole backoff
+            wake_at = time.time() + delay
+            while not self._stop.is_set() and time.time() < wake_at:
+                await asyncio.sleep(min(0.2, wake_at - time.time()))
+            delay = min(delay * 2, 30)
+        self._loop = None
+
+    async def _run_once(self):
+        async with websockets.connect(self.url, ping_interval=None) as ws:
+            self._ws = ws
+            if self._stop.is_set():
+                return
+            await self._authenticate(ws)
+            await ws.send(json.dumps({"op": "subscribe", "args": ["position", "order", "wallet"]}))
+            self._connected = True
+            self._last_message = time.time()
+
+            # Deltas that arrive while seeding stay queued in the socket and are applied after,
+            # guarded by updatedTime so an older delta never overwrites the fresher REST state.
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._seed_from_rest)
+
+            pinger = asyncio.create_task(self._ping_loop(ws))
+            try:
+                async for raw in ws:
+                    if self._stop.is_set():
+                        break
+                    self._handle_message(raw)
+            finally:
+                pinger.cancel()
+                self._ws = None
+
+    async def _authenticate(self, ws):
+        expires = int(self.trader._server_timestamp()) + 10000
+        signature = hmac.new(
+            bytes(self.trader.secret_key, "utf-8"),
+            bytes(f"GET/realtime{expires}", "utf-8"),
+            hashlib.sha256,
+        ).hexdigest()
+        await ws.send(json.dumps({"op": "auth", "args": [self.trader.api_key, expires, signature]}))
+        reply = json.loads(await asyncio.wait_for(ws.recv(), timeout=10))
+        if not reply.get("success"):
+            raise RuntimeError(f"auth rejected: {reply.get('ret_msg')}")
+
+    async def _ping_loop(self, ws):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send(json.dumps({"op": "ping"}))
+
+    # --- State maintenance ---
+
+    def _seed_from_rest(self):
+        """ Loads the full position/order/wallet state over REST. Raises if any part fails. """
+        positions, result = self.trader._request_all_pages(
+            "/v5/position/list", {"category": "linear", "settleCoin": "USDT"}, limit=200)
+        if positions is None:
+            raise RuntimeError(f"position seed failed: {result.get('retMsg')}")
+        orders, result = self.trader._request_all_pages(
+            "/v5/order/realtime", {"category": "linear", "settleCoin": "USDT"}, limit=50)
+        if orders is None:
+            raise RuntimeError(f"order seed failed: {result.get('retMsg')}")
+
+        accounts = {}
+        for account_type in ("UNIFIED", "CONTRACT"):
+            result = self.trader._request("GET", "/v5/account/wallet-balance", {"accountType": account_type})
+            if str(result.get("retCode")) == "0":
+                for acct in result.get("result", {}).get("list", []):
+                    accounts[acct.get("accountType", account_type)] = acct
+                break
+        else:
+            raise RuntimeError(f"wallet seed failed: {result.get('retMsg')}")
+
+        with self._lock:
+            self._positions = {}
+            for p in positions:
+                self._store_position(p)
+            self._orders = {}
+            for o in orders:
+                self._store_order(o)
+            self._accounts = accounts
+            self._synced = True
+        print(f"   ✅ [Bybit WS] Private stream synced "
+              f"({len(self._positions)} position(s), {len(self._orders)} open order(s)).")
+
+    @staticmethod
+    def _is_older(incoming, current):
+        """ True if `incoming` carries an updatedTime strictly older than `current`. """
+        if current is None:
+            return False
+        try:
+            return int(incoming.get("updatedTime") or 0) < int(current.get("updatedTime") or 0)
+        except (TypeError, ValueError):
+            return False
+
+    def _store_position(self, pos):
+        symbol = pos.get("symbol")
+        if not symbol or self._is_older(pos, self._positions.get(symbol)):
+            return
+        self.trader._remember_leverage([pos])
+        pos = dict(pos)
+        # The stream reports the average entry as entryPrice; REST calls it avgPrice.
+        if not pos.get("avgPrice") and pos.get("entryPrice"):
+            pos["avgPrice"] = pos["entryPrice"]
+        self._positions[symbol] = pos
+
+    def _store_order(self, order):
+        order_id = order.get("orderId")
+        if not order_id or self._is_older(order, self._orders.get(order_id)):
+            return
+        if order.get("orderStatus") in TERMINAL_ORDER_STATUSES:
+            self._orders.pop(order_id, None)
+        else:
+            self._orders[order_id] = dict(order)
+
+    def _handle_message(self, raw):
+        try:
+            msg = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+        self._last_message = time.time()
+
+        topic = msg.get("topic")
+        data = msg.get("data") or []
+        if topic is None:
+            return  # pong / subscribe acknowledgements only refresh liveness
+
+        with self._lock:
+            if topic == "position":
+                for p in data:
+                    if p.get("category", "linear") == "linear":
+                        self._store_position(p)
+            elif topic == "order":
+                for o in data:
+                    if o.get("category", "linear") == "linear":
+                        self._store_order(o)
+            elif topic == "wallet":
+                for acct in data:
+                    self._accounts[acct.get("accountType", "UNIFIED")] = acct
+
+    # --- Readers (thread-safe) ---
+
+    def get_positions(self, symbol=None):
+        """ Returns copies of active (size > 0) positions, optionally for one symbol. """
+        with self._lock:
+            return [dict(p) for s, p in self._positions.items()
+                    if (symbol is None or s == symbol) and float(p.get("size", 0) or 0) > 0]
+
+    def get_open_orders(self, symbol=None):
+        with self._lock:
+            return [dict(o) for o in self._orders.values()
+                    if symbol is None or o.get("symbol") == symbol]
+
+    def has_open_position(self, symbol):
+        return len(self.get_positions(symbol)) > 0
+
+    def has_open_order(self, symbol):
+        return len(self.get_open_orders(symbol)) > 0
+
+    def get_available_balance(self, quote_currency):
+        """ Free balance for the coin from the cached wallet, or None if it is not cached. """
+        with self._lock:
+            account = self._accounts.get("UNIFIED") or self._accounts.get("CONTRACT")
+            if account is None:
+                return None
+            return self.trader._free_balance_from_account(account, quote_currency)
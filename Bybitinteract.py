@@ -1,16 +1,47 @@
+import os
 import time
 import hmac
 import hashlib
 import json
+import threading
+import uuid
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from decimal import Decimal, ROUND_DOWN, ROUND_HALF_UP
 from urllib.parse import urlencode
 from bybit_config import (
     BYBIT_API_KEY, BYBIT_SECRET_KEY, BYBIT_IS_DEMO,
     HTTP_TIMEOUT, MIN_NOTIONAL_USDT,
+    BYBIT_POOL_SIZE, BYBIT_HTTP_RETRIES, BYBIT_WS_ENABLED,
+    INSTRUMENT_CACHE_FILE, INSTRUMENT_CACHE_TTL, INSTRUMENT_REFRESH_INTERVAL,
+    BATCH_ORDER_LIMIT, BYBIT_RECV_WINDOW, BYBIT_CLOCK_SYNC_INTERVAL, BYBIT_HTTP_DEADLINE,
 )
+from BybitPrivateStream import BybitPrivateStream
+from AccountSnapshot import AccountSnapshot
+from RateLimiter import BybitRateLimiter
+from RetryPolicy import call_with_retry
+
+class BybitClock:
+    """
+    Measured offset (ms) between the local clock and Bybit's server time. One instance is
+    shared by a trader and the async clients built from it, so a resync by either is used
+    by both.
+    """
+
+    def __init__(self):
+        self.offset_ms = 0.0
+        self.rtt_ms = None
+        self.synced_at = 0.0
+
+
+class BybitTraderBase:
+    """
+    Transport-independent part of the Bybit client: request signing, symbol/quantity/price
+    formatting, order validation and response interpretation. BybitTrader (requests) and
+    AsyncBybitTrader (aiohttp) only add the I/O, so both return identical shapes.
+    """
 
-class BybitTrader:
     def __init__(self, api_key, secret_key, is_demo=True):
         self.api_key = api_key
         self.secret_key = secret_key
@@ -18,121 +49,197 @@ class BybitTrader:
 
         # Base URL setup
         self.base_url = "https://api-testnet.bybit.com" if is_demo else "https://api.bybit.com"
-        self.recv_window = "5000"
-        # Cache of per-symbol instrument filters (tickSize/qtyStep/minOrderQty/minNotional)
+        self.recv_window = str(BYBIT_RECV_WINDOW)
+        # Pre-keyed HMAC; each signature works on a copy instead of re-keying from the secret.
+        self._hmac_base = hmac.new(bytes(secret_key, "utf-8"), digestmod=hashlib.sha256)
+        self._sign_count = 0
+        self._sign_seconds = 0.0
+
+        # Offset (ms) added to the local clock so timestamps follow Bybit's server time.
+        # Measured from /v5/market/time (see sync_clock) and refreshed every BYBIT_CLOCK_SYNC_INTERVAL.
+        self.clock = BybitClock()
+        # Cache of per-symbol instrument filters (tickSize/qtyStep/minOrderQty/minNotional).
+        # Always updated in place so clients sharing it (see AsyncBybitTrader.from_trader) stay in sync.
         self._filters_cache = {}
-        print(f"BybitTrader initialized in {'DEMO (Testnet)' if is_demo else 'LIVE (Mainnet)'} mode.")
+        self._request_count = 0
 
-    def _set_trading_stop(self, symbol, stop_loss_price_str):
-        """ Устанавливает новый StopLoss для активной позиции (Безубыток) """
-        params = {
-            "category": "linear",
-            "symbol": symbol,
-            "stopLoss": stop_loss_price_str, # Передаем как строку
-            "positionIdx": 0 # 0 для One-Way Mode
-        }
+        # Per-endpoint token buckets fed by Bybit's X-Bapi-Limit* headers (shared with async clients).
+        self.rate_limiter = BybitRateLimiter()
 
-        result = self._request("POST", "/v5/position/trading-stop", params)
+        # Leverage known to be set on the exchange, per symbol (float). Seeded from position lists
+        # and the private stream, updated on set-leverage success, so repeat calls can be skipped.
+        self._leverage_cache = {}
+        self._leverage_skipped = 0
 
-        if str(result.get("retCode")) == "0":
-            print(f"   ✅ [Bybit] Stop Loss successfully updated to {stop_loss_price_str} (Breakeven)")
-        # Ошибка 34040 означает, что стоп уже стоит на этой цене (Not modified)
-        elif str(result.get("retCode")) != "34040":
-            print(f"   ❌ [Bybit] Failed to update SL: {result.get('retMsg')}")
+        # Optional private WebSocket state cache (see BybitTrader.start_private_stream).
+        self.stream = None
 
+    def _fresh_stream(self):
+        """ Returns the private stream if its state can be trusted right now, else None. """
+        stream = self.stream
+        if stream is not None and stream.is_fresh():
+            return stream
+        return None
 
-    def update_stop_loss_to_breakeven(self, instrument_id, atr_value):
+    # The clock fields live on the (possibly shared) BybitClock.
+    @property
+    def _clock_offset_ms(self):
+        return self.clock.offset_ms
+
+    @_clock_offset_ms.setter
+    def _clock_offset_ms(self, value):
+        self.clock.offset_ms = value
+
+    @property
+    def _clock_rtt_ms(self):
+        return self.clock.rtt_ms
+
+    @_clock_rtt_ms.setter
+    def _clock_rtt_ms(self, value):
+        self.clock.rtt_ms = value
+
+    @property
+    def _clock_synced_at(self):
+        return self.clock.synced_at
+
+    @_clock_synced_at.setter
+    def _clock_synced_at(self, value):
+        self.clock.synced_at = value
+
+    # --- Request signing ---
+
+    def _server_timestamp(self):
+        """ Current time in ms on Bybit's clock (local clock corrected by the measured offset). """
+        return str(int(time.time() * 1000 + self._clock_offset_ms))
+
+    def _sign_request(self, method, endpoint, params=None):
         """
-        Переводит сделку в безубыток.
-        Если профит достигает 1.5 ATR (половина пути до TP = 3.0 ATR),
-        SL передвигается на среднюю цену входа (avgPrice).
+        Builds the signed request for Bybit V5.
+        Returns (url, headers, body) where body is the JSON payload for POST and None for GET.
         """
-        symbol = self._format_symbol(instrument_id)
-        params = {"category": "linear", "symbol": symbol, "settleCoin": "USDT"}
+        started = time.perf_counter()
+        timestamp = self._server_timestamp()
+        payload = ""
 
-        # Получаем список активных позиций
-        result = self._request("GET", "/v5/position/list", params)
+        if method == "GET":
+            if params:
+                payload = urlencode(params)
+                endpoint = f"{endpoint}?{payload}"
+        else:
+            if params:
+                # Bybit requires compact JSON (no spaces) for the signature
+                payload = json.dumps(params, separators=(',', ':'))
 
-        if str(result.get("retCode")) == "0":
-            positions = result.get("result", {}).get("list", [])
-            active_positions = [p for p in positions if float(p.get("size", "0")) > 0]
+        # Create the signature string
+        param_str = timestamp + self.api_key + self.recv_window + payload
+        mac = self._hmac_base.copy()
+        mac.update(param_str.encode("utf-8"))
+        signature = mac.hexdigest()
 
-            for pos in active_positions:
-                side = pos.get('side')
-                avg_price_str = pos.get('avgPrice') # Строка с точной ценой входа от биржи
+        headers = {
+            "X-BAPI-API-KEY": self.api_key,
+            "X-BAPI-SIGN": signature,
+            "X-BAPI-TIMESTAMP": timestamp,
+            "X-BAPI-RECV-WINDOW": self.recv_window,
+            "Content-Type": "application/json",
+            "User-Agent": "bybit-bot/1.0"
+        }
 
-                avg_price = float(avg_price_str)
-                mark_price = float(pos.get('markPrice', '0'))
+        self._sign_count += 1
+        self._sign_seconds += time.perf_counter() - started
+        return self.base_url + endpoint, headers, (payload if method != "GET" else None)
 
-                sl_str = pos.get('stopLoss', '0')
-                current_sl = float(sl_str) if sl_str else 0.0
+    # --- Server clock ---
 
-                threshold = 1.5 * atr_value # Порог срабатывания
+    def _clock_sync_due(self, endpoint):
+        """ True when the clock offset is unmeasured or older than BYBIT_CLOCK_SYNC_INTERVAL. """
+        return (endpoint != "/v5/market/time"
+                and time.time() - self._clock_synced_at > BYBIT_CLOCK_SYNC_INTERVAL)
 
-                # 1. Логика для LONG
-                if side == "Buy":
-                    profit_distance = mark_price - avg_price
-                    # Профит больше порога И текущий стоп все еще ниже цены входа
-                    if profit_distance >= threshold and current_sl < avg_price:
-                        print(f"\n🛡️ Breakeven triggered! Profit > 1.5 ATR. Moving SL to {avg_price_str} for LONG {symbol}")
-                        self._set_trading_stop(symbol, avg_price_str)
+    def _apply_server_time(self, result, sent_at, received_at):
+        """
+        Updates the clock offset from a /v5/market/time reply, assuming the server read its
+        clock halfway through the round trip. Returns True on success.
+        """
+        try:
+            data = result.get("result", {})
+            if data.get("timeNano"):
+                server_ms = int(data["timeNano"]) / 1e6
+            elif result.get("time"):
+                server_ms = float(result["time"])
+            else:
+                server_ms = float(data["timeSecond"]) * 1000
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return False
+
+        midpoint_ms = (sent_at + received_at) / 2 * 1000
+        self._clock_offset_ms = server_ms - midpoint_ms
+        self._clock_rtt_ms = (received_at - sent_at) * 1000
+        self._clock_synced_at = received_at
+        return True
+
+    def _report_clock_sync(self, ok, error=None):
+        if ok:
+            if abs(self._clock_offset_ms) > int(self.recv_window) / 2:
+                print(f"   ⚠️ [Bybit] Local clock is {self._clock_offset_ms:+.0f} ms off server time "
+                      f"(recv_window {self.recv_window} ms); compensating.")
+        else:
+            # Retry on the next request rather than hammering the endpoint.
+            self._clock_synced_at = time.time() - BYBIT_CLOCK_SYNC_INTERVAL + 30
+            print(f"   ⚠️ [Bybit] Server time sync failed: {error}")
+
+    def get_timing_stats(self):
+        """ Measured clock skew (ms, server minus local), sync RTT/age and average signing cost (µs). """
+        return {
+            "clock_offset_ms": round(self._clock_offset_ms, 1),
+            "clock_rtt_ms": round(self._clock_rtt_ms, 1) if self._clock_rtt_ms is not None else None,
+            "clock_synced_age_s": round(time.time() - self._clock_synced_at, 1) if self._clock_synced_at else None,
+            "recv_window_ms": int(self.recv_window),
+            "signatures": self._sign_count,
+            "sign_avg_us": round(self._sign_seconds / self._sign_count * 1e6, 2) if self._sign_count else 0.0,
+        }
 
-                # 2. Логика для SHORT
-                elif side == "Sell":
-                    profit_distance = avg_price - mark_price
-                    # Профит больше порога И текущий стоп все еще выше цены входа (или равен 0)
-                    if profit_distance >= threshold and (current_sl > avg_price or current_sl == 0):
-                        print(f"\n🛡️ Breakeven triggered! Profit > 1.5 ATR. Moving SL to {avg_price_str} for SHORT {symbol}")
-                        self._set_trading_stop(symbol, avg_price_str)
+    @staticmethod
+    def _request_error(e):
+        """ Error shape returned by _request when the call itself fails (network, bad JSON...). """
+        return {"retCode": -1, "retMsg": str(e)}
 
-    def _format_symbol(self, instrument_id):
-        """ Converts OKX style 'SOL-USDT' to Bybit style 'SOLUSDT' """
-        if instrument_id:
-            return instrument_id.replace("-", "").upper()
-        return None
+    def _throttle_delay(self, method, endpoint):
+        """ Seconds to wait before sending, per the rate limiter (order calls get priority). """
+        return self.rate_limiter.reserve(endpoint, self.rate_limiter.priority_for(method))
 
-    def get_instrument_filters(self, instrument_id):
+    def _retry_delay_after(self, endpoint, result, headers):
         """
-        Fetches and caches per-symbol trading filters from Bybit:
-        tickSize, qtyStep, minOrderQty, maxOrderQty, minNotional.
-        Returns a dict, or None if it cannot be fetched.
+        For a 10006 (rate limit) rejection, blocks the endpoint until its reset and returns how
+        long to wait before the single retry; None when the result should be returned as is.
+        A 10002 (timestamp outside recv_window) forces a clock resync and an immediate retry.
+        Both codes mean the request was not executed, so retrying an order cannot duplicate it.
         """
-        symbol = self._format_symbol(instrument_id)
-        if not symbol:
+        ret_code = str(result.get("retCode"))
+        if ret_code == "10002":
+            self._clock_synced_at = 0.0
+            print(f"   ⏳ [Bybit] Timestamp rejected on {endpoint}; resyncing clock and retrying.")
+            return 0.0
+        if ret_code != "10006":
             return None
-        if symbol in self._filters_cache:
-            return self._filters_cache[symbol]
-
-        result = self._request(
-            "GET", "/v5/market/instruments-info",
-            {"category": "linear", "symbol": symbol},
-        )
-        if str(result.get("retCode")) != "0":
-            print(f"   ❌ [Bybit] Could not fetch instrument filters for {symbol}: {result.get('retMsg')}")
+        reset_ms = headers.get("X-Bapi-Limit-Reset-Timestamp") if headers is not None else None
+        wait = self.rate_limiter.on_rate_limited(endpoint, reset_ms)
+        if not self.rate_limiter.can_retry_after(wait):
             return None
+        print(f"   ⏳ [Bybit] Rate limited on {endpoint}; retrying in {wait:.2f}s.")
+        return wait
 
-        lst = result.get("result", {}).get("list", [])
-        if not lst:
-            print(f"   ❌ [Bybit] No instrument info returned for {symbol}.")
-            return None
+    def get_rate_limit_stats(self):
+        """ Per-endpoint throttle metrics: requests, throttled, wait_seconds, max_wait, rate_limited. """
+        return self.rate_limiter.get_metrics()
 
-        info = lst[0]
-        price_f = info.get("priceFilter", {})
-        lot_f = info.get("lotSizeFilter", {})
-        try:
-            filters = {
-                "tickSize": Decimal(str(price_f.get("tickSize", "0.0001"))),
-                "qtyStep": Decimal(str(lot_f.get("qtyStep", "0.001"))),
-                "minOrderQty": Decimal(str(lot_f.get("minOrderQty", "0"))),
-                "maxOrderQty": Decimal(str(lot_f.get("maxOrderQty", "0")) or "0"),
-                "minNotional": Decimal(str(lot_f.get("minNotionalValue", MIN_NOTIONAL_USDT))),
-            }
-        except Exception as e:
-            print(f"   ❌ [Bybit] Failed to parse filters for {symbol}: {e}")
-            return None
+    # --- Formatting / quantization ---
 
-        self._filters_cache[symbol] = filters
-        return filters
+    def _format_symbol(self, instrument_id):
+        """ Converts OKX style 'SOL-USDT' to Bybit style 'SOLUSDT' """
+        if instrument_id:
+            return instrument_id.replace("-", "").upper()
+        return None
 
     @staticmethod
     def _quantize_down(value, step):
@@ -152,30 +259,63 @@ class BybitTrader:
             return v
         return (v / s).to_integral_value(rounding=ROUND_HALF_UP) * s
 
-    def round_qty(self, instrument_id, raw_qty):
-        """ Floor qty to the symbol's qtyStep. Returns Decimal, or None if filters unavailable. """
-        filters = self.get_instrument_filters(instrument_id)
-        if not filters:
+    @staticmethod
+    def _quote_currency(coin_pair):
+        """ Extract quote currency (e.g., SOL-USDT -> USDT, or SOLUSDT -> USDT) """
+        if '-' in coin_pair:
+            return coin_pair.split('-')[1]
+        elif coin_pair.endswith('USDT'):
+            return 'USDT'
+        elif coin_pair.endswith('USDC'):
+            return 'USDC'
+        return coin_pair
+
+    # --- Response interpretation ---
+
+    @staticmethod
+    def _parse_instrument_filters(info):
+        """ Builds the Decimal filters dict from one instruments-info entry. Raises on bad data. """
+        price_f = info.get("priceFilter", {})
+        lot_f = info.get("lotSizeFilter", {})
+        return {
+            "tickSize": Decimal(str(price_f.get("tickSize", "0.0001"))),
+            "qtyStep": Decimal(str(lot_f.get("qtyStep", "0.001"))),
+            "minOrderQty": Decimal(str(lot_f.get("minOrderQty", "0"))),
+            "maxOrderQty": Decimal(str(lot_f.get("maxOrderQty", "0")) or "0"),
+            "minNotional": Decimal(str(lot_f.get("minNotionalValue", MIN_NOTIONAL_USDT))),
+        }
+
+    def _filters_from_result(self, symbol, result):
+        """ Parses and caches a single-symbol instruments-info response. Returns filters or None. """
+        if str(result.get("retCode")) != "0":
+            print(f"   ❌ [Bybit] Could not fetch instrument filters for {symbol}: {result.get('retMsg')}")
             return None
-        return self._quantize_down(raw_qty, filters["qtyStep"])
 
-    def round_price(self, instrument_id, raw_price):
-        """ Round price to the symbol's tickSize. Returns Decimal, or None if filters unavailable. """
-        filters = self.get_instrument_filters(instrument_id)
-        if not filters:
+        lst = result.get("result", {}).get("list", [])
+        if not lst:
+            print(f"   ❌ [Bybit] No instrument info returned for {symbol}.")
             return None
-        return self._quantize_nearest(raw_price, filters["tickSize"])
 
-    def set_leverage(self, instrument_id, leverage):
-        """ Sets buy/sell leverage for a symbol. Idempotent (tolerates 'not modified'). """
-        symbol = self._format_symbol(instrument_id)
-        params = {
+        try:
+            filters = self._parse_instrument_filters(lst[0])
+        except Exception as e:
+            print(f"   ❌ [Bybit] Failed to parse filters for {symbol}: {e}")
+            return None
+
+        self._filters_cache[symbol] = filters
+        return filters
+
+    @staticmethod
+    def _leverage_params(symbol, leverage):
+        return {
             "category": "linear",
             "symbol": symbol,
             "buyLeverage": str(leverage),
             "sellLeverage": str(leverage),
         }
-        result = self._request("POST", "/v5/position/set-leverage", params)
+
+    @staticmethod
+    def _leverage_result_ok(symbol, result):
         code = str(result.get("retCode"))
         # 110043 = leverage not modified (already set) -> treat as success
         if code == "0" or code == "110043":
@@ -183,99 +323,175 @@ class BybitTrader:
         print(f"   ❌ [Bybit] Failed to set leverage for {symbol}: {result.get('retMsg')} (Code: {code})")
         return False
 
-    def has_open_position(self, instrument_id):
-        """ Returns True if there is an active (size > 0) position on the symbol. """
-        symbol = self._format_symbol(instrument_id)
-        result = self._request(
-            "GET", "/v5/position/list",
-            {"category": "linear", "symbol": symbol, "settleCoin": "USDT"},
-        )
+    def _remember_leverage(self, positions):
+        """ Records the leverage reported on position entries (any size) in the leverage cache. """
+        for pos in positions:
+            symbol, leverage = pos.get("symbol"), pos.get("leverage")
+            if not symbol or leverage in (None, ""):
+                continue
+            try:
+                self._leverage_cache[symbol] = float(leverage)
+            except (TypeError, ValueError):
+                pass
+
+    def _leverage_is_set(self, symbol, leverage):
+        """ True if the cache says `symbol` already runs at `leverage` (the call can be skipped). """
+        if self._leverage_cache.get(symbol) == float(leverage):
+            self._leverage_skipped += 1
+            return True
+        return False
+
+    def _apply_leverage_result(self, symbol, leverage, result):
+        """ Updates the leverage cache from a set-leverage response. Returns True on success. """
+        if self._leverage_result_ok(symbol, result):
+            self._leverage_cache[symbol] = float(leverage)
+            return True
+        self._leverage_cache.pop(symbol, None)
+        return False
+
+    def get_leverage_stats(self):
+        """ Leverage cache size and how many set-leverage calls it has saved. """
+        return {"cached_symbols": len(self._leverage_cache), "calls_skipped": self._leverage_skipped}
+
+    def _position_exists(self, symbol, result):
         if str(result.get("retCode")) != "0":
             # Fail safe: if we cannot confirm, assume a position may exist to avoid stacking.
             print(f"   ⚠️ [Bybit] Could not verify positions for {symbol}; assuming one exists.")
             return True
         positions = result.get("result", {}).get("list", [])
+        # A per-symbol query returns the (possibly empty) position entry with its leverage.
+        self._remember_leverage(positions)
         return any(float(p.get("size", 0) or 0) > 0 for p in positions)
 
-    def has_open_order(self, instrument_id):
-        """ Returns True if there is a resting open order on the symbol. """
-        symbol = self._format_symbol(instrument_id)
-        result = self._request(
-            "GET", "/v5/order/realtime",
-            {"category": "linear", "symbol": symbol},
-        )
+    @staticmethod
+    def _order_exists(symbol, result):
         if str(result.get("retCode")) != "0":
             print(f"   ⚠️ [Bybit] Could not verify open orders for {symbol}; assuming one exists.")
             return True
         orders = result.get("result", {}).get("list", [])
         return len(orders) > 0
 
-    def _request(self, method, endpoint, params=None):
-        """ Handles authentication and sends request to Bybit V5 API """
-        timestamp = str(int(time.time() * 1000))
-        payload = ""
+    @staticmethod
+    def _free_balance_from_account(account, quote_currency):
+        """ Extracts the FREE balance of a coin from a wallet-balance account entry. """
+        coins = account.get("coin", [])
+        # If coins array is empty, the specific coin has 0 balance
+        if not coins:
+            return 0.0
+
+        # Find the specific coin and return its FREE balance (not total equity).
+        for c in coins:
+            if c.get("coin") == quote_currency:
+                # Prefer genuinely available margin; fall back through sensible fields.
+                for field in ("availableToWithdraw", "availableBalance", "free"):
+                    val = c.get(field)
+                    if val not in (None, ""):
+                        return float(val)
+                # Account-level free balance for cross-margin UNIFIED accounts.
+                acct_avail = account.get("totalAvailableBalance")
+                if acct_avail not in (None, ""):
+                    return float(acct_avail)
+                # Last resort: total wallet equity (overstates free funds).
+                return float(c.get("walletBalance", 0.0))
+
+        # If loop finishes and coin isn't found, balance is 0
+        return 0.0
+
+    def _balance_from_result(self, result, quote_currency):
+        """ Free balance from a wallet-balance response, or None if the call failed. """
+        if str(result.get("retCode")) == "0":
+            list_data = result.get("result", {}).get("list", [])
 
-        if method == "GET":
-            if params:
-                payload = urlencode(params)
-                endpoint = f"{endpoint}?{payload}"
-        else:
-            if params:
-                # Bybit requires compact JSON (no spaces) for the signature
-                payload = json.dumps(params, separators=(',', ':'))
+            # If list_data is empty, the account exists but has 0 balance
+            if not list_data:
+                return 0.0
 
-        # Create the signature string
-        param_str = timestamp + self.api_key + self.recv_window + payload
-        signature = hmac.new(
-            bytes(self.secret_key, "utf-8"),
-            bytes(param_str, "utf-8"),
-            hashlib.sha256
-        ).hexdigest()
+            return self._free_balance_from_account(list_data[0], quote_currency)
 
-        headers = {
-            "X-BAPI-API-KEY": self.api_key,
-            "X-BAPI-SIGN": signature,
-            "X-BAPI-TIMESTAMP": timestamp,
-            "X-BAPI-RECV-WINDOW": self.recv_window,
-            "Content-Type": "application/json",
-            "User-Agent": "bybit-bot/1.0"
-        }
+        # Could not determine balance -> signal failure rather than a misleading 0.0
+        print(f"❌ Error getting balance: {result.get('retMsg', result)}")
+        return None
 
-        url = self.base_url + endpoint
+    @staticmethod
+    def _breakeven_targets(symbol, result, atr_value):
+        """
+        Returns the avgPrice strings to move the SL to for positions that reached 1.5 ATR profit.
+        """
+        targets = []
+        if str(result.get("retCode")) != "0":
+            return targets
 
-        try:
-            if method == "GET":
-                response = requests.get(url, headers=headers, timeout=HTTP_TIMEOUT)
-            else:
-                response = requests.post(url, headers=headers, data=payload, timeout=HTTP_TIMEOUT)
+        positions = result.get("result", {}).get("list", [])
+        active_positions = [p for p in positions if float(p.get("size", "0")) > 0]
 
-            return response.json()
-        except Exception as e:
-            return {"retCode": -1, "retMsg": str(e)}
+        for pos in active_positions:
+            side = pos.get('side')
+            avg_price_str = pos.get('avgPrice') # Строка с точной ценой входа от биржи
 
-    def place_limit_order_with_tp_sl(self, instrument_id, side, size, price, take_profit_price, stop_loss_price):
-        """
-        Places a limit order with TP/SL attached natively (Bybit supports this in a single call).
+            avg_price = float(avg_price_str)
+            mark_price = float(pos.get('markPrice', '0'))
 
-        Quantizes qty/price/TP/SL to the symbol's exchange filters and validates the order
-        before sending. Returns a structured dict:
-            {'ok': bool, 'orderId': str|None, 'retCode': int|str, 'retMsg': str}
+            sl_str = pos.get('stopLoss', '0')
+            current_sl = float(sl_str) if sl_str else 0.0
+
+            threshold = 1.5 * atr_value # Порог срабатывания
+
+            # 1. Логика для LONG
+            if side == "Buy":
+                profit_distance = mark_price - avg_price
+                # Профит больше порога И текущий стоп все еще ниже цены входа
+                if profit_distance >= threshold and current_sl < avg_price:
+                    print(f"\n🛡️ Breakeven triggered! Profit > 1.5 ATR. Moving SL to {avg_price_str} for LONG {symbol}")
+                    targets.append(avg_price_str)
+
+            # 2. Логика для SHORT
+            elif side == "Sell":
+                profit_distance = avg_price - mark_price
+                # Профит больше порога И текущий стоп все еще выше цены входа (или равен 0)
+                if profit_distance >= threshold and (current_sl > avg_price or current_sl == 0):
+                    print(f"\n🛡️ Breakeven triggered! Profit > 1.5 ATR. Moving SL to {avg_price_str} for SHORT {symbol}")
+                    targets.append(avg_price_str)
+        return targets
+
+    @staticmethod
+    def _trading_stop_params(symbol, stop_loss_price_str):
+        return {
+            "category": "linear",
+            "symbol": symbol,
+            "stopLoss": stop_loss_price_str, # Передаем как строку
+            "positionIdx": 0 # 0 для One-Way Mode
+        }
+
+    @staticmethod
+    def _report_trading_stop(result, stop_loss_price_str):
+        if str(result.get("retCode")) == "0":
+            print(f"   ✅ [Bybit] Stop Loss successfully updated to {stop_loss_price_str} (Breakeven)")
+        # Ошибка 34040 означает, что стоп уже стоит на этой цене (Not modified)
+        elif str(result.get("retCode")) != "34040":
+            print(f"   ❌ [Bybit] Failed to update SL: {result.get('retMsg')}")
+
+    # --- Orders ---
+
+    def _build_limit_order(self, filters, instrument_id, side, size, price, take_profit_price, stop_loss_price):
+        """
+        Quantizes qty/price/TP/SL to the symbol's exchange filters and validates the order.
+        Returns (params, None) ready for /v5/order/create, or (None, error_result) where
+        error_result has the same shape as place_limit_order_with_tp_sl's return value.
         """
         symbol = self._format_symbol(instrument_id)
         side_capitalized = "Buy" if side.lower() == "buy" else "Sell"
 
-        filters = self.get_instrument_filters(instrument_id)
         if not filters:
-            return {"ok": False, "orderId": None, "retCode": -2,
-                    "retMsg": f"Could not fetch instrument filters for {symbol}; order not sent."}
+            return None, {"ok": False, "orderId": None, "retCode": -2,
+                          "retMsg": f"Could not fetch instrument filters for {symbol}; order not sent."}
 
         # Quantize quantity DOWN to the step so notional never exceeds the intended budget.
         qty_d = self._quantize_down(size, filters["qtyStep"])
         min_qty = filters["minOrderQty"]
         max_qty = filters["maxOrderQty"]
         if qty_d <= 0 or (min_qty > 0 and qty_d < min_qty):
-            return {"ok": False, "orderId": None, "retCode": -3,
-                    "retMsg": f"Qty {qty_d} below minOrderQty {min_qty} for {symbol}; skipped."}
+            return None, {"ok": False, "orderId": None, "retCode": -3,
+                          "retMsg": f"Qty {qty_d} below minOrderQty {min_qty} for {symbol}; skipped."}
         if max_qty > 0 and qty_d > max_qty:
             qty_d = max_qty
 
@@ -285,86 +501,150 @@ class BybitTrader:
         sl_d = self._quantize_nearest(stop_loss_price, filters["tickSize"])
 
         if entry_d <= 0:
-            return {"ok": False, "orderId": None, "retCode": -4,
-                    "retMsg": f"Invalid entry price {entry_d} for {symbol}; skipped."}
+            return None, {"ok": False, "orderId": None, "retCode": -4,
+                          "retMsg": f"Invalid entry price {entry_d} for {symbol}; skipped."}
 
         # Direction-coherence check: TP/SL must be on the correct side of entry.
         if side_capitalized == "Buy":
             if not (sl_d < entry_d < tp_d):
-                return {"ok": False, "orderId": None, "retCode": -5,
-                        "retMsg": f"Incoherent LONG levels SL={sl_d} entry={entry_d} TP={tp_d}; skipped."}
+                return None, {"ok": False, "orderId": None, "retCode": -5,
+                              "retMsg": f"Incoherent LONG levels SL={sl_d} entry={entry_d} TP={tp_d}; skipped."}
         else:
             if not (tp_d < entry_d < sl_d):
-                return {"ok": False, "orderId": None, "retCode": -5,
-                        "retMsg": f"Incoherent SHORT levels TP={tp_d} entry={entry_d} SL={sl_d}; skipped."}
+                return None, {"ok": False, "orderId": None, "retCode": -5,
+                              "retMsg": f"Incoherent SHORT levels TP={tp_d} entry={entry_d} SL={sl_d}; skipped."}
 
         # Minimum notional guard.
         notional = qty_d * entry_d
         if notional < filters["minNotional"]:
-            return {"ok": False, "orderId": None, "retCode": -6,
-                    "retMsg": f"Notional {notional} below minNotional {filters['minNotional']} for {symbol}; skipped."}
-
-        qty_s, price_s = str(qty_d), str(entry_d)
-        tp_s, sl_s = str(tp_d), str(sl_d)
-
-        print(f"\n-> Placing {side.upper()} limit order with ATTACHED TP/SL for {symbol}...")
-        print(f"   Main Order: {qty_s} at {price_s}")
-        print(f"   Take Profit will be attached at: {tp_s}")
-        print(f"   Stop Loss will be attached at: {sl_s}")
+            return None, {"ok": False, "orderId": None, "retCode": -6,
+                          "retMsg": f"Notional {notional} below minNotional {filters['minNotional']} for {symbol}; skipped."}
 
         params = {
             "category": "linear",
             "symbol": symbol,
             "side": side_capitalized,
             "orderType": "Limit",
-            "qty": qty_s,
-            "price": price_s,
-            "takeProfit": tp_s,
-            "stopLoss": sl_s,
+            "qty": str(qty_d),
+            "price": str(entry_d),
+            "takeProfit": str(tp_d),
+            "stopLoss": str(sl_d),
             "tpslMode": "Full",  # Apply TP/SL to the entire order
             "timeInForce": "GTC"
         }
+        return params, None
 
-        result = self._request("POST", "/v5/order/create", params)
+    @staticmethod
+    def _order_ok_message(params):
+        return f"OK (Entry: {params['price']}, SL: {params['stopLoss']}, TP: {params['takeProfit']})"
+
+    @staticmethod
+    def _announce_order(side, params):
+        print(f"\n-> Placing {side.upper()} limit order with ATTACHED TP/SL for {params['symbol']}...")
+        print(f"   Main Order: {params['qty']} at {params['price']}")
+        print(f"   Take Profit will be attached at: {params['takeProfit']}")
+        print(f"   Stop Loss will be attached at: {params['stopLoss']}")
+
+    def _order_create_result(self, params, result):
+        """ Maps an /v5/order/create response to the structured order result dict. """
         ret_code = str(result.get("retCode"))
 
         if ret_code == "0":
             order_id = result.get("result", {}).get("orderId", "UNKNOWN")
             print(f"   ✅ Limit order with TP/SL placed successfully! Order ID: {order_id}")
             return {"ok": True, "orderId": order_id, "retCode": 0,
-                    "retMsg": f"OK (Entry: {price_s}, SL: {sl_s}, TP: {tp_s})"}
+                    "retMsg": self._order_ok_message(params)}
         else:
             ret_msg = result.get("retMsg")
             print(f"   ❌ Error placing order: {ret_msg} (Code: {ret_code})")
             return {"ok": False, "orderId": None, "retCode": ret_code, "retMsg": str(ret_msg)}
 
-    def cancel_order(self, instrument_id, order_id):
-        """ Cancels a specific order """
-        symbol = self._format_symbol(instrument_id)
-        print(f"\n-> Attempting to cancel ID: {order_id} for {symbol}...")
+    @staticmethod
+    def _batch_chunks(pending):
+        """ Splits validated (index, params) pairs into create-batch request bodies. """
+        for start in range(0, len(pending), BATCH_ORDER_LIMIT):
+            chunk = pending[start:start + BATCH_ORDER_LIMIT]
+            print(f"\n-> Placing batch of {len(chunk)} limit order(s) with ATTACHED TP/SL...")
+            for _, params in chunk:
+                print(f"   {params['side']} {params['symbol']}: {params['qty']} at {params['price']} "
+                      f"(TP {params['takeProfit']}, SL {params['stopLoss']})")
+
+            # A client id per order lets an order without a per-item status be looked up afterwards.
+            for _, params in chunk:
+                params.setdefault("orderLinkId", f"batch-{uuid.uuid4().hex[:24]}")
+            request = [{k: v for k, v in params.items() if k != "category"} for _, params in chunk]
+            yield chunk, {"category": "linear", "request": request}
+
+    def _apply_batch_result(self, chunk, result, results):
+        """
+        Writes the per-order outcome of one create-batch response into `results`.
+        Orders the response gives no status (or no orderId) for are recorded as failures and
+        returned as [(index, params)] so the caller can reconcile them by orderLinkId.
+        """
+        if str(result.get("retCode")) != "0":
+            ret_code, ret_msg = str(result.get("retCode")), str(result.get("retMsg"))
+            print(f"   ❌ Error placing batch: {ret_msg} (Code: {ret_code})")
+            for i, _ in chunk:
+                results[i] = {"ok": False, "orderId": None, "retCode": ret_code, "retMsg": ret_msg}
+            return []
+
+        # Per-order outcome: result.list holds ids, retExtInfo.list holds codes, both in request order.
+        placed = result.get("result", {}).get("list", [])
+        statuses = result.get("retExtInfo", {}).get("list", [])
+        unresolved = []
+        for pos, (i, params) in enumerate(chunk):
+            status = statuses[pos] if pos < len(statuses) else {}
+            code = status.get("code")
+            order_id = (placed[pos] if pos < len(placed) else {}).get("orderId")
+            if code is None or (str(code) == "0" and not order_id):
+                # No per-item outcome: the order may or may not rest on the book.
+                print(f"   ⚠️ {params['symbol']}: no status in batch response; checking by orderLinkId...")
+                results[i] = {"ok": False, "orderId": None, "retCode": "UNKNOWN",
+                              "retMsg": "order status unknown (missing from batch response)"}
+                unresolved.append((i, params))
+                continue
+            code = str(code)
+            if code == "0":
+                print(f"   ✅ {params['symbol']} placed! Order ID: {order_id}")
+                results[i] = {"ok": True, "orderId": order_id, "retCode": 0,
+                              "retMsg": self._order_ok_message(params)}
+            else:
+                msg = str(status.get("msg"))
+                print(f"   ❌ {params['symbol']} rejected: {msg} (Code: {code})")
+                results[i] = {"ok": False, "orderId": None, "retCode": code, "retMsg": msg}
+        return unresolved
 
-        params = {
-            "category": "linear",
-            "symbol": symbol,
-            "orderId": order_id
-        }
+    @staticmethod
+    def _reconcile_params(params):
+        return {"category": "linear", "symbol": params["symbol"], "orderLinkId": params["orderLinkId"]}
 
-        result = self._request("POST", "/v5/order/cancel", params)
+    def _reconciled_order_result(self, params, result):
+        """
+        Result dict for a batch order without a per-item status, from an /v5/order/realtime
+        lookup by its orderLinkId: placed only if the exchange shows the order.
+        """
+        if str(result.get("retCode")) != "0":
+            print(f"   ❌ {params['symbol']}: could not reconcile order ({result.get('retMsg')})")
+            return {"ok": False, "orderId": None, "retCode": "UNKNOWN",
+                    "retMsg": f"order status unknown: lookup failed ({result.get('retMsg')})"}
+        for order in result.get("result", {}).get("list", []):
+            if order.get("orderLinkId") == params["orderLinkId"] and order.get("orderId"):
+                print(f"   ✅ {params['symbol']} placed (reconciled)! Order ID: {order['orderId']}")
+                return {"ok": True, "orderId": order["orderId"], "retCode": 0,
+                        "retMsg": self._order_ok_message(params)}
+        print(f"   ❌ {params['symbol']}: order not found on the exchange after batch")
+        return {"ok": False, "orderId": None, "retCode": "UNKNOWN",
+                "retMsg": "order not found after batch (no per-item status)"}
+
+    @staticmethod
+    def _cancel_result_message(order_id, result):
         if str(result.get("retCode")) == "0":
             return f"✅ Order {order_id} canceled successfully."
         else:
             return f"❌ Failed to cancel {order_id}. Error: {result.get('retMsg')}"
 
-    def get_open_orders(self, instrument_id=None):
-        """ Fetches open orders (Limit, TP/SL, etc.) """
-        symbol = self._format_symbol(instrument_id)
-        print(f"\n-> Requesting open orders{' for ' + symbol if symbol else ''}...")
-
-        params = {"category": "linear"}
-        if symbol:
-            params["symbol"] = symbol
-
-        result = self._request("GET", "/v5/order/realtime", params)
+    @staticmethod
+    def _format_open_orders(result):
         output_lines = []
 
         if str(result.get("retCode")) == "0":
@@ -385,16 +665,8 @@ class BybitTrader:
 
         return "\n".join(output_lines)
 
-    def get_open_positions(self, instrument_id=None):
-        """ Fetches currently active positions """
-        symbol = self._format_symbol(instrument_id)
-        print(f"\n-> Requesting open positions{' for ' + symbol if symbol else ''}...")
-
-        params = {"category": "linear", "settleCoin": "USDT"}
-        if symbol:
-            params["symbol"] = symbol
-
-        result = self._request("GET", "/v5/position/list", params)
+    @staticmethod
+    def _format_open_positions(result):
         output_lines = []
 
         if str(result.get("retCode")) == "0":
@@ -418,6 +690,467 @@ class BybitTrader:
 
         return "\n".join(output_lines)
 
+    @staticmethod
+    def _close_position_params(pos):
+        """ Reduce-only market order that flattens `pos`. """
+        # Determine opposite side to close
+        close_side = "Sell" if pos.get('side') == "Buy" else "Buy"
+        return {
+            "category": "linear",
+            "symbol": pos.get('symbol'),
+            "side": close_side,
+            "orderType": "Market",
+            "qty": pos.get('size'),
+            "reduceOnly": True # Critical: Ensures we only close the position, not open a new one
+        }
+
+
+class BybitTrader(BybitTraderBase):
+    def __init__(self, api_key, secret_key, is_demo=True):
+        super().__init__(api_key, secret_key, is_demo)
+        self._filters_loaded_at = 0.0
+        self._filters_refresher = None
+
+        # One pooled keep-alive session for every call, so consecutive requests reuse a
+        # warm TCP+TLS connection instead of paying a fresh handshake each time.
+        self.session, self._adapter = self._build_session(BYBIT_POOL_SIZE, BYBIT_HTTP_RETRIES)
+        print(f"BybitTrader initialized in {'DEMO (Testnet)' if is_demo else 'LIVE (Mainnet)'} mode.")
+
+    @staticmethod
+    def _build_session(pool_size, retries):
+        """
+        Creates a requests.Session with a sized connection pool and connect retries
+        (safe for every method: nothing was sent). GET reads are retried by _request.
+        """
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=0,
+            backoff_factor=0.2,
+            allowed_methods=frozenset({"GET"}),  # never re-send a POST that reached the server
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session, adapter
+
+    def get_connection_stats(self):
+        """
+        Returns connection reuse counters for the pooled session:
+            {'requests': int, 'connections_opened': int, 'reused': int}
+        'reused' is the number of requests served over an already-open connection.
+        """
+        opened = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                opened += pool.num_connections
+        return {
+            "requests": self._request_count,
+            "connections_opened": opened,
+            "reused": max(self._request_count - opened, 0),
+        }
+
+    def close(self):
+        """ Closes the pooled session and its keep-alive connections. """
+        if self.stream is not None:
+            self.stream.stop()
+        self.session.close()
+
+    def start_private_stream(self, url=None):
+        """
+        Starts the private WebSocket cache so position/order/balance checks answer from memory.
+        `url` overrides the Bybit endpoint (e.g. a local stand-in server). Returns the stream.
+        """
+        self.stream = BybitPrivateStream(self, url=url)
+        if not self.stream.start():
+            self.stream = None
+        return self.stream
+
+    def _set_trading_stop(self, symbol, stop_loss_price_str):
+        """ Устанавливает новый StopLoss для активной позиции (Безубыток) """
+        params = self._trading_stop_params(symbol, stop_loss_price_str)
+        result = self._request("POST", "/v5/position/trading-stop", params)
+        self._report_trading_stop(result, stop_loss_price_str)
+
+    def update_stop_loss_to_breakeven(self, instrument_id, atr_value):
+        """
+        Переводит сделку в безубыток.
+        Если профит достигает 1.5 ATR (половина пути до TP = 3.0 ATR),
+        SL передвигается на среднюю цену входа (avgPrice).
+        """
+        symbol = self._format_symbol(instrument_id)
+        params = {"category": "linear", "symbol": symbol, "settleCoin": "USDT"}
+
+        # Стрим не гарантирует свежий markPrice, поэтому он используется только чтобы
+        # пропустить REST-запрос, когда позиции нет (самый частый случай).
+        stream = self._fresh_stream()
+        if stream is not None and not stream.has_open_position(symbol):
+            return
+
+        # Получаем список активных позиций
+        result = self._request("GET", "/v5/position/list", params)
+        for avg_price_str in self._breakeven_targets(symbol, result, atr_value):
+            self._set_trading_stop(symbol, avg_price_str)
+
+    def get_instrument_filters(self, instrument_id):
+        """
+        Fetches and caches per-symbol trading filters from Bybit:
+        tickSize, qtyStep, minOrderQty, maxOrderQty, minNotional.
+        Returns a dict, or None if it cannot be fetched.
+        """
+        symbol = self._format_symbol(instrument_id)
+        if not symbol:
+            return None
+        if symbol in self._filters_cache:
+            return self._filters_cache[symbol]
+
+        result = self._request(
+            "GET", "/v5/market/instruments-info",
+            {"category": "linear", "symbol": symbol},
+        )
+        return self._filters_from_result(symbol, result)
+
+    def load_all_instrument_filters(self):
+        """
+        Bulk-loads the filters of every linear instrument (paginated) into the cache and
+        saves them to INSTRUMENT_CACHE_FILE. Returns the number of symbols loaded, or None.
+        """
+        instruments, result = self._request_all_pages(
+            "/v5/market/instruments-info", {"category": "linear"}, limit=1000)
+        if instruments is None:
+            print(f"   ❌ [Bybit] Bulk instrument load failed: {result.get('retMsg')}")
+            return None
+
+        filters = {}
+        for info in instruments:
+            symbol = info.get("symbol")
+            try:
+                filters[symbol] = self._parse_instrument_filters(info)
+            except Exception as e:
+                print(f"   ⚠️ [Bybit] Skipping filters for {symbol}: {e}")
+
+        # Update in place: symbols fetched lazily in between (e.g. a fresh listing) are kept.
+        self._filters_cache.update(filters)
+        self._filters_loaded_at = time.time()
+        self._save_filters_to_disk()
+        return len(filters)
+
+    def _save_filters_to_disk(self):
+        data = {
+            "base_url": self.base_url,
+            "fetched_at": self._filters_loaded_at,
+            "filters": {sym: {k: str(v) for k, v in f.items()} for sym, f in list(self._filters_cache.items())},
+        }
+        tmp_path = INSTRUMENT_CACHE_FILE + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, INSTRUMENT_CACHE_FILE)
+        except OSError as e:
+            print(f"   ⚠️ [Bybit] Could not save instrument cache: {e}")
+
+    def _load_filters_from_disk(self):
+        """ Loads the on-disk filters cache (any age). Returns its fetch time, or None. """
+        try:
+            with open(INSTRUMENT_CACHE_FILE, 'r') as f:
+                data = json.load(f)
+            if data.get("base_url") != self.base_url:
+                return None  # testnet and mainnet listings differ
+            cached = {sym: {k: Decimal(v) for k, v in f.items()} for sym, f in data["filters"].items()}
+        except (FileNotFoundError, json.JSONDecodeError, KeyError, ArithmeticError, AttributeError):
+            return None
+        for sym, f in cached.items():
+            self._filters_cache.setdefault(sym, f)
+        self._filters_loaded_at = float(data.get("fetched_at", 0.0))
+        return self._filters_loaded_at
+
+    def preload_instrument_filters(self, refresh_interval=INSTRUMENT_REFRESH_INTERVAL):
+        """
+        Startup preload so the order path never waits on a filter fetch.
+        Uses the on-disk cache immediately when present; fetches synchronously only when there
+        is no cache at all, otherwise refreshes stale data in the background. Then keeps the
+        cache refreshed every `refresh_interval` seconds.
+        """
+        loaded_at = self._load_filters_from_disk()
+        if loaded_at is None:
+            count = self.load_all_instrument_filters()
+            print(f"Instrument filters loaded from Bybit: {count} symbols.")
+        else:
+            age = time.time() - loaded_at
+            print(f"Instrument filters loaded from disk: {len(self._filters_cache)} symbols "
+                  f"({age / 60:.0f} min old).")
+            if age > INSTRUMENT_CACHE_TTL:
+                threading.Thread(target=self.load_all_instrument_filters, daemon=True).start()
+        self.start_filters_refresher(refresh_interval)
+
+    def start_filters_refresher(self, interval=INSTRUMENT_REFRESH_INTERVAL):
+        """ Starts a daemon thread that re-runs the bulk filter load every `interval` seconds. """
+        if self._filters_refresher is not None and self._filters_refresher.is_alive():
+            return
+
+        def _refresh_loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.load_all_instrument_filters()
+                except Exception as e:
+                    print(f"   ⚠️ [Bybit] Instrument filter refresh error: {e}")
+
+        self._filters_refresher = threading.Thread(target=_refresh_loop, daemon=True)
+        self._filters_refresher.start()
+
+    def round_qty(self, instrument_id, raw_qty):
+        """ Floor qty to the symbol's qtyStep. Returns Decimal, or None if filters unavailable. """
+        filters = self.get_instrument_filters(instrument_id)
+        if not filters:
+            return None
+        return self._quantize_down(raw_qty, filters["qtyStep"])
+
+    def round_price(self, instrument_id, raw_price):
+        """ Round price to the symbol's tickSize. Returns Decimal, or None if filters unavailable. """
+        filters = self.get_instrument_filters(instrument_id)
+        if not filters:
+            return None
+        return self._quantize_nearest(raw_price, filters["tickSize"])
+
+    def set_leverage(self, instrument_id, leverage, force=False):
+        """
+        Sets buy/sell leverage for a symbol. Idempotent (tolerates 'not modified').
+        Skips the call when the leverage cache already holds the target, unless `force`.
+        """
+        symbol = self._format_symbol(instrument_id)
+        if not force and self._leverage_is_set(symbol, leverage):
+            return True
+        result = self._request("POST", "/v5/position/set-leverage", self._leverage_params(symbol, leverage))
+        return self._apply_leverage_result(symbol, leverage, result)
+
+    def has_open_position(self, instrument_id):
+        """ Returns True if there is an active (size > 0) position on the symbol. """
+        symbol = self._format_symbol(instrument_id)
+        stream = self._fresh_stream()
+        if stream is not None:
+            return stream.has_open_position(symbol)
+        result = self._request(
+            "GET", "/v5/position/list",
+            {"category": "linear", "symbol": symbol, "settleCoin": "USDT"},
+        )
+        return self._position_exists(symbol, result)
+
+    def has_open_order(self, instrument_id):
+        """ Returns True if there is a resting open order on the symbol. """
+        symbol = self._format_symbol(instrument_id)
+        stream = self._fresh_stream()
+        if stream is not None:
+            return stream.has_open_order(symbol)
+        result = self._request(
+            "GET", "/v5/order/realtime",
+            {"category": "linear", "symbol": symbol},
+        )
+        return self._order_exists(symbol, result)
+
+    def _request_all_pages(self, endpoint, params, limit):
+        """
+        GETs every page of a cursor-paginated V5 list endpoint.
+        Returns (items, last_result); items is None if any page fails.
+        """
+        items = []
+        params = dict(params, limit=limit)
+        while True:
+            result = self._request("GET", endpoint, params)
+            if str(result.get("retCode")) != "0":
+                return None, result
+            page = result.get("result", {})
+            items.extend(page.get("list", []))
+            cursor = page.get("nextPageCursor")
+            if not cursor or not page.get("list"):
+                return items, result
+            params["cursor"] = cursor
+
+    def sync_clock(self):
+        """ Measures the offset between the local clock and Bybit's server time. Returns True on success. """
+        try:
+            sent_at = time.time()
+            response = self.session.get(self.base_url + "/v5/market/time", timeout=HTTP_TIMEOUT)
+            received_at = time.time()
+            ok = self._apply_server_time(response.json(), sent_at, received_at)
+            error = None if ok else "unexpected response"
+        except Exception as e:
+            ok, error = False, e
+        self._report_clock_sync(ok, error)
+        return ok
+
+    def _request(self, method, endpoint, params=None, _retry=True):
+        """ Handles authentication and sends request to Bybit V5 API """
+        if self._clock_sync_due(endpoint):
+            self.sync_clock()
+
+        delay = self._throttle_delay(method, endpoint)
+        if delay > 0:
+            time.sleep(delay)
+
+        def send(timeout):
+            # Sign per attempt (after any throttle wait) so the timestamp is fresh.
+            url, headers, body = self._sign_request(method, endpoint, params)
+            self._request_count += 1
+            timeouts = (min(HTTP_TIMEOUT[0], timeout), min(HTTP_TIMEOUT[1], timeout))
+            if method == "GET":
+                return self.session.get(url, headers=headers, timeout=timeouts)
+            return self.session.post(url, headers=headers, data=body, timeout=timeouts)
+
+        try:
+            # Only reads are retried; an order POST is sent at most once.
+            response = call_with_retry(
+                "bybit", send, BYBIT_HTTP_DEADLINE, attempts=BYBIT_HTTP_RETRIES + 1 if method == "GET" else 1,
+                retry_result=lambda r: r.status_code >= 500)
+            self.rate_limiter.update_from_headers(endpoint, response.headers)
+            result = response.json()
+        except Exception as e:
+            return self._request_error(e)
+
+        if _retry:
+            wait = self._retry_delay_after(endpoint, result, response.headers)
+            if wait is not None:
+                return self._request(method, endpoint, params, _retry=False)
+        return result
+
+    def _public_request(self, endpoint, params):
+        """
+        Unsigned GET of a public market endpoint over the pooled session, with the same rate
+        limiter, retries and 'bybit' breaker as _request.
+        """
+        delay = self._throttle_delay("GET", endpoint)
+        if delay > 0:
+            time.sleep(delay)
+
+        def send(timeout):
+            self._request_count += 1
+            return self.session.get(self.base_url + endpoint, params=params,
+                                    timeout=(min(HTTP_TIMEOUT[0], timeout), min(HTTP_TIMEOUT[1], timeout)))
+
+        try:
+            response = call_with_retry("bybit", send, BYBIT_HTTP_DEADLINE, attempts=BYBIT_HTTP_RETRIES + 1,
+                                       retry_result=lambda r: r.status_code >= 500)
+            self.rate_limiter.update_from_headers(endpoint, response.headers)
+            return response.json()
+        except Exception as e:
+            return self._request_error(e)
+
+    def get_kline(self, instrument_id, interval, start=None, end=None, limit=200):
+        """
+        Linear-perpetual candles from /v5/market/kline (newest first; each row is
+        [startTime, open, high, low, close, volume, turnover] as strings). `interval` is
+        Bybit's ('1', '15', '60', 'D'...); start/end are inclusive ms bounds.
+        Returns the raw API result dict.
+        """
+        params = {"category": "linear", "symbol": self._format_symbol(instrument_id),
+                  "interval": interval, "limit": limit}
+        if start is not None:
+            params["start"] = int(start)
+        if end is not None:
+            params["end"] = int(end)
+        return self._public_request("/v5/market/kline", params)
+
+    def get_tickers(self, instrument_id=None):
+        """ /v5/market/tickers for one linear symbol, or every linear symbol when omitted. """
+        params = {"category": "linear"}
+        symbol = self._format_symbol(instrument_id)
+        if symbol:
+            params["symbol"] = symbol
+        return self._public_request("/v5/market/tickers", params)
+
+    def _prepare_limit_order(self, instrument_id, side, size, price, take_profit_price, stop_loss_price):
+        filters = self.get_instrument_filters(instrument_id)
+        return self._build_limit_order(
+            filters, instrument_id, side, size, price, take_profit_price, stop_loss_price)
+
+    def place_limit_order_with_tp_sl(self, instrument_id, side, size, price, take_profit_price, stop_loss_price):
+        """
+        Places a limit order with TP/SL attached natively (Bybit supports this in a single call).
+
+        Quantizes qty/price/TP/SL to the symbol's exchange filters and validates the order
+        before sending. Returns a structured dict:
+            {'ok': bool, 'orderId': str|None, 'retCode': int|str, 'retMsg': str}
+        """
+        params, error = self._prepare_limit_order(
+            instrument_id, side, size, price, take_profit_price, stop_loss_price)
+        if error is not None:
+            return error
+
+        self._announce_order(side, params)
+        result = self._request("POST", "/v5/order/create", params)
+        return self._order_create_result(params, result)
+
+    def place_limit_orders_batch(self, orders):
+        """
+        Places several limit orders with attached TP/SL via /v5/order/create-batch.
+
+        `orders` is a list of dicts holding place_limit_order_with_tp_sl's keyword arguments.
+        Every order goes through the same quantization/validation; valid ones are sent in
+        chunks of BATCH_ORDER_LIMIT. Returns one result dict per input order, in input order,
+        with the same shape as place_limit_order_with_tp_sl.
+        """
+        results = [None] * len(orders)
+        pending = []  # (input index, params)
+        for i, order in enumerate(orders):
+            params, error = self._prepare_limit_order(**order)
+            if error is not None:
+                results[i] = error
+            else:
+                pending.append((i, params))
+
+        for chunk, batch_params in self._batch_chunks(pending):
+            result = self._request("POST", "/v5/order/create-batch", batch_params)
+            for i, params in self._apply_batch_result(chunk, result, results):
+                lookup = self._request("GET", "/v5/order/realtime", self._reconcile_params(params))
+                results[i] = self._reconciled_order_result(params, lookup)
+
+        return results
+
+    def cancel_order(self, instrument_id, order_id):
+        """ Cancels a specific order """
+        symbol = self._format_symbol(instrument_id)
+        print(f"\n-> Attempting to cancel ID: {order_id} for {symbol}...")
+
+        params = {
+            "category": "linear",
+            "symbol": symbol,
+            "orderId": order_id
+        }
+
+        result = self._request("POST", "/v5/order/cancel", params)
+        return self._cancel_result_message(order_id, result)
+
+    def get_open_orders(self, instrument_id=None):
+        """ Fetches open orders (Limit, TP/SL, etc.) """
+        symbol = self._format_symbol(instrument_id)
+        print(f"\n-> Requesting open orders{' for ' + symbol if symbol else ''}...")
+
+        params = {"category": "linear"}
+        if symbol:
+            params["symbol"] = symbol
+
+        result = self._request("GET", "/v5/order/realtime", params)
+        return self._format_open_orders(result)
+
+    def get_open_positions(self, instrument_id=None):
+        """ Fetches currently active positions """
+        symbol = self._format_symbol(instrument_id)
+        print(f"\n-> Requesting open positions{' for ' + symbol if symbol else ''}...")
+
+        params = {"category": "linear", "settleCoin": "USDT"}
+        if symbol:
+            params["symbol"] = symbol
+
+        result = self._request("GET", "/v5/position/list", params)
+        if str(result.get("retCode")) == "0":
+            self._remember_leverage(result.get("result", {}).get("list", []))
+        return self._format_open_positions(result)
+
     def get_available_balance(self, coin_pair):
         """
         Returns available (free) Quote Currency margin as a float from Bybit.
@@ -430,15 +1163,13 @@ class BybitTrader:
             if not coin_pair or coin_pair.lower() == "null":
                 return 0.0
 
-            # Extract quote currency (e.g., SOL-USDT -> USDT, or SOLUSDT -> USDT)
-            if '-' in coin_pair:
-                quote_currency = coin_pair.split('-')[1]
-            elif coin_pair.endswith('USDT'):
-                quote_currency = 'USDT'
-            elif coin_pair.endswith('USDC'):
-                quote_currency = 'USDC'
-            else:
-                quote_currency = coin_pair
+            quote_currency = self._quote_currency(coin_pair)
+
+            stream = self._fresh_stream()
+            if stream is not None:
+                cached = stream.get_available_balance(quote_currency)
+                if cached is not None:
+                    return cached
 
             print(f"\n-> Fetching balance for {quote_currency}...")
 
@@ -455,46 +1186,35 @@ class BybitTrader:
                 params["accountType"] = "CONTRACT"
                 result = self._request("GET", "/v5/account/wallet-balance", params)
 
-            # Process the response
-            if str(result.get("retCode")) == "0":
-                list_data = result.get("result", {}).get("list", [])
-
-                # If list_data is empty, the account exists but has 0 balance
-                if not list_data:
-                    return 0.0
-
-                account = list_data[0]
-                coins = account.get("coin", [])
-                # If coins array is empty, the specific coin has 0 balance
-                if not coins:
-                    return 0.0
-
-                # Find the specific coin and return its FREE balance (not total equity).
-                for c in coins:
-                    if c.get("coin") == quote_currency:
-                        # Prefer genuinely available margin; fall back through sensible fields.
-                        for field in ("availableToWithdraw", "availableBalance", "free"):
-                            val = c.get(field)
-                            if val not in (None, ""):
-                                return float(val)
-                        # Account-level free balance for cross-margin UNIFIED accounts.
-                        acct_avail = account.get("totalAvailableBalance")
-                        if acct_avail not in (None, ""):
-                            return float(acct_avail)
-                        # Last resort: total wallet equity (overstates free funds).
-                        return float(c.get("walletBalance", 0.0))
-
-                # If loop finishes and coin isn't found, balance is 0
-                return 0.0
-
-            # Could not determine balance -> signal failure rather than a misleading 0.0
-            print(f"❌ Error getting balance: {result.get('retMsg', result)}")
-            return None
+            return self._balance_from_result(result, quote_currency)
 
         except Exception as e:
             print(f"Exception inside get_available_balance: {e}")
             return None
 
+    def get_account_snapshot(self):
+        """
+        Fetches every USDT position and open order (one settleCoin query each) plus the free
+        USDT margin, as an AccountSnapshot. Served from the private stream when it is fresh.
+        Returns None if positions or orders cannot be fetched.
+        """
+        stream = self._fresh_stream()
+        if stream is not None:
+            return AccountSnapshot.from_stream(stream)
+
+        positions, result = self._request_all_pages(
+            "/v5/position/list", {"category": "linear", "settleCoin": "USDT"}, limit=200)
+        if positions is None:
+            print(f"   ⚠️ [Bybit] Could not fetch positions for snapshot: {result.get('retMsg')}")
+            return None
+        self._remember_leverage(positions)
+        orders, result = self._request_all_pages(
+            "/v5/order/realtime", {"category": "linear", "settleCoin": "USDT"}, limit=50)
+        if orders is None:
+            print(f"   ⚠️ [Bybit] Could not fetch open orders for snapshot: {result.get('retMsg')}")
+            return None
+        return AccountSnapshot(positions, orders, self.get_available_balance('USDT'))
+
     def close_all_orders_and_positions(self):
         """ Cancels all open orders and closes all active positions via market orders """
         print(f"\n🚨 Initiating full closure of all open orders and positions on Bybit...")
@@ -522,24 +1242,9 @@ class BybitTrader:
             else:
                 for pos in active_positions:
                     symbol = pos.get('symbol')
-                    current_side = pos.get('side')
-                    size = pos.get('size')
-
-                    # Determine opposite side to close
-                    close_side = "Sell" if current_side == "Buy" else "Buy"
-
-                    print(f"   - Closing {size} {symbol} ({current_side} position)...")
-
-                    close_params = {
-                        "category": "linear",
-                        "symbol": symbol,
-                        "side": close_side,
-                        "orderType": "Market",
-                        "qty": size,
-                        "reduceOnly": True # Critical: Ensures we only close the position, not open a new one
-                    }
+                    print(f"   - Closing {pos.get('size')} {symbol} ({pos.get('side')} position)...")
 
-                    close_req = self._request("POST", "/v5/order/create", close_params)
+                    close_req = self._request("POST", "/v5/order/create", self._close_position_params(pos))
                     if str(close_req.get("retCode")) == "0":
                         print(f"   ✅ Successfully closed {symbol}.")
                     else:
@@ -550,7 +1255,12 @@ class BybitTrader:
 # --- USAGE EXAMPLE / TEST ---
 if __name__ == "__main__":
     trader = BybitTrader(BYBIT_API_KEY, BYBIT_SECRET_KEY, is_demo=BYBIT_IS_DEMO)
+    if BYBIT_WS_ENABLED:
+        trader.start_private_stream()
     instrument_sol = 'SOL-USDT' # Will be automatically converted to 'SOLUSDT'
 
     print(trader.get_open_positions(instrument_sol))
     print(trader.get_open_orders(instrument_sol))
+    print(f"Connection stats: {trader.get_connection_stats()}")
+    print(f"Timing stats: {trader.get_timing_stats()}")
+    print(f"Leverage stats: {trader.get_leverage_stats()}")
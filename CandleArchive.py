@@ -0,0 +1,175 @@
+import os
+import threading
+
+import numpy as np
+
+from Config import CANDLE_ARCHIVE_DIR
+
+# Column files of one archive, in write order. The timestamp column is written last, so
+# its length is the number of complete rows even if a write was interrupted.
+COLUMNS = (("open", np.float64), ("high", np.float64), ("low", np.float64),
+           ("close", np.float64), ("volume", np.float64), ("timestamp", np.int64))
+
+
+class CandleArchive:
+    """
+    Append-only on-disk candle history for one (instrument, bar).
+
+    Every column is a fixed-width little-endian file (<root>/<instId>/<bar>/<column>.bin:
+    int64 ms timestamps, float64 OHLCV) that is read through np.memmap, so queries only touch
+    the pages they need and return zero-copy views. Rows are kept in strictly increasing
+    timestamp order; append() ignores candles that are not newer than the last stored one,
+    so the candle fetcher can hand over overlapping pages safely.
+    """
+
+    def __init__(self, instId, bar, root=CANDLE_ARCHIVE_DIR):
+        self.instId = instId
+        self.bar = bar
+        self.path = os.path.join(root, instId, bar)
+        os.makedirs(self.path, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._maps = None   # column -> np.memmap, rebuilt after appends
+        self._mapped = -1   # rows covered by _maps
+        self._rows = self._repair()
+
+    def _file(self, column):
+        return os.path.join(self.path, f"{column}.bin")
+
+    def _repair(self):
+        """ Truncates every column to the number of complete rows; returns that count. """
+        sizes = []
+        for column, dtype in COLUMNS:
+            name = self._file(column)
+            if not os.path.exists(name):
+                open(name, "wb").close()
+            sizes.append(os.path.getsize(name) // np.dtype(dtype).itemsize)
+        rows = min(sizes)
+        for (column, dtype), size in zip(COLUMNS, sizes):
+            if size != rows:
+                print(f"⚠️ [Archive] {self.instId} {self.bar}: truncating partial '{column}' column "
+                      f"({size} -> {rows} rows)")
+                os.truncate(self._file(column), rows * np.dtype(dtype).itemsize)
+        return rows
+
+    def __len__(self):
+        return self._rows
+
+    @property
+    def last_ts(self):
+        """ Timestamp (ms) of the newest stored candle, or None for an empty archive. """
+        if not self._rows:
+            return None
+        return int(self._columns()["timestamp"][-1])
+
+    def append(self, candles):
+        """
+        Appends candles (oldest first; (ts, o, h, l, c, v) tuples or an (N, 6) array).
+        Only candles newer than the last stored one are written. Returns the number written.
+        """
+        a = np.asarray(candles, dtype=np.float64).reshape(-1, 6)
+        if not len(a):
+            return 0
+        with self._lock:
+            ts = a[:, 0].astype(np.int64)
+            keep = np.r_[True, ts[1:] > ts[:-1]]  # drop out-of-order / duplicate rows in the batch
+            last = self.last_ts
+            if last is not None:
+                keep &= ts > last
+            if not keep.any():
+                return 0
+            a, ts = a[keep], ts[keep]
+            for index, (column, dtype) in enumerate(COLUMNS[:-1]):
+                with open(self._file(column), "ab") as f:
+                    f.write(np.ascontiguousarray(a[:, index + 1], dtype="<f8").tobytes())
+            with open(self._file("timestamp"), "ab") as f:
+                f.write(ts.astype("<i8").tobytes())
+            self._rows += len(ts)
+            return len(ts)
+
+    def _columns(self):
+        """ Read-only memmaps of all columns, remapped when rows were appended. """
+        if self._mapped != self._rows:
+            if self._rows:
+                self._maps = {column: np.memmap(self._file(column), dtype=np.dtype(dtype).newbyteorder("<"),
+                                                mode="r", shape=(self._rows,))
+                              for column, dtype in COLUMNS}
+            else:
+                self._maps = {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS}
+            self._mapped = self._rows
+        return self._maps
+
+    def range(self, start_ts=None, end_ts=None):
+        """
+        Columns of the candles with start_ts <= ts < end_ts (None = open ended) as a dict of
+        zero-copy views: timestamp, open, high, low, close, volume. The bounds are found by
+        binary search on the timestamp column, so only the selected pages are read.
+        """
+        with self._lock:
+            columns = self._columns()
+        ts = columns["timestamp"]
+        lo = 0 if start_ts is None else int(np.searchsorted(ts, start_ts, side="left"))
+        hi = len(ts) if end_ts is None else int(np.searchsorted(ts, end_ts, side="left"))
+        return {column: values[lo:hi] for column, values in columns.items()}
+
+    def rows(self, start_ts=None, end_ts=None):
+        """ Same selection as range() as an (N, 6) CandleStore-layout array (a copy). """
+        c = self.range(start_ts, end_ts)
+        return np.column_stack([c["timestamp"].astype(np.float64), c["open"], c["high"],
+                                c["low"], c["close"], c["volume"]])
+
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+
+def get_candle_archive(instId, bar, root=CANDLE_ARCHIVE_DIR):
+    """ Process-wide archive for (instId, bar), opened on first use. """
+    key = (root, instId, bar)
+    with _archives_lock:
+        archive = _archives.get(key)
+        if archive is None:
+            archive = _archives[key] = CandleArchive(instId, bar, root=root)
+        return archive
+
+
+def download_history(archive, since_ts, fetcher=None, page_limit=100):
+    """
+    Fills `archive` with confirmed candles from `since_ts` (ms) up to now, paging back from
+    the newest bar with OKX's history endpoint and appending oldest first. Stops early at the
+    archive's last stored candle. Returns the number of candles written, or None on failure.
+    """
+    if fetcher is None:
+        from CandleStore import okx_fetch_history_candles as fetcher
+
+    stop_ts = max(since_ts, (archive.last_ts or -1) + 1)
+    pages, after = [], None
+    while True:
+        page = fetcher(archive.instId, archive.bar, after=after, limit=page_limit)
+        if page is None:
+            return None
+        rows = [r for r in page if len(r) < 9 or str(r[8]) == "1"]
+        pages.append([r for r in rows if int(r[0]) >= stop_ts])
+        if len(page) < page_limit or not rows or int(page[-1][0]) <= stop_ts:
+            break
+        after = int(page[-1][0])
+        print(f"   [Archive] {archive.instId} {archive.bar}: fetched back to {after}...", end="\r")
+
+    candles = [(int(r[0]), float(r[1]), float(r[2]), float(r[3]), float(r[4]), float(r[5]))
+               for page in reversed(pages) for r in reversed(page)]
+    return archive.append(candles)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Download OKX candle history into the archive")
+    parser.add_argument("instId", help="e.g. SOL-USDT")
+    parser.add_argument("bar", help="e.g. 1m or 15m")
+    parser.add_argument("--days", type=float, default=30)
+    args = parser.parse_args()
+
+    archive = get_candle_archive(args.instId, args.bar)
+    written = download_history(archive, int((time.time() - args.days * 86400) * 1000))
+    print(f"\n✅ {args.instId} {args.bar}: +{written} candles, {len(archive)} stored in {archive.path}")
@@ -0,0 +1,268 @@
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+
+from Config import (
+    OKX_BASE_URL, OKX_CANDLE_HISTORY, OKX_CANDLE_PAGE_LIMIT, OKX_HTTP_RETRIES, CANDLE_ARCHIVE_ENABLED,
+    OKX_HTTP_DEADLINE, OKX_HTTP_ATTEMPT_TIMEOUT, CANDLE_ARCHIVE_DIR,
+)
+from RetryPolicy import call_with_retry
+
+# One stored candle: (ts_ms, open, high, low, close, volume)
+TS, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+# Bar lengths (ms) that can be built from 1m candles; OKX aligns these to the epoch.
+BAR_MS = {'1m': 60_000, '3m': 180_000, '5m': 300_000, '15m': 900_000, '30m': 1_800_000, '1H': 3_600_000}
+
+_session = requests.Session()
+_session.headers.update({"User-Agent": "LocalLLMTradingBot/1.0", "Accept": "application/json"})
+
+
+# OKX error codes worth retrying: service unavailable / timeout / rate limit / system busy.
+OKX_RETRYABLE_CODES = {"50001", "50004", "50011", "50013", "50026"}
+
+
+def okx_get(path, params=None, what="request", deadline=OKX_HTTP_DEADLINE, attempts=OKX_HTTP_RETRIES):
+    """
+    GETs an OKX REST path through the shared retry policy and the 'okx' circuit breaker.
+    HTTP 429/5xx and the OKX_RETRYABLE_CODES are retried within `deadline` seconds.
+    Returns the response's `data` list, or None if it could not be fetched (reason printed).
+    """
+    def attempt(timeout):
+        response = _session.get(f"{OKX_BASE_URL}{path}", params=params, timeout=timeout)
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        return response.json()
+
+    try:
+        payload = call_with_retry(
+            "okx", attempt, deadline, attempts=attempts, attempt_timeout=OKX_HTTP_ATTEMPT_TIMEOUT,
+            retry_result=lambda p: str(p.get("code", "0")) in OKX_RETRYABLE_CODES)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"❌ OKX {what} failed: {e}")
+        return None
+    if str(payload.get("code", "0")) != "0":
+        print(f"⚠️ OKX {what} error: {payload.get('msg')} (code {payload.get('code')})")
+        return None
+    return payload.get("data") or []
+
+
+def _fetch_candle_page(path, instId, bar, after, before, limit):
+    params = {"instId": instId, "bar": bar, "limit": str(limit)}
+    if after is not None:
+        params["after"] = str(after)
+    if before is not None:
+        params["before"] = str(before)
+    return okx_get(path, params, what=f"candles for {instId} {bar}")
+
+
+def okx_fetch_candles(instId, bar, after=None, before=None, limit=OKX_CANDLE_PAGE_LIMIT):
+    """
+    Default fetcher: one page of /api/v5/market/candles (newest first, OKX's raw rows).
+    `after` returns bars older than that ts, `before` bars newer than it.
+    Returns the list of rows, or None if the request kept failing.
+    """
+    return _fetch_candle_page("/api/v5/market/candles", instId, bar, after, before, limit)
+
+
+def okx_fetch_history_candles(instId, bar, after=None, before=None, limit=100):
+    """
+    Same as okx_fetch_candles on /api/v5/market/history-candles, which reaches back years
+    (max 100 rows per page, 20 requests / 2 s), for filling the CandleArchive.
+    """
+    rows = _fetch_candle_page("/api/v5/market/history-candles", instId, bar, after, before, limit)
+    time.sleep(0.1)  # stay under the endpoint's rate limit when paging
+    return rows
+
+
+class CandleStore:
+    """
+    Rolling candle history for one (instrument, bar).
+
+    Backfills up to `maxlen` confirmed candles once, then each update() asks OKX only for
+    bars newer than the last confirmed one (`before` cursor), so a cycle normally moves one
+    or two rows. The still-forming candle (confirm == "0") is kept apart as `live` and is
+    replaced on every update until OKX marks it confirmed. `fetcher` has the signature of
+    okx_fetch_candles and can be swapped for tests or other transports (`venue` names the
+    exchange the fetcher talks to). With an `archive` (CandleArchive), every newly confirmed
+    candle is also appended to disk.
+    """
+
+    def __init__(self, instId, bar, maxlen=OKX_CANDLE_HISTORY, fetcher=okx_fetch_candles,
+                 page_limit=OKX_CANDLE_PAGE_LIMIT, archive=None, venue="okx"):
+        self.instId = instId
+        self.bar = bar
+        self.venue = venue
+        self.maxlen = maxlen
+        self.fetcher = fetcher
+        self.page_limit = page_limit
+        self.archive = archive
+
+        self._lock = threading.Lock()
+        self.candles = deque(maxlen=maxlen)  # confirmed candles, oldest first
+        self.live = None                     # the unconfirmed candle, if any
+        self.updated_at = 0.0
+        self.synced_at = 0.0   # last successful REST update()
+        self.rows_fetched = 0  # raw rows received from the fetcher (payload size metric)
+        self.generation = 0    # bumped on every backfill; consumers replay the history when it changes
+
+    @staticmethod
+    def _parse(row):
+        """ OKX row -> (candle tuple, confirmed). """
+        candle = (int(row[0]), float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5]))
+        confirmed = len(row) < 9 or str(row[8]) == "1"
+        return candle, confirmed
+
+    @property
+    def last_confirmed_ts(self):
+        return self.candles[-1][TS] if self.candles else None
+
+    def _backfill(self):
+        """ Loads the newest `maxlen` candles, paging back with the `after` cursor. """
+        rows, after = [], None
+        wanted = self.maxlen + 1  # plus the live candle
+        while len(rows) < wanted:
+            limit = min(self.page_limit, wanted - len(rows))
+            page = self.fetcher(self.instId, self.bar, after=after, limit=limit)
+            if page is None:
+                return None
+            self.rows_fetched += len(page)
+            rows.extend(page)
+            if len(page) < limit:
+                break  # reached the start of the available history
+            after = int(page[-1][0])
+        self.candles.clear()
+        self.live = None
+        self.generation += 1
+        return rows
+
+    def update(self):
+        """
+        Brings the store up to date. Returns the number of newly confirmed candles,
+        or None if the fetch failed (the existing history is kept).
+        """
+        with self._lock:
+            if not self.candles:
+                rows = self._backfill()
+            else:
+                rows = self.fetcher(self.instId, self.bar, before=self.last_confirmed_ts, limit=self.page_limit)
+                if rows is not None:
+                    self.rows_fetched += len(rows)
+                    if len(rows) >= self.page_limit:
+                        # A full page may hide a gap (process was idle for long): start over.
+                        rows = self._backfill()
+            if rows is None:
+                return None
+            self.synced_at = time.time()
+            return self._apply(rows)
+
+    def _apply(self, rows):
+        """ Merges raw OKX rows (any order) into the confirmed history / live candle. """
+        added = []
+        parsed = sorted((self._parse(r) for r in rows), key=lambda item: item[0][TS])
+        for candle, confirmed in parsed:
+            last_ts = self.last_confirmed_ts
+            if last_ts is not None and candle[TS] <= last_ts:
+                continue
+            if confirmed:
+                self.candles.append(candle)
+                added.append(candle)
+            else:
+                self.live = candle
+        if self.live is not None and self.last_confirmed_ts is not None and self.live[TS] <= self.last_confirmed_ts:
+            self.live = None
+        self.updated_at = time.time()
+        if added and self.archive is not None:
+            try:
+                self.archive.append(added)
+            except OSError as e:
+                print(f"⚠️ [Archive] Could not write {self.instId} {self.bar} candles: {e}")
+        return len(added)
+
+    def apply_rows(self, rows):
+        """ Merges pushed rows (e.g. from a WebSocket feed) without any fetch. """
+        with self._lock:
+            if not self.candles:
+                return 0  # nothing to extend yet; the first update() backfills
+            return self._apply(rows)
+
+    def rows(self, include_live=True):
+        """ Snapshot of the candles, oldest first; the live candle is appended last if present. """
+        with self._lock:
+            rows = list(self.candles)
+            if include_live and self.live is not None:
+                rows.append(self.live)
+            return rows
+
+    def since(self, ts):
+        """ Confirmed candles newer than `ts` (all of them for None), oldest first. """
+        with self._lock:
+            if ts is None:
+                return list(self.candles)
+            newer = []
+            for candle in reversed(self.candles):
+                if candle[TS] <= ts:
+                    break
+                newer.append(candle)
+            return newer[::-1]
+
+    def __len__(self):
+        return len(self.candles) + (1 if self.live is not None else 0)
+
+
+def resample(rows, bar_ms):
+    """
+    Aggregates candles (oldest first; tuples or an (N, 6) array) into epoch-aligned `bar_ms`
+    bars with numpy reduceat. A leading bar that started before the history is dropped; the
+    trailing bar contains the live candle, so it is the live higher-timeframe candle.
+    Returns an (M, 6) float array with the same column layout.
+    """
+    import numpy as np
+
+    a = np.asarray(rows, dtype=np.float64)
+    if a.size == 0:
+        return a.reshape(0, 6)
+    ts = a[:, TS].astype(np.int64)
+    buckets = ts // bar_ms
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)]
+
+    out = np.column_stack([
+        buckets[starts] * bar_ms,
+        a[starts, OPEN],
+        np.maximum.reduceat(a[:, HIGH], starts),
+        np.minimum.reduceat(a[:, LOW], starts),
+        a[ends - 1, CLOSE],
+        np.add.reduceat(a[:, VOLUME], starts),
+    ]).astype(np.float64)
+    if ts[0] != buckets[0] * bar_ms:
+        out = out[1:]
+    return out
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_candle_store(instId, bar, maxlen=OKX_CANDLE_HISTORY, venue="okx", fetcher=None):
+    """
+    Process-wide store for (venue, instId, bar), created on first use. Stores of other venues
+    than OKX need their `fetcher`; their archives live under CANDLE_ARCHIVE_DIR/<venue>/.
+    """
+    key = (venue, instId, bar)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            archive = None
+            if CANDLE_ARCHIVE_ENABLED:
+                from CandleArchive import get_candle_archive
+                if venue == "okx":
+                    archive = get_candle_archive(instId, bar)
+                else:
+                    archive = get_candle_archive(instId, bar, root=os.path.join(CANDLE_ARCHIVE_DIR, venue))
+            store = _stores[key] = CandleStore(instId, bar, maxlen=maxlen, fetcher=fetcher or okx_fetch_candles,
+                                               archive=archive, venue=venue)
+        return store
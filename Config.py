@@ -3,3 +3,91 @@
 api_key = "YOUR_API_KEY"
 secret_key = "YOUR_SECRET_KEY"
 passphrase = "YOUR_PASSPHRASE"
+
+# --- Risk-management parameters (ATR-based), used by ParseFuncLLM and Backtest ---
+SL_MULTIPLIER = 2.0  # Stop-loss = 2 * ATR
+TP_MULTIPLIER = 3.0  # Take-profit = 3 * ATR (Risk/Reward 1:1.5)
+LONG_ENTRY_MULTIPLIER = 0.996   # Place long limit ~0.4% below market (maker side)
+SHORT_ENTRY_MULTIPLIER = 1.004  # Place short limit ~0.4% above market (maker side)
+
+# --- Market data venue (MarketData.py) ---
+# "okx": prices/candles from OKX (REST + optional WebSocket), orders on Bybit.
+# "bybit": prices/candles from Bybit's own linear book over the trader's pooled session, so a
+# cycle talks to one venue and entries are priced from the book they are placed on.
+MARKET_DATA_VENUE = "okx"
+
+# --- OKX market data ---
+OKX_BASE_URL = "https://www.okx.com"
+
+# Confirmed candles kept per (instrument, bar); backfilled once, then extended incrementally.
+OKX_CANDLE_HISTORY = 300
+
+# Rows per /api/v5/market/candles request (OKX maximum is 300).
+OKX_CANDLE_PAGE_LIMIT = 300
+
+# Attempts per OKX REST request, and the total seconds one call may take including retries
+# and backoff (each attempt is also capped at OKX_HTTP_ATTEMPT_TIMEOUT).
+OKX_HTTP_RETRIES = 4
+OKX_HTTP_DEADLINE = 20
+OKX_HTTP_ATTEMPT_TIMEOUT = 10
+
+# --- Retry / circuit breaker (RetryPolicy.py), shared by OKX, Bybit and Telegram calls ---
+HTTP_RETRY_BASE_DELAY = 0.5   # backoff before retry n is uniform(0, base * 2**n) ...
+HTTP_RETRY_MAX_DELAY = 4.0    # ... capped at this many seconds
+BREAKER_FAILURE_THRESHOLD = 5  # consecutive failed attempts before a host fails fast
+BREAKER_RESET_SECONDS = 30     # how long it fails fast before one trial request is let through
+
+# --- OKX public WebSocket (optional) ---
+# When enabled, prices and candles are pushed over WebSocket and REST is only the fallback.
+OKX_WS_ENABLED = False
+OKX_WS_PUBLIC_URL = "wss://ws.okx.com:8443/ws/v5/public"      # tickers
+OKX_WS_BUSINESS_URL = "wss://ws.okx.com:8443/ws/v5/business"  # candles
+
+# Candle bars subscribed up front for the trading coin (others are subscribed on first use).
+OKX_WS_BARS = ['15m']
+
+# Pushed data older than this many seconds is ignored and REST is used instead.
+OKX_WS_STALE_SECONDS = 30
+
+# Seconds between text "ping" frames (OKX drops connections idle for 30 s).
+OKX_WS_PING_INTERVAL = 20
+
+# 1m candles kept per instrument; higher bars that fit in this history are resampled locally
+# instead of being fetched (1440 = one day covers 5m/15m/30m prompts plus indicator warm-up).
+OKX_CANDLE_HISTORY_1M = 1440
+OKX_RESAMPLE_FROM_1M = True
+
+# Extra bars fetched/resampled before the first row shown, so EMA50/RSI/ATR are warmed up.
+OKX_INDICATOR_WARMUP = 50
+
+# --- Multi-symbol scanner (algomain) ---
+# When enabled, algomain ranks USDT swaps from one bulk tickers call instead of trading
+# only coin_config.txt, and sends the top candidates to the LLM.
+SCANNER_ENABLED = False
+SCANNER_UNIVERSE_SIZE = 50          # most liquid swaps (24h quote volume) that get candles/indicators
+SCANNER_MIN_QUOTE_VOLUME = 5_000_000  # USDT traded in 24h to be considered at all
+SCANNER_TOP_K = 3                   # candidates analysed by the LLM per cycle
+SCANNER_WORKERS = 8                 # parallel candle fetches (OKX allows 40 candle requests / 2 s)
+
+# --- Candle archive (CandleArchive.py) ---
+# Confirmed candles of every CandleStore are appended to memory-mapped column files under
+# CANDLE_ARCHIVE_DIR/<instId>/<bar>/ for research and backtests.
+CANDLE_ARCHIVE_ENABLED = False
+CANDLE_ARCHIVE_DIR = "candle_archive"
+
+# --- Decision log / backtest ---
+# When enabled, every final LLM answer (after the guardrails) is appended to
+# data/decisions.jsonl with its candle timestamp, so Backtest.py can replay it.
+DECISION_LOG_ENABLED = False
+BACKTEST_MAKER_FEE = 0.0002   # limit entries
+BACKTEST_TAKER_FEE = 0.00055  # SL/TP exits (market on trigger)
+
+# --- Decision cache ---
+# HInfoSend reuses the LLM's answer while the quantized market state is unchanged:
+# same coin, trend, RSI band, extension / volume buckets and position state.
+DECISION_CACHE_ENABLED = True
+DECISION_CACHE_TTL = 900            # seconds an answer stays valid (one 15m bar)
+DECISION_CACHE_MAX_ENTRIES = 256    # LRU bound
+DECISION_CACHE_RSI_STEP = 5         # RSI band width
+DECISION_CACHE_EXTENSION_STEP = 0.25  # % from EMA10 per bucket
+DECISION_CACHE_VOL_STEP = 0.5       # volume ratio per bucket
@@ -0,0 +1,104 @@
+import json
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from Config import (
+    DECISION_CACHE_TTL, DECISION_CACHE_MAX_ENTRIES, DECISION_CACHE_RSI_STEP,
+    DECISION_CACHE_EXTENSION_STEP, DECISION_CACHE_VOL_STEP,
+)
+
+VALID_ACTIONS = ("BUY", "SELL", "WAIT")
+
+
+def _bucket(value, step):
+    return math.floor(value / step) if step else value
+
+
+def position_state(snapshot, instId):
+    """ 'long', 'short', 'order' (resting order only) or 'flat' for instId; None if unknown. """
+    if snapshot is None:
+        return None
+    side = snapshot.position_side(instId)
+    if side is not None:
+        return "long" if side == "Buy" else "short"
+    return "order" if snapshot.has_open_order(instId) else "flat"
+
+
+def decision_key(instId, state, position, rsi_step=DECISION_CACHE_RSI_STEP,
+                 extension_step=DECISION_CACHE_EXTENSION_STEP, vol_step=DECISION_CACHE_VOL_STEP):
+    """
+    Cache key for a SignalRules state: coin, trend label, RSI band, extension and volume
+    ratio buckets, and position state. Two cycles with the same key would show the LLM
+    materially the same market.
+    """
+    return (instId, state["trend"], _bucket(state["rsi"], rsi_step),
+            _bucket(state["extension_pct"], extension_step), _bucket(state["vol_ratio"], vol_step), position)
+
+
+def _decision_action(answer):
+    """ The action of a JSON decision answer, or None if it is not one (e.g. an error string). """
+    match = re.search(r'\{.*\}', answer or "", re.DOTALL)
+    if not match:
+        return None
+    try:
+        action = str(json.loads(match.group(0)).get("action", "")).upper()
+    except (ValueError, AttributeError):
+        return None
+    return action if action in VALID_ACTIONS else None
+
+
+class DecisionCache:
+    """
+    LRU cache of raw LLM decision answers with a TTL. Entries expire `ttl` seconds after
+    they were stored; beyond `max_entries` the least recently used entry is evicted.
+    """
+
+    def __init__(self, ttl=DECISION_CACHE_TTL, max_entries=DECISION_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (stored_at, answer)
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "stored": 0}
+
+    def get(self, key):
+        """ The cached answer for `key`, or None (counted as a miss). """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.metrics["expired"] += 1
+                entry = None
+            if entry is None:
+                self.metrics["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.metrics["hits"] += 1
+            return entry[1]
+
+    def put(self, key, answer):
+        """ Stores a decision answer; answers without a valid JSON action are not cached. """
+        if _decision_action(answer) is None:
+            return False
+        with self._lock:
+            self._entries[key] = (time.monotonic(), answer)
+            self._entries.move_to_end(key)
+            self.metrics["stored"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.metrics["evicted"] += 1
+        return True
+
+    def snapshot(self):
+        with self._lock:
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return dict(self.metrics, size=len(self._entries),
+                        hit_rate=round(self.metrics["hits"] / lookups, 3) if lookups else None)
+
+    def format_stats(self):
+        m = self.snapshot()
+        rate = "n/a" if m["hit_rate"] is None else f"{m['hit_rate'] * 100:.0f}%"
+        return (f"decision cache: {m['hits']} hits / {m['misses']} misses ({rate}), "
+                f"{m['size']} entries, {m['expired']} expired, {m['evicted']} evicted")
@@ -1,10 +1,13 @@
-import requests
-import pandas as pd
-from ta.momentum import RSIIndicator
-from ta.trend import EMAIndicator
-from ta.volatility import AverageTrueRange
-import time
-pd.set_option("display.max_rows", None)
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from CandleStore import get_candle_store, resample, okx_get, BAR_MS
+from Indicators import IndicatorEngine
+from IndicatorKernels import compute_indicators, INDICATOR_COLUMNS
+from OkxMarketStream import OkxMarketStream
+from Config import (
+    OKX_WS_BARS, OKX_WS_PUBLIC_URL, OKX_WS_BUSINESS_URL,
+    OKX_CANDLE_HISTORY, OKX_CANDLE_HISTORY_1M, OKX_RESAMPLE_FROM_1M, OKX_INDICATOR_WARMUP,
+)
 
 def human_format(num):
     """
@@ -19,116 +22,199 @@ def human_format(num):
         num /= 1000.0
     return '{}{}'.format('{:f}'.format(num).rstrip('0').rstrip('.'), ['', 'K', 'M', 'B', 'T'][magnitude])
 
-def get_okx_market_data(instId='BTC-USDT'):
-    print(f"Fetching candlestick info for {instId}...")
-    intervals = ['15m']
-    market_data = {}
+# Optional OKX public WebSocket feed (see start_okx_market_stream); None means REST only.
+_market_stream = None
+
+
+def start_okx_market_stream(instIds=(), bars=OKX_WS_BARS, public_url=OKX_WS_PUBLIC_URL,
+                            business_url=OKX_WS_BUSINESS_URL):
+    """
+    Starts the WebSocket feed and pre-subscribes tickers and `bars` candles for `instIds`.
+    Other instruments/bars are subscribed on first use. Returns the stream.
+    """
+    global _market_stream
+    if _market_stream is None:
+        _market_stream = OkxMarketStream(public_url=public_url, business_url=business_url)
+    for instId in instIds:
+        _market_stream.subscribe_ticker(instId)
+        for bar in bars:
+            _market_stream.subscribe_candles(instId, bar)
+    _market_stream.start()
+    return _market_stream
+
+
+def _refresh_store(store):
+    """ Skips the REST poll when the WebSocket has kept the store current since its last sync. """
+    stream = _market_stream
+    if stream is not None and store.venue == "okx":
+        stream.subscribe_candles(store.instId, store.bar)
+        if store.synced_at and stream.candles_fresh(store.instId, store.bar, store.synced_at):
+            return True
+    return store.update() is not None
 
-    for interval in intervals:
-        url = f"https://www.okx.com/api/v5/market/candles?instId={instId}&bar={interval}"
 
-        # --- RETRY ---
-        max_retries = 10
-        for attempt in range(max_retries):
-            try:
-                response = requests.get(url, timeout=15)
-                response.raise_for_status()
-                break
-            except requests.exceptions.RequestException as e:
-                print(f"⚠️ Network error (Attempt {attempt+1}/{max_retries}): {e}")
-                time.sleep(2)
-                if attempt == max_retries - 1:
-                    print(f"❌ Failed to get data for {instId} after retries.")
-                    return {}
-        # ---------------------------------------
+FRAME_COLUMNS = ['high', 'low', 'close', 'volume'] + INDICATOR_COLUMNS
 
-        if response.status_code == 200:
-            data = response.json().get('data')
-            if not data:
-                continue
 
-            columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'volCcy', 'volCcyQuote', 'confirm']
-            df = pd.DataFrame(data, columns=columns)
+def _indicator_arrays(rows):
+    """
+    Column arrays (timestamp, high/low/close/volume + indicators) for candle rows, with the
+    indicator warm-up rows dropped. NumPy only; see as_frame() for a DataFrame.
+    """
+    a = np.asarray(rows, dtype=np.float64).reshape(-1, 6)
+    high, low, close, volume = (np.ascontiguousarray(a[:, i]) for i in range(2, 6))
+    columns = {"timestamp": a[:, 0].astype(np.int64), "high": high, "low": low, "close": close, "volume": volume}
+    columns.update(compute_indicators(high, low, close, volume))
+
+    # Same rows df.dropna() kept: every indicator past its warm-up.
+    valid = np.logical_and.reduce([np.isfinite(columns[c]) for c in INDICATOR_COLUMNS])
+    return {name: values[valid] for name, values in columns.items()}
 
-            df = df[['timestamp', 'high', 'low', 'close', 'volume']]
-            df['timestamp'] = pd.to_numeric(df['timestamp'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
 
-            for col in ['high', 'low', 'close', 'volume']:
-                df[col] = pd.to_numeric(df[col])
+def as_frame(arrays):
+    """ DataFrame indexed by timestamp from _indicator_arrays() output (imports pandas lazily). """
+    import pandas as pd
+    df = pd.DataFrame({c: arrays[c] for c in FRAME_COLUMNS},
+                      index=pd.to_datetime(arrays["timestamp"], unit='ms'))
+    df.index.name = 'timestamp'
+    return df
 
-            df.set_index('timestamp', inplace=True)
-            df = df.iloc[::-1]
 
-            # Индикаторы
-            rsi_ind = RSIIndicator(close=df["close"], window=14)
-            df["RSI"] = rsi_ind.rsi()
+def _can_resample(bar, rows):
+    """ True if `rows` bars of `bar` (plus indicator warm-up) fit in the 1m history. """
+    if not OKX_RESAMPLE_FROM_1M or bar == '1m' or bar not in BAR_MS:
+        return False
+    needed_minutes = (rows + OKX_INDICATOR_WARMUP + 1) * BAR_MS[bar] // BAR_MS['1m']
+    return needed_minutes <= OKX_CANDLE_HISTORY_1M
 
-            ema_ind = EMAIndicator(close=df["close"], window=50)
-            df["EMA_50"] = ema_ind.ema_indicator()
 
-            # Добавляем быструю EMA для отслеживания перегретости
-            ema_ind_10 = EMAIndicator(close=df["close"], window=10)
-            df["EMA_10"] = ema_ind_10.ema_indicator()
+def get_okx_market_data(instId='BTC-USDT', data_config=None, as_frame_output=True):
+    """
+    Returns {bar: DataFrame} with the last N rows per bar as configured by `data_config`
+    ({'1m': 80, '5m': 20, ...}; defaults to the Telegram /setdata settings).
+    With as_frame_output=False each bar is a dict of NumPy column arrays and pandas is
+    never imported.
+
+    Bars that fit in the 1m history are resampled locally from one 1m store; the rest are
+    fetched from OKX. All stores are refreshed concurrently, so several timeframes take
+    about as long as one. Bars that could not be fetched are left out.
+    """
+    if data_config is None:
+        from TelegramInteract import get_data_config
+        data_config = get_data_config()
 
-            atr_ind = AverageTrueRange(high=df["high"], low=df["low"], close=df["close"], window=14)
-            df["ATR"] = atr_ind.average_true_range()
+    print(f"Fetching candlestick info for {instId}...")
+    resampled = [bar for bar, rows in data_config.items() if _can_resample(bar, rows)]
+    sources = {bar for bar in data_config if bar not in resampled}
+    if resampled:
+        sources.add('1m')
 
-            # Добавляем средний объем за 20 свечей для поиска аномалий
-            df["Vol_SMA_20"] = df["volume"].rolling(window=20).mean()
+    stores = {bar: get_candle_store(instId, bar, maxlen=OKX_CANDLE_HISTORY_1M if bar == '1m' else OKX_CANDLE_HISTORY)
+              for bar in sources}
+    # The stores backfill once and afterwards only pull bars newer than the last confirmed one.
+    with ThreadPoolExecutor(max_workers=len(stores) or 1) as pool:
+        refreshed = dict(zip(stores, pool.map(_refresh_store, stores.values())))
 
-            df.dropna(inplace=True)
-            market_data[interval] = df.tail(50)
+    market_data = {}
+    for bar, rows in data_config.items():
+        source = '1m' if bar in resampled else bar
+        if not refreshed.get(source):
+            print(f"❌ Failed to get {bar} data for {instId}.")
+            continue
+
+        candles = stores[source].rows()
+        if bar in resampled:
+            candles = resample(candles, BAR_MS[bar])
+        if len(candles) == 0:
+            continue
+        arrays = {name: values[len(values) - min(rows, len(values)):]
+                  for name, values in _indicator_arrays(candles).items()}
+        market_data[bar] = as_frame(arrays) if as_frame_output else arrays
 
     return market_data
 
 
-def get_okx_current_price(instId='BTC-USDT'):
-    """
-    Fetches the current price of a trading pair from the OKX API.
+_engines = {}  # CandleStore -> (store generation, IndicatorEngine)
 
-    Args:
-        instId (str): The instrument ID (e.g., 'BTC-USDT').
 
-    Returns:
-        str: The last traded price as a string, or None if it could not be fetched.
+def latest_features(store):
+    """
+    Last-row features of a CandleStore (any venue), refreshed first. Only candles confirmed
+    since the previous call are fed to the store's persistent IndicatorEngine and the live
+    candle is evaluated tentatively. Returns a dict, or None (fetch failed / warming up).
     """
-    url = f"https://www.okx.com/api/v5/market/ticker?instId={instId}"
+    if not _refresh_store(store):
+        print(f"❌ Failed to get data for {store.instId}.")
+        return None
 
-    headers = {
-        "User-Agent": "LocalLLMTradingBot/1.0",
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "Connection": "close"
-    }
+    generation, engine = _engines.get(store, (None, None))
+    if engine is None or generation != store.generation:
+        # First call or the store re-backfilled (gap): replay the whole history once.
+        engine = IndicatorEngine()
+        _engines[store] = (store.generation, engine)
 
-    for i in range(3):
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
+    for candle in store.since(engine.last_ts):
+        engine.update(candle)
 
-            if response.status_code == 200:
-                data = response.json().get('data')
-                if data:
-                    return data[0]['last']
+    live = store.live
+    features = engine.peek(live) if live is not None else engine.last
+    if not IndicatorEngine.is_ready(features):
+        print(f"⚠️ Not enough {store.bar} history for {store.instId} indicators yet.")
+        return None
+    return features
 
-            # If status isn't 200, wait a second and retry
-            time.sleep(1)
 
-        except requests.exceptions.RequestException as e:
-            print(f"Network/Timeout error (Attempt {i+1}/3): {e}")
-            time.sleep(2)
+def get_okx_latest_features(instId='BTC-USDT', bar='15m'):
+    """
+    Last-row features (close, volume, RSI, EMA_50, EMA_10, ATR, Vol_SMA_20, ...) for the
+    newest candle, i.e. get_okx_market_data(instId)[bar].iloc[-1] as a dict, without building
+    a DataFrame (see latest_features). (Once the store starts dropping old candles the engine
+    keeps its longer warm-up, so EMA values may differ from a recomputation over the trimmed
+    window in the last decimals.)
+    Returns a dict, or None if the data could not be fetched or is still warming up.
+    """
+    return latest_features(get_candle_store(instId, bar))
+
 
-        except Exception as e:
-            print(f"Unexpected error: {e}")
-            time.sleep(1)
+def get_okx_current_price(instId='BTC-USDT'):
+    """
+    Fetches the current price of a trading pair from the OKX API.
+    Served from the WebSocket ticker when the market stream is running and fresh.
 
+    Args:
+        instId (str): The instrument ID (e.g., 'BTC-USDT').
+
+    Returns:
+        str: The last traded price as a string, or None if it could not be fetched.
+    """
+    stream = _market_stream
+    if stream is not None:
+        stream.subscribe_ticker(instId)
+        price = stream.get_price(instId)
+        if price is not None:
+            return price
+
+    # Short deadline: a stale cycle is worse than a skipped one.
+    data = okx_get("/api/v5/market/ticker", {"instId": instId}, what=f"ticker for {instId}", deadline=10)
+    if data:
+        return data[0]['last']
     # Signal failure explicitly so callers don't trade on a bogus 0.0 price.
     return None
 
+def get_okx_tickers(instType='SWAP'):
+    """
+    All tickers of an instrument type in one call (/api/v5/market/tickers).
+    Returns OKX's list of ticker dicts, or None if it could not be fetched.
+    """
+    return okx_get("/api/v5/market/tickers", {"instType": instType}, what=f"{instType} tickers") or None
+
 # --- Example Usage ---
 if __name__ == '__main__':
+    import pandas as pd
+    pd.set_option("display.max_rows", None)
+
     # Get and display candlestick data
-    btc_market_data = get_okx_market_data('BTC-USDT')
+    btc_market_data = get_okx_market_data('BTC-USDT', {'1m': 80, '5m': 20, '15m': 15, '1H': 18})
     for timeframe, data in btc_market_data.items():
         print(f"\n--- {timeframe} Data ---")
         if isinstance(data, pd.DataFrame):
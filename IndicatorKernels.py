@@ -0,0 +1,99 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+INDICATOR_COLUMNS = ['RSI', 'EMA_50', 'EMA_10', 'ATR', 'Vol_SMA_20']
+
+
+def okx_to_arrays(data):
+    """
+    Parses an OKX candles `data` array (newest first, strings) into contiguous oldest-first
+    arrays: timestamp (int64 ms), open/high/low/close/volume (float64) and confirm (bool).
+    """
+    if not data:
+        empty = np.empty(0, dtype=np.float64)
+        return {"timestamp": np.empty(0, dtype=np.int64), "open": empty, "high": empty,
+                "low": empty, "close": empty, "volume": empty, "confirm": np.empty(0, dtype=bool)}
+    raw = np.array(data, dtype=object)[::-1]
+    values = np.ascontiguousarray(raw[:, 1:6].astype(np.float64).T)
+    confirm = raw[:, 8] == "1" if raw.shape[1] > 8 else np.ones(len(raw), dtype=bool)
+    return {
+        "timestamp": raw[:, 0].astype(np.int64),
+        "open": values[0], "high": values[1], "low": values[2], "close": values[3], "volume": values[4],
+        "confirm": confirm.astype(bool),
+    }
+
+
+def ewm_mean(values, alpha, min_periods):
+    """
+    pandas `ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean()` for a NaN-free
+    series. The recursion is inherently sequential, so it runs over a plain float list with
+    the same arithmetic as pandas' kernel (bit-identical results).
+    """
+    out = []
+    weighted = None
+    old_wt = 1.0 - alpha
+    for x in values.tolist():
+        if weighted is None:
+            weighted = x
+        elif weighted != x:
+            weighted = (old_wt * weighted + alpha * x) / (old_wt + alpha)
+        out.append(weighted)
+    result = np.array(out, dtype=np.float64)
+    result[:min_periods - 1] = np.nan
+    return result
+
+
+def ema(close, window):
+    """ ta.trend.EMAIndicator(close, window).ema_indicator() """
+    return ewm_mean(close, 2 / (window + 1), window)
+
+
+def rsi(close, window=14):
+    """ ta.momentum.RSIIndicator(close, window).rsi() """
+    diff = np.diff(close, prepend=np.nan)
+    up = np.where(diff > 0, diff, 0.0)
+    down = np.where(diff < 0, -diff, 0.0)
+    ema_up = ewm_mean(up, 1 / window, window)
+    ema_down = ewm_mean(down, 1 / window, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(ema_down == 0, 100.0, 100 - (100 / (1 + ema_up / ema_down)))
+
+
+def true_range(high, low, close):
+    prev_close = np.r_[np.nan, close[:-1]]
+    # fmax ignores the NaN previous close of the first bar, like ta's max(axis=1).
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def atr(high, low, close, window=14):
+    """ ta.volatility.AverageTrueRange(...).average_true_range(), NaN (not 0) during warm-up. """
+    tr = true_range(high, low, close)
+    out = np.full(len(tr), np.nan)
+    if len(tr) < window:
+        return out
+    value = tr[:window].mean()
+    values = [value]
+    for x in tr[window:].tolist():
+        value = (value * (window - 1) + x) / float(window)
+        values.append(value)
+    out[window - 1:] = values
+    return out
+
+
+def rolling_mean(values, window):
+    """ Series.rolling(window).mean() """
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = sliding_window_view(values, window).mean(axis=1)
+    return out
+
+
+def compute_indicators(high, low, close, volume):
+    """ RSI14 / EMA50 / EMA10 / ATR14 / 20-bar volume SMA as arrays aligned with the input. """
+    return {
+        "RSI": rsi(close, 14),
+        "EMA_50": ema(close, 50),
+        "EMA_10": ema(close, 10),
+        "ATR": atr(high, low, close, 14),
+        "Vol_SMA_20": rolling_mean(volume, 20),
+    }
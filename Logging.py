@@ -1,21 +1,25 @@
+import json
 import os
 from datetime import datetime
 import sys
 
+def _data_directory():
+    """ The 'data' folder next to the script (or the frozen executable), created on demand. """
+    if getattr(sys, 'frozen', False):
+        script_dir = os.path.dirname(sys.executable)
+    else:
+        script_dir = os.path.dirname(os.path.realpath(__file__))
+    data_directory = os.path.join(script_dir, "data")
+    os.makedirs(data_directory, exist_ok=True)
+    return data_directory
+
 def log_message(message):
     """
     Appends a timestamped message to a log file inside a 'data' subdirectory.
     The 'data' folder is created in the same directory as the script.
     """
     try:
-        if getattr(sys, 'frozen', False):
-            script_dir = os.path.dirname(sys.executable)
-        else:
-            script_dir = os.path.dirname(os.path.realpath(__file__))
-        data_directory = os.path.join(script_dir, "data")
-        os.makedirs(data_directory, exist_ok=True)
-
-        log_file_path = os.path.join(data_directory, 'trading_bot.log')
+        log_file_path = os.path.join(_data_directory(), 'trading_bot.log')
 
         timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         with open(log_file_path, 'a') as f:
@@ -23,3 +27,14 @@ def log_message(message):
 
     except Exception as e:
         print(f"Error: Could not write to log file. {e}")
+
+def log_decision(record):
+    """
+    Appends one decision record (a JSON-serialisable dict) as a line to data/decisions.jsonl,
+    the file Backtest.py replays.
+    """
+    try:
+        with open(os.path.join(_data_directory(), 'decisions.jsonl'), 'a') as f:
+            f.write(json.dumps(record) + "\n")
+    except Exception as e:
+        print(f"Error: Could not write decision log. {e}")
@@ -0,0 +1,131 @@
+from CandleStore import get_candle_store, BAR_MS
+from Config import MARKET_DATA_VENUE, OKX_CANDLE_PAGE_LIMIT, OKX_WS_ENABLED
+from Get_market import (
+    get_okx_current_price, get_okx_latest_features, get_okx_tickers, start_okx_market_stream,
+    latest_features,
+)
+
+# Bot bar names -> Bybit kline intervals
+BYBIT_INTERVALS = {'1m': '1', '3m': '3', '5m': '5', '15m': '15', '30m': '30', '1H': '60'}
+
+
+class OkxMarketData:
+    """
+    Market data from OKX (REST + optional public WebSocket). Every source offers the same
+    methods: get_current_price, get_latest_features, get_swap_tickers and start_stream.
+    """
+
+    venue = "okx"
+
+    def get_current_price(self, instId):
+        """ Last price as a string, or None. """
+        return get_okx_current_price(instId)
+
+    def get_latest_features(self, instId, bar='15m'):
+        """ Last-row indicator features dict (see Get_market.latest_features), or None. """
+        return get_okx_latest_features(instId, bar)
+
+    def get_swap_tickers(self):
+        """ USDT perpetuals as [(instId 'SOL-USDT', last price str, 24h quote volume)], or None. """
+        tickers = get_okx_tickers('SWAP')
+        if tickers is None:
+            return None
+        swaps = []
+        for t in tickers:
+            inst = t.get("instId", "")
+            if not inst.endswith("-USDT-SWAP"):
+                continue
+            try:
+                # volCcy24h is in base coin for swaps
+                swaps.append((inst[:-len("-SWAP")], t["last"], float(t.get("volCcy24h") or 0) * float(t["last"])))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return swaps
+
+    def start_stream(self, instIds):
+        if OKX_WS_ENABLED:
+            print("Starting OKX market data stream...")
+            start_okx_market_stream(instIds)
+
+
+class BybitMarketData:
+    """
+    Market data from Bybit's linear perpetuals (/v5/market/kline, /v5/market/tickers) over the
+    trader's pooled session, so decisions are priced from the book the orders go to and a
+    cycle talks to a single venue. Candles use the same CandleStore/IndicatorEngine pipeline
+    as OKX (rows are converted to OKX's layout).
+    """
+
+    venue = "bybit"
+
+    def __init__(self, trader):
+        self.trader = trader
+
+    def fetch_candles(self, instId, bar, after=None, before=None, limit=OKX_CANDLE_PAGE_LIMIT):
+        """
+        CandleStore fetcher: one kline page as OKX-style rows (newest first, with a confirm
+        column derived from Bybit's clock). `after`/`before` keep OKX's exclusive semantics.
+        Returns the rows, or None on failure.
+        """
+        interval = BYBIT_INTERVALS.get(bar)
+        if interval is None:
+            print(f"❌ Bar {bar} is not supported on Bybit.")
+            return None
+        result = self.trader.get_kline(
+            instId, interval, start=None if before is None else int(before) + 1,
+            end=None if after is None else int(after) - 1, limit=limit)
+        if str(result.get("retCode")) != "0":
+            print(f"⚠️ Bybit kline error for {instId} {bar}: {result.get('retMsg')}")
+            return None
+
+        now = int(self.trader._server_timestamp())
+        rows = []
+        for ts, open_, high, low, close, volume, turnover in result.get("result", {}).get("list", []):
+            confirmed = int(ts) + BAR_MS[bar] <= now
+            rows.append([ts, open_, high, low, close, volume, turnover, turnover, "1" if confirmed else "0"])
+        return rows
+
+    def get_current_price(self, instId):
+        result = self.trader.get_tickers(instId)
+        if str(result.get("retCode")) == "0":
+            tickers = result.get("result", {}).get("list", [])
+            if tickers and tickers[0].get("lastPrice"):
+                return tickers[0]["lastPrice"]
+        print(f"❌ Bybit ticker unavailable for {instId}: {result.get('retMsg')}")
+        return None
+
+    def get_latest_features(self, instId, bar='15m'):
+        store = get_candle_store(instId, bar, venue=self.venue, fetcher=self.fetch_candles)
+        return latest_features(store)
+
+    def get_swap_tickers(self):
+        result = self.trader.get_tickers()
+        if str(result.get("retCode")) != "0":
+            print(f"❌ Bybit tickers unavailable: {result.get('retMsg')}")
+            return None
+        swaps = []
+        for t in result.get("result", {}).get("list", []):
+            symbol = t.get("symbol", "")
+            if not symbol.endswith("USDT"):
+                continue
+            try:
+                swaps.append((f"{symbol[:-4]}-USDT", t["lastPrice"], float(t.get("turnover24h") or 0)))
+            except (KeyError, TypeError, ValueError):
+                continue
+        return swaps
+
+    def start_stream(self, instIds):
+        # Prices and candles are polled over the pooled REST session; positions/orders may
+        # still stream through the private Bybit WebSocket (BYBIT_WS_ENABLED).
+        pass
+
+
+def get_market_data(trader=None, venue=MARKET_DATA_VENUE):
+    """ The market-data source configured for this deployment (MARKET_DATA_VENUE). """
+    if venue == "bybit":
+        if trader is None:
+            raise ValueError("Bybit market data needs the BybitTrader whose session it reuses")
+        return BybitMarketData(trader)
+    if venue != "okx":
+        raise ValueError(f"Unknown MARKET_DATA_VENUE: {venue!r} (expected 'okx' or 'bybit')")
+    return OkxMarketData()
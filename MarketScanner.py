@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from MarketData import OkxMarketData
+from SignalRules import signal_state, candidate_score, allowed_actions
+from Config import (
+    SCANNER_UNIVERSE_SIZE, SCANNER_MIN_QUOTE_VOLUME, SCANNER_TOP_K, SCANNER_WORKERS,
+)
+
+
+def select_universe(swaps, size=SCANNER_UNIVERSE_SIZE, min_quote_volume=SCANNER_MIN_QUOTE_VOLUME):
+    """
+    Most liquid USDT perpetuals from a source's get_swap_tickers() list of
+    (instId, last price str, 24h quote volume). Returns the top `size` of them.
+    """
+    universe = []
+    for instId, last, quote_volume in swaps:
+        try:
+            if float(last) > 0 and quote_volume >= min_quote_volume:
+                universe.append((instId, last, quote_volume))
+        except (TypeError, ValueError):
+            continue
+    universe.sort(key=lambda item: item[2], reverse=True)
+    return universe[:size]
+
+
+def scan_market(source=None, top_k=SCANNER_TOP_K, universe_size=SCANNER_UNIVERSE_SIZE, workers=SCANNER_WORKERS):
+    """
+    One bulk tickers call to `source` (a MarketData source, OKX by default), 15m features
+    for the liquid universe fetched in parallel, then
+    candidates ranked by SignalRules.candidate_score (coins where the guardrails would only
+    allow WAIT are dropped). Returns the top-K as dicts:
+        {'instId', 'price', 'features', 'state', 'score', 'actions'}
+    """
+    source = source if source is not None else OkxMarketData()
+    swaps = source.get_swap_tickers()
+    if swaps is None:
+        print(f"❌ [Scanner] {source.venue} tickers unavailable; skipping scan.")
+        return []
+    universe = select_universe(swaps, size=universe_size)
+    print(f"🔎 [Scanner] {len(swaps)} swaps -> {len(universe)} liquid candidates.")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        all_features = list(pool.map(lambda item: source.get_latest_features(item[0], '15m'), universe))
+
+    candidates = []
+    for (instId, last, _), features in zip(universe, all_features):
+        if features is None:
+            continue
+        state = signal_state(features)
+        score = candidate_score(state)
+        if score > 0:
+            candidates.append({"instId": instId, "price": last, "features": features, "state": state,
+                               "score": score, "actions": sorted(allowed_actions(state))})
+
+    candidates.sort(key=lambda c: c["score"], reverse=True)
+    for c in candidates[:top_k]:
+        s = c["state"]
+        print(f"   {c['instId']:<14} score {c['score']:6.2f} | {s['trend']} RSI {s['rsi']:.1f} "
+              f"ext {s['extension_pct']:+.2f}% vol {s['vol_ratio']:.1f}x -> {'/'.join(c['actions'])}")
+    return candidates[:top_k]
+
+
+if __name__ == '__main__':
+    for candidate in scan_market():
+        print(candidate["instId"], round(candidate["score"], 3))
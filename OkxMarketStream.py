@@ -0,0 +1,200 @@
+import asyncio
+import json
+import threading
+import time
+
+try:
+    import websockets
+except ImportError:
+    websockets = None
+
+from Config import OKX_WS_PUBLIC_URL, OKX_WS_BUSINESS_URL, OKX_WS_STALE_SECONDS, OKX_WS_PING_INTERVAL
+from CandleStore import get_candle_store
+
+
+def _store_sink(instId, bar, rows):
+    get_candle_store(instId, bar).apply_rows(rows)
+
+
+class OkxMarketStream:
+    """
+    OKX public market data over WebSocket: `tickers` on the public endpoint and
+    `candle<bar>` on the business endpoint (where OKX serves candle channels).
+
+    Subscriptions can be added from any thread at any time and are replayed after every
+    reconnect. Ticker prices are cached in memory; candle pushes are handed to `candle_sink`
+    (by default merged into the CandleStore). Readers get None / False whenever the data is
+    not fresh, so callers fall back to REST. Both URLs can point at a local replay server.
+    """
+
+    def __init__(self, public_url=OKX_WS_PUBLIC_URL, business_url=OKX_WS_BUSINESS_URL,
+                 stale_after=OKX_WS_STALE_SECONDS, ping_interval=OKX_WS_PING_INTERVAL,
+                 candle_sink=_store_sink):
+        self.urls = {"public": public_url, "business": business_url}
+        self.stale_after = stale_after
+        self.ping_interval = ping_interval
+        self.candle_sink = candle_sink
+
+        self._lock = threading.Lock()
+        self._subs = {"public": set(), "business": set()}  # connection -> {(channel, instId)}
+        self._sockets = {}          # connection -> open websocket
+        self._subscribed_at = {}    # (channel, instId) -> time the subscription was acknowledged
+        self._tickers = {}          # instId -> (last price str, received at)
+        self._candle_pushes = {}    # (instId, bar) -> received at
+        self._loop = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """ Runs both connections in a daemon thread with their own event loop. """
+        if websockets is None:
+            print("   ⚠️ [OKX WS] 'websockets' is not installed; market stream disabled.")
+            return False
+        if self._thread is not None and self._thread.is_alive():
+            return True
+        self._stop.clear()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._main()), daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+        loop = self._loop
+        if loop is not None:
+            for ws in list(self._sockets.values()):
+                asyncio.run_coroutine_threadsafe(ws.close(), loop)
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        await asyncio.gather(self._run_forever("public"), self._run_forever("business"))
+
+    async def _run_forever(self, name):
+        delay = 1
+        while not self._stop.is_set():
+            with self._lock:
+                idle = not self._subs[name]
+            if idle:
+                await asyncio.sleep(0.5)  # connect only once something is subscribed
+                continue
+            try:
+                await self._run_once(name)
+                delay = 1
+            except Exception as e:
+                print(f"   ⚠️ [OKX WS] {name} stream error: {e}. Reconnecting in {delay}s...")
+            finally:
+                self._sockets.pop(name, None)
+                with self._lock:
+                    for key in self._subs[name]:
+                        self._subscribed_at.pop(key, None)
+            if self._stop.is_set():
+                break
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    async def _run_once(self, name):
+        async with websockets.connect(self.urls[name], ping_interval=None) as ws:
+            self._sockets[name] = ws
+            with self._lock:
+                args = sorted(self._subs[name])
+            if args:
+                await self._send_subscribe(ws, args)
+
+            pinger = asyncio.create_task(self._ping_loop(ws))
+            try:
+                async for raw in ws:
+                    if self._stop.is_set():
+                        break
+                    self._handle_message(raw)
+            finally:
+                pinger.cancel()
+
+    async def _ping_loop(self, ws):
+        # OKX closes connections that stay silent for 30 s; a text "ping" is answered with "pong".
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send("ping")
+
+    @staticmethod
+    async def _send_subscribe(ws, args):
+        await ws.send(json.dumps({"op": "subscribe", "args": [
+            {"channel": channel, "instId": instId} for channel, instId in args]}))
+
+    # --- Subscriptions (thread-safe) ---
+
+    def _subscribe(self, name, channel, instId):
+        key = (channel, instId)
+        with self._lock:
+            if key in self._subs[name]:
+                return
+            self._subs[name].add(key)
+        ws, loop = self._sockets.get(name), self._loop
+        if ws is not None and loop is not None:
+            asyncio.run_coroutine_threadsafe(self._send_subscribe(ws, [key]), loop)
+
+    def subscribe_ticker(self, instId):
+        self._subscribe("public", "tickers", instId)
+
+    def subscribe_candles(self, instId, bar):
+        self._subscribe("business", f"candle{bar}", instId)
+
+    # --- Message handling ---
+
+    def _handle_message(self, raw):
+        if raw == "pong":
+            return
+        try:
+            msg = json.loads(raw)
+        except (TypeError, ValueError):
+            return
+
+        now = time.time()
+        arg = msg.get("arg") or {}
+        channel, instId = arg.get("channel", ""), arg.get("instId")
+        event = msg.get("event")
+        if event == "subscribe":
+            with self._lock:
+                self._subscribed_at[(channel, instId)] = now
+            return
+        if event == "error":
+            print(f"   ⚠️ [OKX WS] {msg.get('code')}: {msg.get('msg')}")
+            return
+
+        data = msg.get("data") or []
+        if channel == "tickers":
+            with self._lock:
+                for ticker in data:
+                    if ticker.get("last"):
+                        self._tickers[ticker.get("instId", instId)] = (ticker["last"], now)
+        elif channel.startswith("candle") and data:
+            bar = channel[len("candle"):]
+            self.candle_sink(instId, bar, data)
+            with self._lock:
+                self._candle_pushes[(instId, bar)] = now
+
+    # --- Readers (thread-safe) ---
+
+    def _is_live(self, channel, instId):
+        return (channel, instId) in self._subscribed_at
+
+    def get_price(self, instId):
+        """ Last traded price (string, like the REST ticker) if fresh, else None. """
+        with self._lock:
+            if not self._is_live("tickers", instId):
+                return None
+            cached = self._tickers.get(instId)
+        if cached is None or time.time() - cached[1] > self.stale_after:
+            return None
+        return cached[0]
+
+    def candles_fresh(self, instId, bar, synced_at):
+        """
+        True if the candle subscription has been live since `synced_at` (the store's last REST
+        sync, so no bar can have been missed) and pushed within the staleness window.
+        """
+        with self._lock:
+            subscribed_at = self._subscribed_at.get((f"candle{bar}", instId))
+            pushed_at = self._candle_pushes.get((instId, bar))
+        return (subscribed_at is not None and subscribed_at <= synced_at
+                and pushed_at is not None and time.time() - pushed_at <= self.stale_after)
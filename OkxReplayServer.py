@@ -0,0 +1,175 @@
+import asyncio
+import json
+import threading
+import time
+
+import websockets
+
+
+class OkxReplayServer:
+    """
+    Local stand-in for OKX's public/business WebSocket endpoints, for testing OkxMarketStream
+    without the exchange.
+
+    Acknowledges `subscribe` requests, answers text "ping" with "pong" and replays recorded
+    push messages ({"arg": {...}, "data": [...]}) to every client subscribed to their channel,
+    `interval` seconds apart. Messages can be loaded from a JSONL recording or pushed live
+    with push(). drop_connections() simulates a disconnect to exercise resubscription.
+    """
+
+    def __init__(self, messages=(), host="127.0.0.1", port=0, interval=0.0):
+        self.messages = list(messages)
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.subscribe_count = 0
+
+        self._clients = {}  # websocket -> set of (channel, instId)
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_jsonl(cls, path, **kwargs):
+        with open(path, "r") as f:
+            return cls([json.loads(line) for line in f if line.strip()], **kwargs)
+
+    @property
+    def url(self):
+        return f"ws://{self.host}:{self.port}/ws/v5/public"
+
+    @property
+    def business_url(self):
+        return f"ws://{self.host}:{self.port}/ws/v5/business"
+
+    def start(self):
+        """ Serves in a daemon thread; returns once the socket is listening. """
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._serve()), daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self.url
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        async with websockets.serve(self._handler, self.host, self.port) as server:
+            self._server = server
+            self.port = server.sockets[0].getsockname()[1]
+            self._ready.set()
+            await server.wait_closed()
+
+    async def _handler(self, ws, path=None):
+        subs = self._clients[ws] = set()
+        try:
+            async for raw in ws:
+                if raw == "ping":
+                    await ws.send("pong")
+                    continue
+                request = json.loads(raw)
+                if request.get("op") != "subscribe":
+                    continue
+                new = []
+                for arg in request.get("args", []):
+                    key = (arg.get("channel"), arg.get("instId"))
+                    subs.add(key)
+                    new.append(key)
+                    self.subscribe_count += 1
+                    await ws.send(json.dumps({"event": "subscribe", "arg": arg, "connId": "replay"}))
+                asyncio.ensure_future(self._replay(ws, set(new)))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._clients.pop(ws, None)
+
+    async def _replay(self, ws, keys):
+        for message in self.messages:
+            arg = message.get("arg", {})
+            if (arg.get("channel"), arg.get("instId")) not in keys:
+                continue
+            if self.interval:
+                await asyncio.sleep(self.interval)
+            try:
+                await ws.send(json.dumps(message))
+            except websockets.ConnectionClosed:
+                return
+
+    async def _broadcast(self, message):
+        arg = message.get("arg", {})
+        key = (arg.get("channel"), arg.get("instId"))
+        for ws, subs in list(self._clients.items()):
+            if key in subs:
+                try:
+                    await ws.send(json.dumps(message))
+                except websockets.ConnectionClosed:
+                    pass
+
+    def push(self, message):
+        """ Sends one push message to the subscribed clients now (thread-safe). """
+        asyncio.run_coroutine_threadsafe(self._broadcast(message), self._loop).result(5)
+
+    def drop_connections(self):
+        """ Closes every client connection (thread-safe). """
+        async def _drop():
+            for ws in list(self._clients):
+                await ws.close()
+        asyncio.run_coroutine_threadsafe(_drop(), self._loop).result(5)
+
+
+def _ticker(instId, last):
+    return {"arg": {"channel": "tickers", "instId": instId},
+            "data": [{"instId": instId, "last": str(last), "ts": str(int(time.time() * 1000))}]}
+
+
+def _candle(instId, bar, ts, price, confirm):
+    row = [str(ts), str(price), str(price * 1.001), str(price * 0.999), str(price), "10", "0", "0", confirm]
+    return {"arg": {"channel": f"candle{bar}", "instId": instId}, "data": [row]}
+
+
+if __name__ == '__main__':
+    # Self-test: OkxMarketStream against the replay server, including a reconnect.
+    from CandleStore import get_candle_store
+    from OkxMarketStream import OkxMarketStream
+
+    BAR_MS = 15 * 60 * 1000
+    inst = "SOL-USDT"
+    server = OkxReplayServer([_ticker(inst, 150.5)])
+    server.start()
+
+    # Seed the store as a REST backfill would.
+    history = [[str(i * BAR_MS), "150", "151", "149", "150", "10", "0", "0", "1"] for i in range(100)][::-1]
+    store = get_candle_store(inst, "15m")
+    store.fetcher = lambda *a, **k: history if k.get("after") is None and k.get("before") is None else []
+    store.update()
+
+    stream = OkxMarketStream(public_url=server.url, business_url=server.business_url, ping_interval=1)
+    stream.subscribe_ticker(inst)
+    stream.subscribe_candles(inst, "15m")
+    stream.start()
+
+    def wait_for(check, timeout=5):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if check():
+                return True
+            time.sleep(0.05)
+        return False
+
+    assert wait_for(lambda: stream.get_price(inst) == "150.5"), "ticker not received"
+    server.push(_candle(inst, "15m", 100 * BAR_MS, 152.0, "0"))
+    assert wait_for(lambda: store.live is not None and store.live[4] == 152.0), "live candle not applied"
+    server.push(_candle(inst, "15m", 100 * BAR_MS, 153.0, "1"))
+    assert wait_for(lambda: store.last_confirmed_ts == 100 * BAR_MS and store.live is None), "candle not confirmed"
+
+    subscribes = server.subscribe_count
+    server.drop_connections()
+    assert wait_for(lambda: server.subscribe_count >= subscribes + 2, timeout=10), "no resubscribe after drop"
+    server.push(_ticker(inst, 151.25))
+    assert wait_for(lambda: stream.get_price(inst) == "151.25"), "ticker not received after reconnect"
+
+    stream.stop()
+    server.stop()
+    print("✅ OkxMarketStream passed the replay test (ticker, live/confirmed candles, resubscribe).")
@@ -6,7 +6,8 @@ import json
 from datetime import datetime, timezone, timedelta
 from Database import is_message_checked, mark_message_checked, process_extracted_data
 from llamacppInteract import llamacppBot
-from llamacpp_config import LLM_API_KEY, LLM_HOST
+from Prompts import EXTRACT_SYSTEM, SIGNAL_SCHEMA, EXTRACT_SLOT, extract_user_message
+from llamacpp_config import LLM_API_KEY, LLM_HOST, LLM_EXTRACT_MAX_TOKENS
 
 try:
     import easyocr
@@ -193,32 +194,11 @@ bot = llamacppBot(LLM_API_KEY, host=LLM_HOST)
 
 def ask_llm_for_json(text_content):
     """Sends the combined OCR + text to the LLM to extract JSON data."""
-    prompt = f"""
-    ROLE: You are an expert at extracting crypto trading signals from Telegram messages.
-    Extract the following information from the text into a JSON object.
-
-    RULES:
-    1. "symbol": The trading pair (e.g., "ATOMUSDT"). Return null if not found.
-    2. "direction": 1 if the signal says LONG or BUY. 0 if it says SHORT or SELL. Return null if not found.
-    3. "entry_price": The numerical entry price. Return null if not found.
-    4. "take_profit": The LOWEST take profit target if multiple are given (e.g., if TP1=1.825 and TP2=1.9, return 1.825). Return null if not found.
-    5. "stop_loss": The numerical stop loss price. Return null if not found.
-    6. Only return valid JSON. Do not include any explanations.
-
-    TEXT TO PARSE:
-    "{text_content}"
-
-    OUTPUT FORMAT:
-    {{
-        "symbol": null,
-        "direction": null,
-        "entry_price": null,
-        "take_profit": null,
-        "stop_loss": null
-    }}
-    """
-    bot.add_to_message(prompt)
-    response = bot.send_and_reset_message()
+    bot.add_to_message(extract_user_message(text_content))
+    # Only the first JSON object is parsed, so generation is cut off once it is closed
+    response = bot.send_and_reset_message(stop_on_json=True, json_schema=SIGNAL_SCHEMA,
+                                          max_tokens=LLM_EXTRACT_MAX_TOKENS,
+                                          system=EXTRACT_SYSTEM, slot=EXTRACT_SLOT)
 
     try:
         json_match = re.search(r'\{.*\}', response, re.DOTALL)
@@ -10,19 +10,20 @@ from bybit_config import (
 
 trader = BybitTrader(BYBIT_API_KEY, BYBIT_SECRET_KEY, is_demo=BYBIT_IS_DEMO)
 
-# Risk-management parameters (ATR-based)
-SL_MULTIPLIER = 2.0  # Stop-loss = 2 * ATR
-TP_MULTIPLIER = 3.0  # Take-profit = 3 * ATR (Risk/Reward 1:1.5)
-LONG_ENTRY_MULTIPLIER = 0.996   # Place long limit ~0.4% below market (maker side)
-SHORT_ENTRY_MULTIPLIER = 1.004  # Place short limit ~0.4% above market (maker side)
+# Risk-management parameters (SL/TP/entry multipliers) live in Config.py so the backtest
+# uses the same values without importing this module.
 
 
-def _compute_sizing(trader, instrument_id, entry_price):
+def _compute_sizing(trader, instrument_id, entry_price, snapshot=None):
     """
     Returns (qty, info_str) sizing notional from FREE margin, leverage and risk fraction.
     Returns (None, reason) when the trade should be skipped.
+    Uses the snapshot's free USDT margin when one is given.
     """
-    available_usdt = trader.get_available_balance(instrument_id)
+    if snapshot is not None:
+        available_usdt = snapshot.free_margin
+    else:
+        available_usdt = trader.get_available_balance(instrument_id)
     if available_usdt is None:
         return None, "Balance unavailable (API/network error); skipping cycle"
     if available_usdt <= 0:
@@ -42,9 +43,10 @@ def _compute_sizing(trader, instrument_id, entry_price):
     return raw_qty, info
 
 
-def parse_and_execute_commands(trader, instrument_id, llm_response, current_price, atr):
+def parse_and_execute_commands(trader, instrument_id, llm_response, current_price, atr, snapshot=None):
     """
     ATR-based execution logic. Returns (result_message, wait_seconds).
+    `snapshot` is the cycle's AccountSnapshot; if omitted, one is fetched before trading.
     """
     print(f"\n--- Processing Strategy ---")
 
@@ -69,12 +71,18 @@ def parse_and_execute_commands(trader, instrument_id, llm_response, current_pric
 
     # Guard: never stack onto an existing position or resting order for this symbol.
     try:
-        if trader.has_open_position(instrument_id) or trader.has_open_order(instrument_id):
+        if snapshot is None:
+            snapshot = trader.get_account_snapshot()
+        if snapshot is not None:
+            exposed = snapshot.has_exposure(instrument_id)
+        else:
+            exposed = trader.has_open_position(instrument_id) or trader.has_open_order(instrument_id)
+        if exposed:
             return f"Skip {action}: existing position/order on {instrument_id}", 300
     except Exception as e:
         return f"❌ EXECUTION_ERROR: could not verify existing exposure: {e}", 60
 
-    # Set leverage explicitly so sizing is predictable (idempotent).
+    # Set leverage explicitly so sizing is predictable (no request when the cached value matches).
     try:
         trader.set_leverage(instrument_id, LEVERAGE)
     except Exception as e:
@@ -90,7 +98,7 @@ def parse_and_execute_commands(trader, instrument_id, llm_response, current_pric
         sl_price = entry_price + (atr * SL_MULTIPLIER)
         tp_price = entry_price - (atr * TP_MULTIPLIER)
 
-    raw_qty, info = _compute_sizing(trader, instrument_id, entry_price)
+    raw_qty, info = _compute_sizing(trader, instrument_id, entry_price, snapshot)
     if raw_qty is None:
         return f"❌ Skip {action}: {info}", 60
     print(f"Sizing: {info}")
@@ -0,0 +1,105 @@
+"""
+LLM prompts laid out for llama.cpp's prompt cache: everything static (role, rules, output
+format) is a fixed system message that opens the prompt, and only the per-call data goes
+into the user message after it. With `cache_prompt` and one pinned slot per task the
+server reuses the evaluated system prefix and only evaluates the new user tokens.
+"""
+
+from SignalRules import RSI_OVERBOUGHT, RSI_OVERSOLD, BUY_MAX_EXTENSION_PCT
+from llamacpp_config import LLM_SLOT_DECISION, LLM_SLOT_EXTRACT
+
+# --- Trading decision (algomain.HInfoSend) ---
+
+DECISION_SLOT = LLM_SLOT_DECISION
+
+DECISION_SYSTEM = f"""ROLE: You are a professional crypto quant trader.
+You receive the MARKET STATE of one coin and decide whether to trade it.
+
+YOUR STRATEGY RULES:
+- BUY only if Trend is BULLISH, RSI is < {RSI_OVERBOUGHT}, AND Extension is < {BUY_MAX_EXTENSION_PCT}%.
+- DO NOT BUY if Trend is PARABOLIC_DANGER_DO_NOT_BUY (market is overextended or buying climax).
+- SELL only if Trend is BEARISH and RSI is not OVERSOLD (<{RSI_OVERSOLD}).
+- If market is flat, overextended, or conflicting signals -> WAIT.
+
+OUTPUT FORMAT:
+Return a JSON object with your decision. Do NOT calculate prices, I will calculate TP/SL based on ATR automatically.
+
+{{
+    "reasoning": "Explain why in 1 sentence based on RSI and Trend",
+    "action": "BUY" or "SELL" or "WAIT",
+    "confidence": "HIGH" or "LOW"
+}}"""
+
+# Схема ответа LLM: llama.cpp генерирует строго этот JSON (reasoning идет первым, до решения)
+DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "reasoning": {"type": "string", "maxLength": 200},
+        "action": {"enum": ["BUY", "SELL", "WAIT"]},
+        "confidence": {"enum": ["HIGH", "LOW"]},
+    },
+    "required": ["reasoning", "action", "confidence"],
+    "additionalProperties": False,
+}
+
+
+def decision_schema(actions):
+    """ DECISION_SCHEMA with `action` limited to the allowed `actions` plus WAIT. """
+    allowed = [action for action in ("BUY", "SELL") if action in actions] + ["WAIT"]
+    properties = dict(DECISION_SCHEMA["properties"], action={"enum": allowed})
+    return dict(DECISION_SCHEMA, properties=properties)
+
+
+def decision_user_message(coin, state):
+    """ Per-cycle MARKET STATE block for `coin` from a SignalRules.signal_state dict. """
+    return f"""MARKET STATE for {coin}:
+1. Current Price: {state['price']}
+2. Trend (EMA 50): {state['trend']}
+3. Momentum (RSI 14): {state['rsi']:.2f} ({state['rsi_status']})
+4. Volatility (ATR): {state['atr']:.2f}
+5. Extension from fast EMA10: {state['extension_pct']:.2f}%
+6. Volume Spike Ratio: {state['vol_ratio']:.1f}x average"""
+
+
+# --- Signal extraction (ParseChannel.ask_llm_for_json) ---
+
+EXTRACT_SLOT = LLM_SLOT_EXTRACT
+
+EXTRACT_SYSTEM = """ROLE: You are an expert at extracting crypto trading signals from Telegram messages.
+Extract the following information from the TEXT TO PARSE given by the user into a JSON object.
+
+RULES:
+1. "symbol": The trading pair (e.g., "ATOMUSDT"). Return null if not found.
+2. "direction": 1 if the signal says LONG or BUY. 0 if it says SHORT or SELL. Return null if not found.
+3. "entry_price": The numerical entry price. Return null if not found.
+4. "take_profit": The LOWEST take profit target if multiple are given (e.g., if TP1=1.825 and TP2=1.9, return 1.825). Return null if not found.
+5. "stop_loss": The numerical stop loss price. Return null if not found.
+6. Only return valid JSON. Do not include any explanations.
+
+OUTPUT FORMAT:
+{
+    "symbol": null,
+    "direction": null,
+    "entry_price": null,
+    "take_profit": null,
+    "stop_loss": null
+}"""
+
+# Shape of an extracted signal; llama.cpp constrains the answer to exactly this object
+SIGNAL_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "symbol": {"type": ["string", "null"], "maxLength": 20},
+        "direction": {"enum": [1, 0, None]},
+        "entry_price": {"type": ["number", "null"]},
+        "take_profit": {"type": ["number", "null"]},
+        "stop_loss": {"type": ["number", "null"]},
+    },
+    "required": ["symbol", "direction", "entry_price", "take_profit", "stop_loss"],
+    "additionalProperties": False,
+}
+
+
+def extract_user_message(text_content):
+    """ The message (text + OCR) to extract a signal from. """
+    return f'TEXT TO PARSE:\n"{text_content}"'
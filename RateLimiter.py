@@ -0,0 +1,203 @@
+import threading
+import time
+from collections import deque
+
+from bybit_config import (
+    BYBIT_RATE_LIMITS, BYBIT_RATE_DEFAULT, BYBIT_IP_RATE_LIMIT,
+    BYBIT_READ_RESERVE, BYBIT_RATE_MAX_WAIT,
+)
+
+PRIORITY_TRADE = 0  # order create/cancel, leverage, trading-stop (POST)
+PRIORITY_READ = 1   # informational GETs
+
+
+class TokenBucket:
+    """ Classic token bucket; `tokens` may go negative, which queues later callers behind it. """
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self.capacity = float(rate)
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # monotonic time before which nothing may be sent
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, now, needed):
+        """ Seconds until `needed` tokens are available (and any server block has passed). """
+        wait = max((needed - self.tokens) / self.rate, 0.0) if self.rate > 0 else 0.0
+        return max(wait, self.blocked_until - now)
+
+
+class BybitRateLimiter:
+    """
+    Client-side scheduler for Bybit's rate limits.
+
+    Keeps one token bucket per endpoint (Bybit limits per endpoint and UID) plus a shared
+    bucket for the per-IP limit. Buckets start from the configured limits and are corrected
+    from the X-Bapi-Limit / X-Bapi-Limit-Status / X-Bapi-Limit-Reset-Timestamp headers.
+    Reads may not dip into the last BYBIT_READ_RESERVE share of the shared bucket, so order
+    placement keeps headroom during bursts. Reads that have to wait are scheduled to leave
+    that share free at their send time, so while they are queued a trade borrows from the
+    reserve instead of waiting behind them; only once the reserve is used up do trades
+    queue after the reads. reserve() returns how long the caller must wait,
+    which lets sync (time.sleep) and async (asyncio.sleep) clients share the same limiter.
+    """
+
+    def __init__(self, limits=None, default_rate=BYBIT_RATE_DEFAULT,
+                 ip_rate=BYBIT_IP_RATE_LIMIT, read_reserve=BYBIT_READ_RESERVE):
+        self._lock = threading.Lock()
+        self._limits = dict(BYBIT_RATE_LIMITS if limits is None else limits)
+        self._default_rate = default_rate
+        self._read_reserve = read_reserve
+        self._ip_bucket = TokenBucket(ip_rate)
+        self._queued_reads = deque()  # send times of reads still waiting on the shared bucket
+        self._reserve_borrowed = 0    # trades sent ahead of those reads, taken from the reserve
+        self._buckets = {}
+        self._metrics = {}
+
+    @staticmethod
+    def priority_for(method):
+        return PRIORITY_TRADE if method != "GET" else PRIORITY_READ
+
+    def _bucket(self, endpoint):
+        bucket = self._buckets.get(endpoint)
+        if bucket is None:
+            bucket = self._buckets[endpoint] = TokenBucket(self._limits.get(endpoint, self._default_rate))
+        return bucket
+
+    def _metric(self, endpoint):
+        metric = self._metrics.get(endpoint)
+        if metric is None:
+            metric = self._metrics[endpoint] = {
+                "requests": 0, "throttled": 0, "wait_seconds": 0.0, "max_wait": 0.0, "rate_limited": 0,
+            }
+        return metric
+
+    def reserve(self, endpoint, priority=PRIORITY_READ):
+        """ Takes a token for `endpoint` and returns the seconds to wait before sending. """
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(endpoint)
+            ip = self._ip_bucket
+            bucket.refill(now)
+            ip.refill(now)
+
+            while self._queued_reads and self._queued_reads[0] <= now:
+                self._queued_reads.popleft()
+            if not self._queued_reads:
+                self._reserve_borrowed = 0
+
+            reserve = ip.capacity * self._read_reserve
+            if priority != PRIORITY_TRADE:
+                ip_wait = ip.wait_for(now, 1.0 + reserve)
+            elif (self._queued_reads and self._reserve_borrowed + 1 <= reserve
+                  and ip.tokens + len(self._queued_reads) >= 1.0):
+                # Every queued read leaves `reserve` tokens at its send time, so a trade may go
+                # now as long as the trades sent ahead of the queue fit in that share.
+                self._reserve_borrowed += 1
+                ip_wait = max(ip.blocked_until - now, 0.0)
+            else:
+                ip_wait = ip.wait_for(now, 1.0)
+            wait = max(bucket.wait_for(now, 1.0), ip_wait)
+
+            bucket.tokens -= 1.0
+            ip.tokens -= 1.0
+            if priority != PRIORITY_TRADE and ip_wait > 0:
+                self._queued_reads.append(now + ip_wait)
+
+            metric = self._metric(endpoint)
+            metric["requests"] += 1
+            if wait > 0:
+                metric["throttled"] += 1
+                metric["wait_seconds"] += wait
+                metric["max_wait"] = max(metric["max_wait"], wait)
+            return wait
+
+    def update_from_headers(self, endpoint, headers):
+        """ Syncs the endpoint bucket with Bybit's X-Bapi-Limit* response headers. """
+        try:
+            limit = headers.get("X-Bapi-Limit")
+            status = headers.get("X-Bapi-Limit-Status")
+            reset_ms = headers.get("X-Bapi-Limit-Reset-Timestamp")
+            if limit is None or status is None:
+                return
+            limit, status = float(limit), float(status)
+        except (TypeError, ValueError, AttributeError):
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(endpoint)
+            bucket.refill(now)
+            if limit > 0:
+                bucket.rate = bucket.capacity = limit
+            bucket.tokens = min(bucket.tokens, status)
+            if status <= 0 and reset_ms:
+                bucket.blocked_until = max(bucket.blocked_until, self._to_monotonic(reset_ms, now))
+
+    def on_rate_limited(self, endpoint, reset_ms=None):
+        """
+        Records a 10006 rejection and blocks the endpoint until the reset time (or 1 s).
+        Returns the seconds until the endpoint may be retried.
+        """
+        with self._lock:
+            now = time.monotonic()
+            bucket = self._bucket(endpoint)
+            bucket.tokens = min(bucket.tokens, 0.0)
+            until = self._to_monotonic(reset_ms, now) if reset_ms else now + 1.0
+            bucket.blocked_until = max(bucket.blocked_until, until)
+            self._metric(endpoint)["rate_limited"] += 1
+            return max(bucket.blocked_until - now, 0.0)
+
+    @staticmethod
+    def _to_monotonic(epoch_ms, now):
+        try:
+            return now + (float(epoch_ms) / 1000.0 - time.time())
+        except (TypeError, ValueError):
+            return now + 1.0
+
+    def can_retry_after(self, wait):
+        """ True if waiting `wait` seconds for a retry stays within BYBIT_RATE_MAX_WAIT. """
+        return wait <= BYBIT_RATE_MAX_WAIT
+
+    def get_metrics(self):
+        """ Per-endpoint counters: requests, throttled, wait_seconds, max_wait, rate_limited. """
+        with self._lock:
+            return {endpoint: dict(metric) for endpoint, metric in self._metrics.items()}
+
+
+if __name__ == '__main__':
+    # Self-test on a simulated clock: a trade right after a read burst only waits as long as
+    # the read reserve allows, and the combined send schedule never exceeds the IP bucket.
+    import random
+
+    clock = [0.0]
+    time.monotonic = lambda: clock[0]
+
+    limiter = BybitRateLimiter(limits={}, default_rate=1000, ip_rate=10, read_reserve=0.3)
+    read_waits = [limiter.reserve("/v5/market/tickers", PRIORITY_READ) for _ in range(20)]
+    trade_waits = [limiter.reserve("/v5/order/create", PRIORITY_TRADE) for _ in range(4)]
+    print(f"   20 reads: last waits {read_waits[-1]:.2f}s; next 4 trades wait "
+          + ", ".join(f"{w:.2f}s" for w in trade_waits))
+    # 30% of a 10-token bucket = 3 trades go ahead of the queued reads, the 4th goes after them.
+    assert trade_waits[:3] == [0.0, 0.0, 0.0], trade_waits
+    assert read_waits[-1] < trade_waits[3] <= read_waits[-1] + 0.1 + 1e-9, trade_waits
+
+    rng = random.Random(7)
+    rate = 10
+    limiter = BybitRateLimiter(limits={}, default_rate=1000, ip_rate=rate, read_reserve=0.3)
+    sends = []
+    for _ in range(2000):
+        clock[0] += rng.expovariate(15)  # ~1.5x the IP rate, mostly reads
+        priority = PRIORITY_TRADE if rng.random() < 0.2 else PRIORITY_READ
+        sends.append(clock[0] + limiter.reserve("/v5/any", priority))
+    sends.sort()
+    for i, start in enumerate(sends):
+        for j in range(i, len(sends)):
+            # j - i + 1 sends inside [start, sends[j]] must fit the bucket's capacity plus refill
+            assert j - i + 1 <= rate + rate * (sends[j] - start) + 1e-6, (start, sends[j], j - i + 1)
+    print(f"   {len(sends)} mixed requests: no window exceeds the IP bucket")
+    print("✅ BybitRateLimiter self-test passed.")
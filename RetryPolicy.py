@@ -0,0 +1,305 @@
+import asyncio
+import random
+import threading
+import time
+
+import requests
+
+from Config import (
+    HTTP_RETRY_BASE_DELAY, HTTP_RETRY_MAX_DELAY, BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_SECONDS,
+)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+RETRYABLE_EXCEPTIONS = (requests.exceptions.RequestException, ValueError)  # network / bad JSON
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """ Raised instead of calling a host whose breaker is open (caught like any network error). """
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """ Raised when a call's deadline ran out before an attempt could be made. """
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker. After `failure_threshold` consecutive failed attempts the host is
+    considered down and calls fail fast for `reset_seconds`; then one trial call is let
+    through (half-open) and its outcome closes or reopens the breaker.
+    """
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_seconds=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self.metrics = {"calls": 0, "attempts": 0, "retries": 0, "successes": 0, "failures": 0,
+                        "short_circuited": 0, "opened": 0, "last_error": None}
+
+    def allow(self):
+        """ True if a request may be sent now. """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.metrics["short_circuited"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"✅ [Breaker] {self.name} recovered; circuit closed.")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.metrics["last_error"] = str(error)
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self.metrics["opened"] += 1
+                    print(f"🚫 [Breaker] {self.name} failing ({error}); failing fast for {self.reset_seconds}s.")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def count(self, metric, amount=1):
+        with self._lock:
+            self.metrics[metric] += amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.metrics, state=self.state, consecutive_failures=self.consecutive_failures)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    """ Process-wide breaker for `name` (a host such as 'okx', 'bybit', 'telegram'). """
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def get_retry_metrics():
+    """ {host: breaker state and call/attempt/retry/failure counters} for every host used. """
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
+
+
+def _backoff_delay(attempt, base_delay, max_delay):
+    """ Full-jitter exponential backoff before retry number `attempt + 1`. """
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def call_with_retry(name, fn, deadline, attempts=3, attempt_timeout=None, retry_result=None,
+                    base_delay=HTTP_RETRY_BASE_DELAY, max_delay=HTTP_RETRY_MAX_DELAY,
+                    retryable=RETRYABLE_EXCEPTIONS):
+    """
+    Calls fn(timeout) through the `name` breaker until it succeeds, with at most `attempts`
+    attempts and `deadline` seconds in total. Each attempt gets the remaining time (capped at
+    `attempt_timeout`) as its timeout, and retries wait with exponential backoff and full
+    jitter. Network errors and bad JSON are retried; `retry_result(result)` marks returned
+    results that should be retried too (e.g. HTTP 5xx).
+
+    Returns fn's result (the last one if every attempt returned a retryable result).
+    Raises the last exception, CircuitOpenError while the host is down, or DeadlineExceeded.
+    """
+    breaker = get_breaker(name)
+    breaker.count("calls")
+    started = time.monotonic()
+    end = started + deadline
+    error, result, have_result = None, None, False
+
+    for attempt in range(attempts):
+        # Deadline first: allow() may take the half-open trial, which must then be released
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            break
+        if not breaker.allow():
+            breaker.count("failures")
+            raise CircuitOpenError(f"{name} circuit open after repeated failures; failing fast")
+        breaker.count("attempts")
+        try:
+            result = fn(remaining if attempt_timeout is None else min(attempt_timeout, remaining))
+            retry = retry_result is not None and retry_result(result)
+        except retryable as e:
+            error, have_result = e, False
+            breaker.record_failure(e)
+        except BaseException as e:
+            # Anything else (a bug, cancellation, Ctrl+C) still ends the attempt, so a
+            # half-open trial is never left in flight
+            breaker.record_failure(e)
+            raise
+        else:
+            have_result = True
+            if not retry:
+                breaker.record_success()
+                breaker.count("successes")
+                return result
+            error = None
+            breaker.record_failure("retryable response")
+
+        if attempt == attempts - 1:
+            break
+        delay = _backoff_delay(attempt, base_delay, max_delay)
+        if time.monotonic() + delay >= end:
+            break
+        breaker.count("retries")
+        time.sleep(delay)
+
+    breaker.count("failures")
+    if have_result:
+        return result
+    if error is not None:
+        raise error
+    raise DeadlineExceeded(f"{name} call exceeded its {deadline:.0f}s deadline")
+
+
+async def call_with_retry_async(name, fn, deadline, attempts=3, attempt_timeout=None, retry_result=None,
+                                base_delay=HTTP_RETRY_BASE_DELAY, max_delay=HTTP_RETRY_MAX_DELAY,
+                                retryable=RETRYABLE_EXCEPTIONS):
+    """
+    asyncio twin of call_with_retry: awaits fn(timeout), sleeps with asyncio.sleep and uses
+    the same `name` breaker, deadline, attempt and backoff rules, so sync and async clients
+    of one host fail, retry and fail fast together.
+    """
+    breaker = get_breaker(name)
+    breaker.count("calls")
+    started = time.monotonic()
+    end = started + deadline
+    error, result, have_result = None, None, False
+
+    for attempt in range(attempts):
+        # Deadline first: allow() may take the half-open trial, which must then be released
+        remaining = end - time.monotonic()
+        if remaining <= 0:
+            break
+        if not breaker.allow():
+            breaker.count("failures")
+            raise CircuitOpenError(f"{name} circuit open after repeated failures; failing fast")
+        breaker.count("attempts")
+        try:
+            result = await fn(remaining if attempt_timeout is None else min(attempt_timeout, remaining))
+            retry = retry_result is not None and retry_result(result)
+        except retryable as e:
+            error, have_result = e, False
+            breaker.record_failure(e)
+        except BaseException as e:
+            # Anything else (a bug, cancellation, Ctrl+C) still ends the attempt, so a
+            # half-open trial is never left in flight
+            breaker.record_failure(e)
+            raise
+        else:
+            have_result = True
+            if not retry:
+                breaker.record_success()
+                breaker.count("successes")
+                return result
+            error = None
+            breaker.record_failure("retryable response")
+
+        if attempt == attempts - 1:
+            break
+        delay = _backoff_delay(attempt, base_delay, max_delay)
+        if time.monotonic() + delay >= end:
+            break
+        breaker.count("retries")
+        await asyncio.sleep(delay)
+
+    breaker.count("failures")
+    if have_result:
+        return result
+    if error is not None:
+        raise error
+    raise DeadlineExceeded(f"{name} call exceeded its {deadline:.0f}s deadline")
+
+
+def format_retry_metrics(metrics=None):
+    """ One line per host, for logs and the Telegram /health command. """
+    metrics = get_retry_metrics() if metrics is None else metrics
+    if not metrics:
+        return "No HTTP calls made yet."
+    icons = {CLOSED: "🟢", HALF_OPEN: "🟡", OPEN: "🔴"}
+    return "\n".join(
+        f"{icons.get(m['state'], '')} {name}: {m['state']} | calls {m['calls']}, retries {m['retries']}, "
+        f"failed {m['failures']}, fast-failed {m['short_circuited']}, opened {m['opened']}x"
+        for name, m in sorted(metrics.items()))
+
+
+if __name__ == '__main__':
+    # Self-test: a half-open trial that ends in a non-retryable exception, a failing
+    # retry_result, a cancellation or a spent deadline must not leave the breaker stuck.
+    import contextlib
+    import io
+
+    def tripped(name):
+        """ A fresh breaker that is open and due for its half-open trial. """
+        breaker = _breakers[name] = CircuitBreaker(name, failure_threshold=1, reset_seconds=0.05)
+        with contextlib.redirect_stdout(io.StringIO()):
+            breaker.record_failure("down")
+        time.sleep(0.06)
+        return breaker
+
+    def raise_key_error(timeout):
+        raise KeyError("result")
+
+    async def cancelled(timeout):
+        raise asyncio.CancelledError()
+
+    async def raise_key_error_async(timeout):
+        raise KeyError("result")
+
+    cases = [
+        ("sync KeyError from fn", lambda name: call_with_retry(name, raise_key_error, 5), KeyError),
+        ("sync AttributeError from retry_result",
+         lambda name: call_with_retry(name, lambda t: "not a dict", 5, retry_result=lambda r: r.get("x")),
+         AttributeError),
+        ("async KeyError from fn",
+         lambda name: asyncio.run(call_with_retry_async(name, raise_key_error_async, 5)),
+         KeyError),
+        ("async CancelledError", lambda name: asyncio.run(call_with_retry_async(name, cancelled, 5)),
+         asyncio.CancelledError),
+    ]
+    for label, call, expected in cases:
+        name = f"selftest-{label}"
+        breaker = tripped(name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            try:
+                call(name)
+            except expected:
+                pass
+            time.sleep(0.06)
+            # The trial was released: after the reset window the next call goes through.
+            assert call_with_retry(name, lambda t: "ok", 5) == "ok", f"{label}: breaker stuck"
+        assert breaker.state == CLOSED, f"{label}: {breaker.state}"
+        print(f"   ✅ {label}: trial released, breaker closed again")
+
+    # A spent deadline must not take the trial either.
+    name = "selftest-deadline"
+    breaker = tripped(name)
+    try:
+        call_with_retry(name, lambda t: "ok", 0)
+    except DeadlineExceeded:
+        pass
+    assert breaker.allow(), "deadline path kept the half-open trial"
+    print("   ✅ spent deadline: half-open trial left available")
+    print("✅ RetryPolicy self-test passed.")
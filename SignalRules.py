@@ -0,0 +1,117 @@
+"""
+Side-effect-free signal rules of the LLM strategy (algomain.HInfoSend): market state from
+the last-row indicators, the Python guardrails applied to the LLM's answer, and the score
+used to rank scanner candidates. Shared by the live bot, the scanner and the backtest.
+"""
+
+# Trend / danger thresholds
+RSI_OVERBOUGHT = 70
+RSI_OVERSOLD = 30
+DANGER_EXTENSION_PCT = 1.5   # price this far above EMA10 is dangerously overextended
+BUY_MAX_EXTENSION_PCT = 1.0  # guardrail: no BUY at or above this extension
+CLIMAX_VOLUME_RATIO = 3.0    # volume this many times the 20-bar average on a rise = buying climax
+
+
+def signal_state(features):
+    """
+    Market state from last-row features (close, volume, RSI, ATR, EMA_50, EMA_10, Vol_SMA_20):
+    price, rsi, atr, ema_50, ema_10, extension_pct, vol_ratio, trend and rsi_status.
+    """
+    price = features['close']
+    ema_10 = features['EMA_10']
+    ema_50 = features['EMA_50']
+    rsi = features['RSI']
+    vol_sma = features['Vol_SMA_20']
+
+    # Вычисляем отклонение (Overextension) и аномалии объема (Volume Spike)
+    extension_pct = ((price - ema_10) / ema_10) * 100
+    vol_ratio = features['volume'] / vol_sma if vol_sma > 0 else 1.0
+
+    trend = "BULLISH" if price > ema_50 else "BEARISH"
+    rsi_status = "OVERBOUGHT" if rsi >= RSI_OVERBOUGHT else ("OVERSOLD" if rsi <= RSI_OVERSOLD else "NEUTRAL")
+
+    is_dangerously_overextended = extension_pct > DANGER_EXTENSION_PCT
+    is_buying_climax = vol_ratio > CLIMAX_VOLUME_RATIO and trend == "BULLISH"
+    if is_dangerously_overextended or is_buying_climax:
+        trend = "PARABOLIC_DANGER_DO_NOT_BUY"
+
+    return {
+        "price": price, "rsi": rsi, "atr": features['ATR'], "ema_50": ema_50, "ema_10": ema_10,
+        "extension_pct": extension_pct, "vol_ratio": vol_ratio, "trend": trend, "rsi_status": rsi_status,
+    }
+
+
+def buy_allowed(state):
+    return (state["trend"] == "BULLISH" and state["extension_pct"] < BUY_MAX_EXTENSION_PCT
+            and state["rsi"] < RSI_OVERBOUGHT)
+
+
+def sell_allowed(state):
+    return state["trend"] == "BEARISH" and state["rsi"] > RSI_OVERSOLD
+
+
+def allowed_actions(state):
+    """ Actions the guardrails would let through in this state (empty set = only WAIT). """
+    actions = set()
+    if buy_allowed(state):
+        actions.add("BUY")
+    if sell_allowed(state):
+        actions.add("SELL")
+    return actions
+
+
+def forced_wait_reason(state):
+    """
+    Pre-decision check: why the answer must be WAIT whatever the LLM says (the guardrails
+    would block both BUY and SELL), or None if some action is possible.
+    """
+    if allowed_actions(state):
+        return None
+    return (f"Pre-decision rules: neither BUY nor SELL is allowed "
+            f"(Trend: {state['trend']}, RSI: {state['rsi']:.2f}, Ext: {state['extension_pct']:.2f}%).")
+
+
+def guardrail_block_reason(action, state):
+    """ Why the guardrails override the LLM's `action` with WAIT, or None if it stands. """
+    if action == "BUY" and not buy_allowed(state):
+        return "Python Guardrails blocked BUY (trend/RSI/overextension)."
+    if action == "SELL" and not sell_allowed(state):
+        return "Python Guardrails blocked SELL (trend/RSI oversold)."
+    return None
+
+
+def signal_masks(features):
+    """
+    Vectorized signal_state + buy_allowed/sell_allowed for the backtest: `features` maps the
+    same names to NumPy arrays aligned by bar. Returns boolean arrays 'buy' and 'sell' plus
+    the 'extension_pct' and 'vol_ratio' arrays.
+    """
+    import numpy as np
+
+    price = features['close']
+    ema_10 = features['EMA_10']
+    rsi = features['RSI']
+    vol_sma = features['Vol_SMA_20']
+
+    extension_pct = ((price - ema_10) / ema_10) * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vol_ratio = np.where(vol_sma > 0, features['volume'] / vol_sma, 1.0)
+
+    bullish = price > features['EMA_50']
+    danger = (extension_pct > DANGER_EXTENSION_PCT) | ((vol_ratio > CLIMAX_VOLUME_RATIO) & bullish)
+    buy = bullish & ~danger & (extension_pct < BUY_MAX_EXTENSION_PCT) & (rsi < RSI_OVERBOUGHT)
+    sell = ~bullish & ~danger & (rsi > RSI_OVERSOLD)
+    return {"buy": buy, "sell": sell, "extension_pct": extension_pct, "vol_ratio": vol_ratio}
+
+
+def candidate_score(state):
+    """
+    Ranking score for the scanner: 0 when no trade is allowed, otherwise trend strength
+    (distance from EMA50, %) plus RSI momentum away from 50, scaled by the volume ratio
+    (capped at the climax level so spikes do not dominate).
+    """
+    if not allowed_actions(state):
+        return 0.0
+    trend_pct = abs(state["price"] - state["ema_50"]) / state["ema_50"] * 100
+    momentum = abs(state["rsi"] - 50) / 50
+    return (trend_pct + momentum) * min(state["vol_ratio"], CLIMAX_VOLUME_RATIO)
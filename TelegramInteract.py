@@ -2,12 +2,16 @@ import requests
 import os
 import time
 import json
+from RetryPolicy import call_with_retry, format_retry_metrics
 
 LAST_UPDATE_ID_FILE = 'last_update_id.txt'
 SLIPPAGE_CONFIG_FILE = 'slippage_config.json'
 DATA_CONFIG_FILE = 'data_config.json'
 WAIT_CONFIG_FILE = 'wait_config.json'
 
+# Total seconds one sendMessage may take including retries (all calls share the 'telegram' breaker).
+TELEGRAM_SEND_DEADLINE = 20
+
 def get_last_update_id():
     """Reads the last update ID from its file."""
     if not os.path.exists(LAST_UPDATE_ID_FILE):
@@ -43,7 +47,10 @@ def send_single_message(bot_token: str, user_id: int, message: str, parse_mode:
     if parse_mode:
         payload['parse_mode'] = parse_mode
     try:
-        response = requests.post(base_url, data=payload, timeout=15)
+        response = call_with_retry(
+            "telegram", lambda timeout: requests.post(base_url, data=payload, timeout=timeout),
+            TELEGRAM_SEND_DEADLINE, attempts=3, attempt_timeout=15,
+            retry_result=lambda r: r.status_code == 429 or r.status_code >= 500)
         response.raise_for_status()
         print(f"Successfully sent message to user ID: {user_id}")
     except requests.exceptions.RequestException as e:
@@ -192,6 +199,10 @@ def handle_telegram_command(bot_token: str, message: dict):
         reply_message = f"The default wait time between loops is `{seconds}` seconds."
         send_single_message(bot_token, chat_id, reply_message, parse_mode="Markdown")
 
+    elif command == '/health':
+        reply_message = "HTTP health (retries / circuit breakers):\n" + format_retry_metrics()
+        send_single_message(bot_token, chat_id, reply_message)
+
     elif command == '/help':
         reply_message = (
             "Available commands:\n"
@@ -202,7 +213,8 @@ def handle_telegram_command(bot_token: str, message: dict):
             "`/setdata <1m> <5m> <15m> <1H>`\n"
             "`/getdata`\n"
             "`/setwait <seconds>`\n"
-            "`/getwait`"
+            "`/getwait`\n"
+            "`/health`"
         )
         send_single_message(bot_token, chat_id, reply_message, parse_mode="Markdown")
 
@@ -221,7 +233,9 @@ def poll_telegram_updates(bot_token: str):
         offset = last_update_id + 1 if last_update_id else None
         params = {'timeout': 100, 'offset': offset}
         try:
-            response = requests.get(url, params=params, timeout=110)
+            # Long poll: one attempt per loop (the loop itself retries), counted by the breaker.
+            response = call_with_retry(
+                "telegram", lambda timeout: requests.get(url, params=params, timeout=timeout), 110, attempts=1)
             response.raise_for_status()
             updates = response.json().get('result', [])
             if updates:
@@ -1,15 +1,20 @@
-import pandas as pd
 import time
 import threading
+import asyncio
 import json
-from Get_market import get_okx_market_data, get_okx_current_price
-from Logging import log_message
+from MarketData import get_market_data
+from Logging import log_message, log_decision
 from llamacppInteract import llamacppBot
+from Prompts import DECISION_SYSTEM, DECISION_SLOT, decision_schema, decision_user_message
 from ParseFuncLLM import parse_and_execute_commands
+from SignalRules import signal_state, guardrail_block_reason, allowed_actions, forced_wait_reason
+from DecisionCache import DecisionCache, decision_key, position_state
+from MarketScanner import scan_market
 from Bybitinteract import BybitTrader
-from bybit_config import BYBIT_API_KEY, BYBIT_SECRET_KEY, BYBIT_IS_DEMO
+from AsyncBybitinteract import AsyncTraderLoop
+from bybit_config import BYBIT_API_KEY, BYBIT_SECRET_KEY, BYBIT_IS_DEMO, BYBIT_WS_ENABLED
 from Config import *
-from llamacpp_config import LLM_API_KEY, LLM_HOST
+from llamacpp_config import LLM_API_KEY, LLM_HOST, LLM_DECISION_MAX_TOKENS
 from TelegramConfig import *
 from TelegramInteract import (
     send_message_to_all_users, get_trading_coin, poll_telegram_updates,
@@ -18,94 +23,87 @@ from TelegramInteract import (
 
 print("Initializing BybitTrader...")
 trader = BybitTrader(BYBIT_API_KEY, BYBIT_SECRET_KEY, is_demo=BYBIT_IS_DEMO)
+market = get_market_data(trader)
+# Долгоживущий event loop + async-клиент: пер-символьные запросы сканера идут параллельно
+async_trader = AsyncTraderLoop(trader)
+print(f"Market data venue: {market.venue.upper()}")
 
 print("Initializing LLM Bot...")
 # IT IS VERY LIKELY STUCK ON THE NEXT LINE:
 bot = llamacppBot(LLM_API_KEY, host=LLM_HOST)
 print("LLM Bot initialized successfully!")
 
-def HInfoSend(risk, coin):
-    raw_price = get_okx_current_price(coin)
+decision_cache = DecisionCache()
+# Вызовы LLM, пропущенные потому что правила заранее дают только WAIT
+llm_skip_stats = {"skipped": 0, "saved_seconds": 0.0}
+
+def HInfoSend(risk, coin, features=None, raw_price=None, manage_breakeven=True):
+    """
+    One analysis/trade cycle for `coin`. The scanner passes the candidate's pre-fetched
+    15m `features` and ticker `raw_price`; otherwise both are fetched here. The scanner also
+    moves stops to breakeven for all its symbols at once and passes manage_breakeven=False.
+    """
     if raw_price is None:
-        print("❌ OKX price feed unavailable; skipping this cycle.")
+        raw_price = market.get_current_price(coin)
+    if raw_price is None:
+        print(f"❌ {market.venue.upper()} price feed unavailable; skipping this cycle.")
         return 60
     current_price = float(raw_price)
     if current_price <= 0:
-        print(f"❌ OKX returned invalid price ({raw_price}); skipping this cycle.")
+        print(f"❌ {market.venue.upper()} returned invalid price ({raw_price}); skipping this cycle.")
         return 60
 
-    Bal = trader.get_available_balance(coin)
+    # One account snapshot per cycle serves both the balance display and the execution checks.
+    snapshot = trader.get_account_snapshot()
+    Bal = snapshot.free_margin if snapshot is not None else trader.get_available_balance(coin)
     print(f"Available Balance for trading: {Bal} USDT")
-    btc_market_data = get_okx_market_data(coin)
-
     # Берем данные с самого короткого таймфрейма для торговли (например, 15m)
-    df = btc_market_data.get('15m')
+    last_row = features if features is not None else market.get_latest_features(coin, '15m')
 
-    if not isinstance(df, pd.DataFrame) or df.empty:
+    if last_row is None:
         print("Error getting market data (missing or empty); skipping cycle")
         return 60
 
-    # Извлекаем последние значения
-    last_row = df.iloc[-1]
-    rsi = last_row['RSI']
-    atr = last_row['ATR']
-    ema_50 = last_row['EMA_50']
-    ema_10 = last_row['EMA_10']
-    price = last_row['close']
-    volume = last_row['volume']
-    vol_sma = last_row['Vol_SMA_20']
-
-    trader.update_stop_loss_to_breakeven(coin, atr)
-
-    # Вычисляем отклонение (Overextension) и аномалии объема (Volume Spike)
-    extension_pct = ((price - ema_10) / ema_10) * 100
-    vol_ratio = volume / vol_sma if vol_sma > 0 else 1.0
-
-    # БАЗОВОЕ ОПРЕДЕЛЕНИЕ ТРЕНДА (Добавлено)
-    if price > ema_50:
-        trend = "BULLISH"
+    # Тренд, перегретость и объем считаются жесткой логикой Python (SignalRules)
+    state = signal_state(last_row)
+    rsi, atr = state['rsi'], state['atr']
+    extension_pct, trend = state['extension_pct'], state['trend']
+
+    if manage_breakeven:
+        trader.update_stop_loss_to_breakeven(coin, atr)
+
+    # Pre-decision: если гардрейлы все равно запретят и BUY, и SELL, LLM не вызываем
+    actions = allowed_actions(state)
+    skip_reason = forced_wait_reason(state)
+    if skip_reason is not None:
+        # Экономия оценивается по средней длительности реальных вызовов LLM
+        llm_stats = bot.get_stats()
+        llm_skip_stats["skipped"] += 1
+        llm_skip_stats["saved_seconds"] += llm_stats["avg_ttft_s"] + llm_stats["avg_decode_s"]
+        print(f"⏭️ LLM skipped: {skip_reason} ({llm_skip_stats['skipped']} calls skipped, "
+              f"~{llm_skip_stats['saved_seconds']:.1f}s saved)")
+        llm_answ = json.dumps({"reasoning": skip_reason, "action": "WAIT", "confidence": "HIGH"})
     else:
-        trend = "BEARISH"
-
-    # Определяем тренд и опасные состояния жесткой логикой Python
-    rsi_status = "OVERBOUGHT" if rsi >= 70 else ("OVERSOLD" if rsi <= 30 else "NEUTRAL")
-
-    is_dangerously_overextended = extension_pct > 1.5  # Цена выше быстрой скользящей более чем на 1.5%
-    is_buying_climax = vol_ratio > 3.0 and trend == "BULLISH" # Объем в 3 раза выше нормы на росте
-
-    if is_dangerously_overextended or is_buying_climax:
-        trend = "PARABOLIC_DANGER_DO_NOT_BUY"
-
-    # Формируем промпт.
-    prompt = f"""
-    ROLE: You are a professional crypto quant trader.
-
-    MARKET STATE for {coin}:
-    1. Current Price: {price}
-    2. Trend (EMA 50): {trend}
-    3. Momentum (RSI 14): {rsi:.2f} ({rsi_status})
-    4. Volatility (ATR): {atr:.2f}
-    5. Extension from fast EMA10: {extension_pct:.2f}%
-    6. Volume Spike Ratio: {vol_ratio:.1f}x average
-
-    YOUR STRATEGY RULES:
-    - BUY only if Trend is BULLISH, RSI is < 70, AND Extension is < 1.0%.
-    - DO NOT BUY if Trend is PARABOLIC_DANGER_DO_NOT_BUY (market is overextended or buying climax).
-    - SELL only if Trend is BEARISH and RSI is not OVERSOLD (<30).
-    - If market is flat, overextended, or conflicting signals -> WAIT.
-
-    OUTPUT FORMAT:
-    Return a JSON object with your decision. Do NOT calculate prices, I will calculate TP/SL based on ATR automatically.
-
-    {{
-        "reasoning": "Explain why in 1 sentence based on RSI and Trend",
-        "action": "BUY" or "SELL" or "WAIT",
-        "confidence": "HIGH" or "LOW"
-    }}
-    """
-
-    bot.add_to_message(prompt)
-    llm_answ = bot.send_and_reset_message()
+        # Если квантованное состояние рынка и позиции не изменилось, берем прошлое решение LLM
+        cache_key = None
+        position = position_state(snapshot, coin)
+        if DECISION_CACHE_ENABLED and position is not None:
+            cache_key = decision_key(coin, state, position)
+        llm_answ = decision_cache.get(cache_key) if cache_key is not None else None
+
+        if llm_answ is not None:
+            print(f"♻️ Reusing cached LLM decision ({decision_cache.format_stats()})")
+        else:
+            # Формируем промпт: статичные правила идут system-сообщением (кэшируются llama.cpp),
+            # в user-сообщении только данные текущего цикла.
+            bot.add_to_message(decision_user_message(coin, state))
+            # Стримим ответ и обрываем генерацию на закрывающей скобке JSON;
+            # схема допускает только действия, разрешенные правилами, и WAIT
+            llm_answ = bot.send_and_reset_message(stop_on_json=True, json_schema=decision_schema(actions),
+                                                  max_tokens=LLM_DECISION_MAX_TOKENS,
+                                                  system=DECISION_SYSTEM, slot=DECISION_SLOT)
+            if cache_key is not None:
+                decision_cache.put(cache_key, llm_answ)
     print(f"LLM Reasoning: {llm_answ}")
 
     # --- PYTHON GUARDRAILS (ЖЕСТКАЯ БЛОКИРОВКА ГАЛЛЮЦИНАЦИЙ LLM) ---
@@ -117,17 +115,11 @@ def HInfoSend(risk, coin):
             parsed_json = json.loads(llm_answ[start_idx:end_idx])
             action = parsed_json.get("action", "").upper()
 
-            # Если LLM сказала BUY, но математика запрещает -> Отменяем
-            forced_wait = None
-            if action == "BUY" and (trend != "BULLISH" or extension_pct >= 1.0 or rsi >= 70):
-                print(f"❌ PYTHON GUARDRAIL ACTIVATED: Blocked BUY (Trend: {trend}, RSI: {rsi:.2f}, Ext: {extension_pct:.2f}%)")
-                forced_wait = "Python Guardrails blocked BUY (trend/RSI/overextension)."
-            # Симметричный guardrail для SELL: только при BEARISH и не перепроданности
-            elif action == "SELL" and (trend != "BEARISH" or rsi <= 30):
-                print(f"❌ PYTHON GUARDRAIL ACTIVATED: Blocked SELL (Trend: {trend}, RSI: {rsi:.2f})")
-                forced_wait = "Python Guardrails blocked SELL (trend/RSI oversold)."
-
+            # Если LLM сказала BUY/SELL, но математика запрещает -> Отменяем
+            forced_wait = guardrail_block_reason(action, state)
             if forced_wait is not None:
+                print(f"❌ PYTHON GUARDRAIL ACTIVATED: Blocked {action} "
+                      f"(Trend: {trend}, RSI: {rsi:.2f}, Ext: {extension_pct:.2f}%)")
                 # Принудительно перезаписываем ответ перед отправкой на исполнение
                 llm_answ = json.dumps({
                     "reasoning": forced_wait,
@@ -138,27 +130,83 @@ def HInfoSend(risk, coin):
         print(f"Guardrail check error: {e}")
     # -------------------------------------------------------------
 
+    if DECISION_LOG_ENABLED:
+        log_decision({"ts": int(last_row['timestamp']), "instId": coin, "price": current_price,
+                      "answer": llm_answ, "logged_at": time.time()})
+
     # Передаем ATR в функцию исполнения, чтобы Python сам посчитал стопы
-    execution_results, llm_wait_time = parse_and_execute_commands(trader, coin, llm_answ, current_price, atr)
+    execution_results, llm_wait_time = parse_and_execute_commands(
+        trader, coin, llm_answ, current_price, atr, snapshot=snapshot)
 
     send_message_to_all_users(TELEGRAM_BOT_TOKEN, TELEGRAM_USER_IDS, llm_answ)
     send_message_to_all_users(TELEGRAM_BOT_TOKEN, TELEGRAM_USER_IDS, f"--- Execution Results ---\n{execution_results}")
 
     return llm_wait_time
 
+async def _breakeven_all(client, atr_by_coin):
+    """ Breakeven stop checks for every coin concurrently. """
+    await asyncio.gather(*(client.update_stop_loss_to_breakeven(coin, atr) for coin, atr in atr_by_coin.items()))
+
+def run_scanner_cycle():
+    """
+    Scanner mode: ranks the liquid USDT swaps and runs HInfoSend for the top candidates.
+    Breakeven stops of the candidates and of held coins outside the top-K are managed
+    first, with the per-symbol exchange calls fanned out concurrently.
+    Returns the shortest wait the LLM asked for, or None.
+    """
+    candidates = scan_market(market)
+
+    atr_by_coin = {c['instId']: c['features']['ATR'] for c in candidates}
+    snapshot = trader.get_account_snapshot()
+    held = [s for s in (snapshot.positions if snapshot is not None else {})
+            if s.endswith("USDT") and f"{s[:-4]}-USDT" not in atr_by_coin]
+    for symbol in held:
+        coin = f"{symbol[:-4]}-USDT"
+        features = market.get_latest_features(coin, '15m')
+        if features is not None:
+            atr_by_coin[coin] = features['ATR']
+    try:
+        async_trader.run(lambda client: _breakeven_all(client, atr_by_coin))
+    except Exception as e:
+        print(f"⚠️ Concurrent breakeven update failed ({e}); updating sequentially.")
+        for coin, atr in atr_by_coin.items():
+            trader.update_stop_loss_to_breakeven(coin, atr)
+
+    waits = []
+    for candidate in candidates:
+        print(f"\n--- Running analysis for {candidate['instId']} (scanner score {candidate['score']:.2f}) ---")
+        wait = HInfoSend(0, candidate['instId'], features=candidate['features'], raw_price=candidate['price'],
+                         manage_breakeven=False)
+        if wait is not None:
+            waits.append(wait)
+
+    return min(waits) if waits else None
+
 if __name__ == '__main__':
     # Start the Telegram listener in a background thread
     telegram_thread = threading.Thread(target=poll_telegram_updates, args=(TELEGRAM_BOT_TOKEN,), daemon=True)
     telegram_thread.start()
 
+    if BYBIT_WS_ENABLED:
+        print("Starting Bybit private stream...")
+        trader.start_private_stream()
+
+    market.start_stream([get_trading_coin()])
+
+    # Warm the instrument filters so no order placement waits on a filter fetch.
+    trader.preload_instrument_filters()
+
     try:
         print("Starting the main trading loop. Press Ctrl+C to stop.")
         while True:
             try:
-                current_coin = get_trading_coin()
-                print(f"\n--- Running analysis for {current_coin} ---")
+                if SCANNER_ENABLED:
+                    llm_specified_wait_time = run_scanner_cycle()
+                else:
+                    current_coin = get_trading_coin()
+                    print(f"\n--- Running analysis for {current_coin} ---")
 
-                llm_specified_wait_time = HInfoSend(0, current_coin)
+                    llm_specified_wait_time = HInfoSend(0, current_coin)
 
                 if llm_specified_wait_time is not None:
                     interval_seconds = llm_specified_wait_time
@@ -184,3 +232,5 @@ if __name__ == '__main__':
 
     except KeyboardInterrupt:
         print("\nLoop stopped by user. Exiting.")
+    finally:
+        async_trader.close()
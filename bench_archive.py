@@ -0,0 +1,96 @@
+"""
+CandleArchive benchmark: a year of synthetic 1m candles (525,600 rows).
+
+Measures append throughput, opening the archive, loading the whole year into memory,
+range queries by timestamp and resampling the year to 15m, and compares the load with
+parsing the same data from CSV. Runs in a temporary directory.
+
+    python bench_archive.py --days 365
+"""
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from CandleArchive import CandleArchive
+from CandleStore import resample
+
+MINUTE_MS = 60_000
+DAY_MS = 1440 * MINUTE_MS
+
+
+def synthetic_year(days, seed=7):
+    """ (N, 6) array of 1m candles: ts, open, high, low, close, volume. """
+    rng = np.random.default_rng(seed)
+    n = int(days * 1440)
+    ts = 1_700_000_000_000 // MINUTE_MS * MINUTE_MS + np.arange(n, dtype=np.int64) * MINUTE_MS
+    close = 150 * np.exp(np.cumsum(rng.normal(0, 0.0008, n)))
+    open_ = np.r_[150.0, close[:-1]]
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.0003, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.0003, n)))
+    volume = rng.uniform(10, 5000, n)
+    return np.column_stack([ts, open_, high, low, close, volume])
+
+
+def timed(fn, runs=5):
+    """ Best wall time of `runs` calls and the last result. """
+    best, result = float("inf"), None
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="CandleArchive load/query benchmark")
+    parser.add_argument("--days", type=float, default=365)
+    parser.add_argument("--chunk", type=int, default=300, help="candles per append (a CandleStore page)")
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="candle_archive_")
+    try:
+        data = synthetic_year(args.days)
+        print(f"{len(data):,} 1m candles ({args.days:g} days)\n")
+
+        archive = CandleArchive("BENCH-USDT", "1m", root=root)
+        started = time.perf_counter()
+        for i in range(0, len(data), args.chunk):
+            archive.append(data[i:i + args.chunk])
+        append_s = time.perf_counter() - started
+        size_mb = sum(os.path.getsize(os.path.join(archive.path, f)) for f in os.listdir(archive.path)) / 2**20
+
+        open_s, reopened = timed(lambda: CandleArchive("BENCH-USDT", "1m", root=root))
+        map_s, _ = timed(lambda: CandleArchive("BENCH-USDT", "1m", root=root).range())
+        load_s, loaded = timed(lambda: {k: np.array(v) for k, v in reopened.range().items()})
+        assert np.array_equal(loaded["close"], data[:, 4]) and np.array_equal(loaded["timestamp"], data[:, 0])
+
+        t0 = int(data[len(data) // 2, 0])
+        day_s, _ = timed(lambda: reopened.range(t0, t0 + DAY_MS)["close"].sum(), runs=50)
+        week_s, _ = timed(lambda: reopened.range(t0, t0 + 7 * DAY_MS)["close"].sum(), runs=50)
+        resample_s, bars = timed(lambda: resample(reopened.rows(), 15 * MINUTE_MS), runs=3)
+
+        csv_path = os.path.join(root, "year.csv")
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            for row in data:
+                writer.writerow([int(row[0])] + [repr(float(x)) for x in row[1:]])
+        csv_s, _ = timed(lambda: np.loadtxt(csv_path, delimiter=",", dtype=np.float64), runs=1)
+
+        print(f"{'append (chunks of ' + str(args.chunk) + ')':<28}{append_s * 1000:>10.1f} ms"
+              f"  ({len(data) / append_s:,.0f} rows/s, {size_mb:.1f} MiB on disk)")
+        print(f"{'open archive':<28}{open_s * 1000:>10.3f} ms")
+        print(f"{'open + memmap all columns':<28}{map_s * 1000:>10.3f} ms")
+        print(f"{'load year into RAM':<28}{load_s * 1000:>10.1f} ms")
+        print(f"{'range query: 1 day':<28}{day_s * 1e6:>10.1f} us")
+        print(f"{'range query: 1 week':<28}{week_s * 1e6:>10.1f} us")
+        print(f"{'resample year to 15m':<28}{resample_s * 1000:>10.1f} ms  ({len(bars):,} bars)")
+        print(f"{'CSV load (np.loadtxt)':<28}{csv_s * 1000:>10.1f} ms  "
+              f"({csv_s / max(load_s, 1e-9):.0f}x the archive load)")
+        print("\nTimes are best-of-N with a warm page cache.")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,134 @@
+"""
+Indicator path benchmark: the previous pandas/ta pipeline vs the NumPy kernels.
+
+Compares import (startup) time, CPU per cycle for one OKX candles page and peak memory,
+and checks that both paths produce the same values.
+
+    python bench_indicators.py --rows 300 --cycles 200
+"""
+import argparse
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+COLUMNS = ['RSI', 'EMA_50', 'EMA_10', 'ATR', 'Vol_SMA_20']
+
+
+def synthetic_okx_page(rows, seed=5):
+    """ An OKX /market/candles `data` array: newest first, all fields as strings. """
+    rng = random.Random(seed)
+    price, candles = 150.0, []
+    for i in range(rows):
+        open_ = price
+        price = price * (1 + rng.gauss(0, 0.003))
+        high = max(open_, price) * (1 + abs(rng.gauss(0, 0.001)))
+        low = min(open_, price) * (1 - abs(rng.gauss(0, 0.001)))
+        candles.append([str(1_700_000_000_000 + i * 900_000), f"{open_:.4f}", f"{high:.4f}", f"{low:.4f}",
+                        f"{price:.4f}", f"{rng.uniform(100, 5000):.2f}", "0", "0", "0" if i == rows - 1 else "1"])
+    return candles[::-1]
+
+
+def pandas_path(data):
+    """ The pre-NumPy get_okx_market_data body for one bar. """
+    import pandas as pd
+    from ta.momentum import RSIIndicator
+    from ta.trend import EMAIndicator
+    from ta.volatility import AverageTrueRange
+
+    columns = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'volCcy', 'volCcyQuote', 'confirm']
+    df = pd.DataFrame(data, columns=columns)
+    df = df[['timestamp', 'high', 'low', 'close', 'volume']]
+    df['timestamp'] = pd.to_numeric(df['timestamp'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    for col in ['high', 'low', 'close', 'volume']:
+        df[col] = pd.to_numeric(df[col])
+    df.set_index('timestamp', inplace=True)
+    df = df.iloc[::-1]
+
+    df["RSI"] = RSIIndicator(close=df["close"], window=14).rsi()
+    df["EMA_50"] = EMAIndicator(close=df["close"], window=50).ema_indicator()
+    df["EMA_10"] = EMAIndicator(close=df["close"], window=10).ema_indicator()
+    df["ATR"] = AverageTrueRange(high=df["high"], low=df["low"], close=df["close"], window=14).average_true_range()
+    df["Vol_SMA_20"] = df["volume"].rolling(window=20).mean()
+    df.dropna(inplace=True)
+    return df.tail(50)
+
+
+def numpy_path(data):
+    """ OKX strings -> contiguous float64 arrays -> vectorized kernels, no DataFrame. """
+    import numpy as np
+    from IndicatorKernels import okx_to_arrays, compute_indicators
+
+    a = okx_to_arrays(data)
+    columns = compute_indicators(a["high"], a["low"], a["close"], a["volume"])
+    valid = np.logical_and.reduce([np.isfinite(columns[c]) for c in COLUMNS])
+    return {name: values[valid][-50:] for name, values in dict(a, **columns).items()}
+
+
+def import_time(statement, runs):
+    """ Median wall time of a fresh interpreter executing `statement`, minus a bare interpreter. """
+    def measure(code):
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, "-c", code], check=True)
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples)
+    return measure(statement) - measure("pass")
+
+
+def cpu_per_cycle(fn, data, cycles):
+    fn(data)  # warm imports and caches
+    started = time.process_time()
+    for _ in range(cycles):
+        fn(data)
+    return (time.process_time() - started) / cycles
+
+
+def peak_memory(fn, data):
+    fn(data)
+    tracemalloc.start()
+    fn(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def check_parity(data):
+    import numpy as np
+    df = pandas_path(data)
+    arrays = numpy_path(data)
+    assert len(df) == len(arrays["close"]), "row count differs"
+    for column in COLUMNS:
+        if not np.allclose(df[column].to_numpy(), arrays[column], rtol=1e-9, atol=0):
+            raise AssertionError(f"{column} differs")
+    return len(df)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="pandas/ta vs NumPy indicator benchmark")
+    parser.add_argument("--rows", type=int, default=300, help="candles per OKX page")
+    parser.add_argument("--cycles", type=int, default=200)
+    parser.add_argument("--import-runs", type=int, default=5)
+    args = parser.parse_args()
+
+    data = synthetic_okx_page(args.rows)
+    print(f"Parity: {check_parity(data)} rows identical (rtol 1e-9)")
+
+    old_import = import_time("import pandas, ta.momentum, ta.trend, ta.volatility", args.import_runs)
+    new_import = import_time("import IndicatorKernels", args.import_runs)
+    old_cpu = cpu_per_cycle(pandas_path, data, args.cycles)
+    new_cpu = cpu_per_cycle(numpy_path, data, args.cycles)
+    old_mem = peak_memory(pandas_path, data)
+    new_mem = peak_memory(numpy_path, data)
+
+    print(f"\n{'':<22}{'pandas/ta':>12}{'numpy':>12}{'speedup':>10}")
+    print(f"{'startup import (ms)':<22}{old_import * 1000:>12.1f}{new_import * 1000:>12.1f}"
+          f"{old_import / max(new_import, 1e-9):>9.1f}x")
+    print(f"{'CPU per cycle (ms)':<22}{old_cpu * 1000:>12.3f}{new_cpu * 1000:>12.3f}"
+          f"{old_cpu / max(new_cpu, 1e-9):>9.1f}x")
+    print(f"{'peak memory (KiB)':<22}{old_mem / 1024:>12.1f}{new_mem / 1024:>12.1f}"
+          f"{old_mem / max(new_mem, 1):>9.1f}x")
@@ -0,0 +1,135 @@
+"""
+Order-path latency benchmark against the local Bybit mock (no testnet traffic).
+
+Runs main.place_ready_order (signal-channel bot) and ParseFuncLLM.parse_and_execute_commands
+(LLM bot) end-to-end and reports p50/p99 time to place one order and the HTTP calls it took.
+The client-side rate limiter is disabled by default so back-to-back iterations measure the
+order path rather than token-bucket sleeps; with --rate-limits the real limits apply and the
+throttle wait is reported in its own column either way.
+
+    python bench_orderpath.py --iterations 200 --latency 0.02
+"""
+import argparse
+import contextlib
+import io
+import time
+
+from BybitMockServer import BybitMockServer
+from Bybitinteract import BybitTrader
+from RateLimiter import BybitRateLimiter
+
+BENCH_API_KEY = "bench-key"
+BENCH_SECRET = "bench-secret"
+SYMBOLS = ["SOLUSDT", "BTCUSDT", "ETHUSDT", "XRPUSDT"]
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _signal_order(i, mark):
+    return {"id": i, "symbol": SYMBOLS[i % len(SYMBOLS)], "direction": 1,
+            "entry_price": mark * 0.99, "take_profit": mark * 1.05, "stop_loss": mark * 0.95}
+
+
+def _throttle_seconds(limiter):
+    """ Total client-side throttle wait the limiter has imposed so far. """
+    return sum(m["wait_seconds"] for m in limiter.get_metrics().values())
+
+
+def _run_case(name, mock, iterations, call, limiter):
+    """
+    Times `call(i)` (which returns True when an order was placed), counts mock requests and
+    separates the rate limiter's throttle wait from the measured time.
+    """
+    timings, throttles, calls, per_endpoint, placed = [], [], [], {}, 0
+    for i in range(iterations):
+        mock.reset_state(keep_leverage=True)  # every iteration starts flat, like a fresh signal
+        mock.reset_counts()
+        throttled_before = _throttle_seconds(limiter)
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            ok = call(i)
+            timings.append(time.perf_counter() - started)
+        throttles.append(_throttle_seconds(limiter) - throttled_before)
+        placed += bool(ok)
+        counts = mock.request_counts()
+        calls.append(sum(counts.values()))
+        for endpoint, n in counts.items():
+            per_endpoint[endpoint] = per_endpoint.get(endpoint, 0) + n
+
+    timings.sort()
+    throttles.sort()
+    print(f"\n=== {name} ({iterations} runs, {placed} placed) ===")
+    print(f"   p50 {_percentile(timings, 50) * 1000:8.2f} ms | p99 {_percentile(timings, 99) * 1000:8.2f} ms "
+          f"| max {timings[-1] * 1000:8.2f} ms")
+    print(f"   throttle wait: p50 {_percentile(throttles, 50) * 1000:8.2f} ms | "
+          f"p99 {_percentile(throttles, 99) * 1000:8.2f} ms | total {sum(throttles):.2f} s "
+          f"({sum(1 for t in throttles if t > 0)} runs throttled)")
+    print(f"   HTTP calls per order: {sum(calls) / iterations:.2f}")
+    for endpoint, n in sorted(per_endpoint.items(), key=lambda kv: -kv[1]):
+        print(f"      {endpoint:<32} {n / iterations:.2f}")
+
+
+def run_benchmark(iterations=200, latency=0.02, jitter=0.0, error_rate=0.0, rate_limits=False):
+    mock = BybitMockServer(latency=latency, jitter=jitter, error_rate=error_rate, secret=BENCH_SECRET, seed=1)
+    url = mock.start()
+    print(f"Mock Bybit on {url} | latency {latency * 1000:.0f} ms (+{jitter * 1000:.0f} jitter), "
+          f"error rate {error_rate:.0%}")
+
+    # Imported here: both modules build their own traders at import time; they are redirected below.
+    import main
+    import ParseFuncLLM
+
+    trader = BybitTrader(BENCH_API_KEY, BENCH_SECRET, is_demo=True)
+    trader.base_url = url
+    if not rate_limits:
+        # A zero rate means an unlimited bucket: nothing is throttled on the client.
+        trader.rate_limiter = BybitRateLimiter(limits={}, default_rate=0, ip_rate=0)
+    main.trader = trader
+    ParseFuncLLM.trader = trader
+
+    marks = {symbol: info[5] for symbol, info in mock.instruments.items()}
+
+    def place_signal(i):
+        order = _signal_order(i, marks[SYMBOLS[i % len(SYMBOLS)]])
+        status, _ = main.place_ready_order(order, remaining_margin=1000.0)
+        return status == 'placed'
+
+    def place_llm(i):
+        symbol = SYMBOLS[i % len(SYMBOLS)]
+        instrument_id = symbol.replace("USDT", "-USDT")
+        message, _ = ParseFuncLLM.parse_and_execute_commands(
+            trader, instrument_id, '{"action": "BUY", "reasoning": "benchmark"}',
+            current_price=marks[symbol], atr=marks[symbol] * 0.01)
+        return message.startswith("✅")
+
+    # Warm-up (clock sync, keep-alive connection, instrument filters) is excluded from the stats.
+    with contextlib.redirect_stdout(io.StringIO()):
+        trader.sync_clock()
+        for i in range(len(SYMBOLS)):
+            place_signal(i)
+
+    try:
+        _run_case("main.place_ready_order", mock, iterations, place_signal, trader.rate_limiter)
+        _run_case("ParseFuncLLM.parse_and_execute_commands", mock, iterations, place_llm, trader.rate_limiter)
+    finally:
+        print(f"\nConnection stats: {trader.get_connection_stats()}")
+        print(f"Timing stats: {trader.get_timing_stats()}")
+        trader.close()
+        mock.stop()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Bybit order-path latency benchmark (local mock)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="server delay added to every request (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an injected error")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="keep the client-side rate limiter (Bybit's per-endpoint limits)")
+    args = parser.parse_args()
+    run_benchmark(args.iterations, args.latency, args.jitter, args.error_rate, args.rate_limits)
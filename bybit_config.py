@@ -26,3 +26,73 @@ MIN_NOTIONAL_USDT = 5.0
 
 # Network timeouts (connect, read) in seconds for Bybit HTTP calls.
 HTTP_TIMEOUT = (5, 15)
+
+# --- HTTP connection pool ---
+# Number of keep-alive connections kept open to the Bybit API host. One is enough for the
+# sequential loops; raise it if several threads/symbols hit the API concurrently.
+BYBIT_POOL_SIZE = 4
+
+# Automatic retries for failed connects (and idempotent GET reads). POSTs are never re-sent
+# after the request body left the socket, so an order cannot be duplicated by a retry.
+# GET reads are retried through RetryPolicy (backoff with jitter, 'bybit' circuit breaker)
+# within BYBIT_HTTP_DEADLINE seconds per call.
+BYBIT_HTTP_RETRIES = 2
+BYBIT_HTTP_DEADLINE = 20
+
+# --- Private WebSocket state cache ---
+# When enabled, positions/open orders/wallet are mirrored from Bybit's private stream and
+# exposure/balance checks answer from memory, falling back to REST when the stream is stale.
+BYBIT_WS_ENABLED = False
+
+# The cached state is trusted only if a message (incl. pong) arrived within this many seconds.
+BYBIT_WS_STALE_SECONDS = 30
+
+# Application-level ping interval in seconds (Bybit drops idle private connections).
+BYBIT_WS_PING_INTERVAL = 20
+
+# --- Instrument filters cache ---
+# All linear instrument filters (tickSize/qtyStep/...) are bulk-loaded at startup and saved here.
+INSTRUMENT_CACHE_FILE = 'instrument_filters.json'
+
+# Cached filters older than this (seconds) are refreshed in the background at startup.
+INSTRUMENT_CACHE_TTL = 6 * 3600
+
+# Background refresh period (seconds) for the instrument filters.
+INSTRUMENT_REFRESH_INTERVAL = 3600
+
+# Maximum orders per /v5/order/create-batch request (Bybit caps linear batches at 20).
+BATCH_ORDER_LIMIT = 10
+
+# --- Rate limiting ---
+# Client-side requests/second per endpoint (Bybit's per-UID defaults). The live values are
+# corrected from the X-Bapi-Limit* response headers.
+BYBIT_RATE_LIMITS = {
+    "/v5/order/create": 10,
+    "/v5/order/create-batch": 10,
+    "/v5/order/cancel": 10,
+    "/v5/order/cancel-all": 10,
+    "/v5/position/set-leverage": 10,
+    "/v5/position/trading-stop": 10,
+    "/v5/position/list": 50,
+    "/v5/order/realtime": 50,
+    "/v5/account/wallet-balance": 50,
+}
+
+# Requests/second for endpoints not listed above (public market data, etc.).
+BYBIT_RATE_DEFAULT = 20
+
+# Per-IP limit shared by all endpoints (Bybit: 600 requests per 5 seconds).
+BYBIT_IP_RATE_LIMIT = 120
+
+# Share of the per-IP budget that informational reads may not use, kept for order calls.
+BYBIT_READ_RESERVE = 0.2
+
+# Longest wait (seconds) accepted before the single retry of a 10006 rate-limit rejection.
+BYBIT_RATE_MAX_WAIT = 5.0
+
+# --- Request signing / clock ---
+# X-BAPI-RECV-WINDOW in milliseconds: how long after its timestamp Bybit still accepts a request.
+BYBIT_RECV_WINDOW = 5000
+
+# Seconds between re-measurements of the local clock's offset from Bybit's server time.
+BYBIT_CLOCK_SYNC_INTERVAL = 300
@@ -1,5 +1,54 @@
+import json
+import time
+
 import requests
 
+from llamacpp_config import LLM_STREAM, LLM_MAX_TOKENS, LLM_TIMEOUT, LLM_CACHE_PROMPT
+
+
+class JsonObjectTracker:
+    """
+    Follows the brace depth of streamed text (ignoring braces inside JSON strings and any
+    prose before the first '{'). `end` becomes the offset just past the first complete
+    top-level object once it closes.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escape = False
+        self.length = 0
+        self.end = None
+
+    def feed(self, text):
+        """ Consumes the next chunk; returns True once the object is complete. """
+        if self.end is not None:
+            return True
+        for i, ch in enumerate(text):
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '{':
+                self.depth += 1
+                self.started = True
+            elif not self.started:
+                continue
+            elif ch == '"':
+                self.in_string = True
+            elif ch == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    self.end = self.length + i + 1
+                    break
+        self.length += len(text)
+        return self.end is not None
+
+
 class llamacppBot:
     def __init__(self, api_key, host):
         self.api_key = api_key
@@ -12,6 +61,10 @@ class llamacppBot:
             "Authorization": f"Bearer {self.api_key}"
         }
         self.message = None # Initialize to prevent AttributeError
+        self.session = requests.Session()  # keep-alive to the llama.cpp server
+        self.last_stats = None  # timings of the most recent call (see _record_stats)
+        self.stats = {"calls": 0, "stopped_early": 0, "ttft_total": 0.0, "decode_total": 0.0,
+                      "tokens_total": 0, "prompt_eval_total": 0, "prompt_cached_total": 0, "errors": 0}
 
     def add_to_message(self, text: str):
         self.message = text
@@ -20,42 +73,152 @@ class llamacppBot:
     def _build_message(self):
         return self.message
 
-    def send_message(self):
+    def _payload(self, full_message, stream, max_tokens, json_schema=None, grammar=None, system=None, slot=None):
+        # Use the standard OpenAI-compatible structure understood by llama.cpp
+        messages = [{"role": "user", "content": full_message}]
+        if system:
+            # A stable system prompt first keeps the prompt prefix identical between calls
+            messages.insert(0, {"role": "system", "content": system})
+        payload = {
+            "messages": messages,
+            "stream": stream,
+            "cache_prompt": LLM_CACHE_PROMPT,
+        }
+        if stream:
+            # Timings ride on every chunk, so prompt-eval counts survive an early hang-up
+            payload["timings_per_token"] = True
+        if slot is not None:
+            payload["id_slot"] = slot
+        if max_tokens:
+            payload["max_tokens"] = max_tokens
+        # llama.cpp turns the schema (or a raw GBNF grammar) into sampling constraints,
+        # so the answer is exactly one object of that shape with no prose around it.
+        if json_schema is not None:
+            payload["json_schema"] = json_schema
+        elif grammar is not None:
+            payload["grammar"] = grammar
+        return payload
+
+    def send_message(self, stream=LLM_STREAM, stop_on_json=True, max_tokens=LLM_MAX_TOKENS,
+                     json_schema=None, grammar=None, system=None, slot=None):
+        """
+        Sends the message to /v1/chat/completions and returns the answer text.
+
+        With `stream`, tokens are read from the SSE stream; when `stop_on_json` is set the
+        connection is closed as soon as the first JSON object in the answer is complete,
+        which makes llama.cpp stop generating, and only the text up to its closing brace is
+        returned. Time-to-first-token and decode time are kept in `last_stats`.
+
+        `json_schema` (a JSON Schema dict) or `grammar` (GBNF text) constrains the output.
+        `system` is sent as a system message before the user message and `slot` pins the
+        request to a llama.cpp slot, so the cached system prompt is reused across calls;
+        `last_stats` reports how many prompt tokens were evaluated and how many were cached.
+        """
+        if json_schema is not None and grammar is not None:
+            raise ValueError("Pass either json_schema or grammar, not both")
         full_message = self._build_message()
         if not full_message:
             return "Message is empty. Nothing to send"
 
         print(f"\nОтправка сообщения: '{full_message}'")
+        # 2. Use the standard OpenAI-compatible endpoint built into llama.cpp
+        endpoint = f"{self.host}/v1/chat/completions"
+        payload = self._payload(full_message, stream, max_tokens, json_schema, grammar, system, slot)
+        started = time.perf_counter()
         try:
-            # 2. Use the standard OpenAI-compatible endpoint built into llama.cpp
-            endpoint = f"{self.host}/v1/chat/completions"
-
-            # 3. Correctly structure the JSON payload
-            payload = {
-                "messages": [
-                    {"role": "user", "content": full_message}
-                ]
-            }
-
-            response = requests.post(
-                endpoint,
-                headers=self.headers,
-                json=payload # requests handles json.dumps automatically here
-            )
-            response.raise_for_status()
+            if stream:
+                return self._stream_completion(endpoint, payload, started, stop_on_json)
 
+            response = self.session.post(endpoint, headers=self.headers, json=payload, timeout=LLM_TIMEOUT)
+            response.raise_for_status()
             # 4. Correctly parse the standard response structure
-            return response.json()['choices'][0]['message']['content']
+            data = response.json()
+            content = data['choices'][0]['message']['content']
+            elapsed = time.perf_counter() - started
+            tokens = data.get('usage', {}).get('completion_tokens', 0)
+            # Without streaming the first token is only seen with the whole answer
+            self._record_stats(elapsed, 0.0, tokens, False, data.get('timings'))
+            return content
 
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, ValueError, KeyError, IndexError) as e:
+            self.stats["errors"] += 1
             return f"An error occured: {e}"
 
+    def _stream_completion(self, endpoint, payload, started, stop_on_json):
+        tracker = JsonObjectTracker() if stop_on_json else None
+        parts, tokens, first_token_at, timings = [], 0, None, None
+        stopped_early = False
+
+        response = self.session.post(endpoint, headers=self.headers, json=payload, stream=True, timeout=LLM_TIMEOUT)
+        try:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                timings = chunk.get("timings") or timings
+                choices = chunk.get("choices") or []
+                text = (choices[0].get("delta") or {}).get("content") if choices else None
+                if not text:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                tokens += 1
+                parts.append(text)
+                if tracker is not None and tracker.feed(text):
+                    stopped_early = True
+                    break
+        finally:
+            # Closing the connection mid-stream makes llama.cpp cancel the rest of the generation.
+            response.close()
+
+        finished = time.perf_counter()
+        ttft = (first_token_at or finished) - started
+        self._record_stats(ttft, finished - (first_token_at or finished), tokens, stopped_early, timings)
+        content = "".join(parts)
+        return content[:tracker.end] if stopped_early else content
+
+    def _record_stats(self, ttft, decode_seconds, tokens, stopped_early, timings=None):
+        # llama.cpp timings: prompt_n = prompt tokens evaluated this call, cache_n = reused from the slot cache
+        timings = timings or {}
+        prompt_eval, prompt_cached = timings.get("prompt_n"), timings.get("cache_n")
+        self.last_stats = {
+            "ttft_s": round(ttft, 3),
+            "decode_s": round(decode_seconds, 3),
+            "tokens": tokens,
+            "tokens_per_s": round(tokens / decode_seconds, 1) if decode_seconds > 0 else None,
+            "stopped_early": stopped_early,
+            "prompt_eval_tokens": prompt_eval,
+            "prompt_cached_tokens": prompt_cached,
+            "prompt_eval_ms": timings.get("prompt_ms"),
+        }
+        self.stats["calls"] += 1
+        self.stats["stopped_early"] += int(stopped_early)
+        self.stats["ttft_total"] += ttft
+        self.stats["decode_total"] += decode_seconds
+        self.stats["tokens_total"] += tokens
+        self.stats["prompt_eval_total"] += prompt_eval or 0
+        self.stats["prompt_cached_total"] += prompt_cached or 0
+        prompt_info = "" if prompt_eval is None else (
+            f", prompt {prompt_eval} evaluated" + ("" if prompt_cached is None else f" / {prompt_cached} cached"))
+        print(f"⏱️ LLM: TTFT {ttft * 1000:.0f} ms, decode {decode_seconds * 1000:.0f} ms, {tokens} tokens"
+              f"{prompt_info}{' (stopped at closing brace)' if stopped_early else ''}")
+
+    def get_stats(self):
+        """ Cumulative call statistics with average TTFT / decode time per call. """
+        calls = self.stats["calls"] or 1
+        return dict(self.stats, avg_ttft_s=round(self.stats["ttft_total"] / calls, 3),
+                    avg_decode_s=round(self.stats["decode_total"] / calls, 3))
+
     def reset_message(self):
         self.message = None
         print("Message is reset.")
 
-    def send_and_reset_message(self):
-        response = self.send_message()
+    def send_and_reset_message(self, **kwargs):
+        response = self.send_message(**kwargs)
         self.reset_message()
         return response
 
@@ -1,2 +1,17 @@
 LLM_API_KEY = "YOUR_LLM_API_KEY"
 LLM_HOST = "http://localhost:8000"
+
+# Streaming: read the answer token by token and hang up as soon as the JSON object is closed
+LLM_STREAM = True
+LLM_MAX_TOKENS = 512           # hard cap on generated tokens per call
+LLM_TIMEOUT = (5, 120)         # (connect, read between streamed chunks) seconds
+
+# Answers constrained by a JSON schema are short; these caps leave headroom over the schema's size
+LLM_DECISION_MAX_TOKENS = 128  # algomain.HInfoSend decision
+LLM_EXTRACT_MAX_TOKENS = 128   # ParseChannel signal extraction
+
+# Prompt cache: keep each task's static system prompt in its own llama.cpp slot
+# (the server needs at least two slots, e.g. `llama-server -np 2`; -1 lets the server pick)
+LLM_CACHE_PROMPT = True
+LLM_SLOT_DECISION = 0          # algomain.HInfoSend
+LLM_SLOT_EXTRACT = 1           # ParseChannel.ask_llm_for_json
@@ -6,8 +6,9 @@ from Database import init_db, timeout_old_orders, get_ready_orders, mark_order_p
 from ParseChannel import parse_last_messages
 from Logging import log_message
 from Bybitinteract import BybitTrader
+from AsyncBybitinteract import AsyncTraderLoop
 from bybit_config import (
-    BYBIT_API_KEY, BYBIT_SECRET_KEY, BYBIT_IS_DEMO,
+    BYBIT_API_KEY, BYBIT_SECRET_KEY, BYBIT_IS_DEMO, BYBIT_WS_ENABLED,
     LEVERAGE, RISK_FRACTION, MAX_MARGIN_FRACTION,
 )
 from Config import *
@@ -18,6 +19,8 @@ from TelegramInteract import (
 
 print("Initializing BybitTrader...")
 trader = BybitTrader(BYBIT_API_KEY, BYBIT_SECRET_KEY, is_demo=BYBIT_IS_DEMO)
+# One event loop + async client for the whole run, so concurrent checks reuse warm connections.
+async_trader = AsyncTraderLoop(trader)
 
 if __name__ == '__main__':
     print("Initializing Database...")
@@ -36,11 +39,18 @@ def _coerce_price(value):
         return None
 
 
-def place_ready_order(order, remaining_margin):
+# Permanent rejects (bad params) as opposed to transient ones worth retrying next cycle.
+PERMANENT_REJECT_CODES = {-3, -4, -5, -6, '110007', '110017', '170137', '110045'}
+
+
+def prepare_ready_order(order, remaining_margin, exposed=None):
     """
-    Attempts to place one READY_TO_PLACE order.
-    Returns (status, margin_used) where status is one of
-    'placed' | 'skip_retry' | 'invalid', and margin_used is float committed.
+    Validates and sizes one READY_TO_PLACE order without sending it.
+    Returns (status, order_kwargs, margin_to_use) where status is one of
+    'ready' | 'skip_retry' | 'invalid'. For 'ready', order_kwargs holds the keyword
+    arguments for trader.place_limit_order_with_tp_sl / place_limit_orders_batch.
+    `exposed` is the pre-fetched position/order check for the symbol; None checks now.
+    Leverage is not set here; the caller sets it before sending.
     """
     symbol = order['symbol']
     direction = order['direction']
@@ -53,51 +63,164 @@ def place_ready_order(order, remaining_margin):
     # Reject structurally invalid signals (bad numbers / incoherent direction).
     if not symbol or entry_price is None or take_profit is None or stop_loss is None:
         print(f"❌ Invalid order #{order['id']}: non-numeric price fields.")
-        return 'invalid', 0.0
+        return 'invalid', None, 0.0
     if direction == 1 and not (stop_loss < entry_price < take_profit):
         print(f"❌ Invalid LONG #{order['id']}: need SL<entry<TP "
               f"({stop_loss} < {entry_price} < {take_profit}).")
-        return 'invalid', 0.0
+        return 'invalid', None, 0.0
     if direction == 0 and not (take_profit < entry_price < stop_loss):
         print(f"❌ Invalid SHORT #{order['id']}: need TP<entry<SL "
               f"({take_profit} < {entry_price} < {stop_loss}).")
-        return 'invalid', 0.0
+        return 'invalid', None, 0.0
 
     # Do not stack onto an existing position or resting order for this symbol.
-    if trader.has_open_position(symbol) or trader.has_open_order(symbol):
+    if exposed is None:
+        exposed = trader.has_open_position(symbol) or trader.has_open_order(symbol)
+    if exposed:
         print(f"⏭️ Skip #{order['id']}: existing position/order on {symbol}.")
-        return 'skip_retry', 0.0
+        return 'skip_retry', None, 0.0
 
     if remaining_margin is None or remaining_margin <= 0:
         print(f"⏭️ Skip #{order['id']}: no free margin this cycle (will retry).")
-        return 'skip_retry', 0.0
+        return 'skip_retry', None, 0.0
 
     # Size from the remaining free margin, scaled by leverage.
     margin_to_use = min(remaining_margin * RISK_FRACTION, remaining_margin * MAX_MARGIN_FRACTION)
     notional = margin_to_use * LEVERAGE
     raw_qty = notional / entry_price
 
-    # Set leverage explicitly (idempotent) so the order is not rejected/oversized.
-    trader.set_leverage(symbol, LEVERAGE)
-
-    result = trader.place_limit_order_with_tp_sl(
-        instrument_id=symbol,
-        side=action,
-        size=raw_qty,
-        price=entry_price,
-        take_profit_price=take_profit,
-        stop_loss_price=stop_loss,
-    )
-    print(f"Execution Result: {result.get('retMsg')}")
+    order_kwargs = {
+        "instrument_id": symbol,
+        "side": action,
+        "size": raw_qty,
+        "price": entry_price,
+        "take_profit_price": take_profit,
+        "stop_loss_price": stop_loss,
+    }
+    return 'ready', order_kwargs, margin_to_use
+
 
+def classify_order_result(result):
+    """ Maps a trader order result to 'placed' | 'skip_retry' | 'invalid'. """
     if result.get('ok'):
-        return 'placed', margin_to_use
+        return 'placed'
+    if result.get('retCode') in PERMANENT_REJECT_CODES:
+        return 'invalid'
+    return 'skip_retry'
+
+
+def place_ready_order(order, remaining_margin):
+    """
+    Attempts to place one READY_TO_PLACE order.
+    Returns (status, margin_used) where status is one of
+    'placed' | 'skip_retry' | 'invalid', and margin_used is float committed.
+    """
+    status, order_kwargs, margin_to_use = prepare_ready_order(order, remaining_margin)
+    if status != 'ready':
+        return status, 0.0
+
+    # Set leverage explicitly so the order is not rejected/oversized (skipped when already cached).
+    trader.set_leverage(order_kwargs['instrument_id'], LEVERAGE)
+
+    result = trader.place_limit_order_with_tp_sl(**order_kwargs)
+    print(f"Execution Result: {result.get('retMsg')}")
+
+    status = classify_order_result(result)
+    return status, (margin_to_use if status == 'placed' else 0.0)
 
-    # Distinguish permanent rejects (bad params) from transient ones worth retrying.
-    permanent_codes = {-3, -4, -5, -6, '110007', '110017', '170137', '110045'}
-    if result.get('retCode') in permanent_codes:
-        return 'invalid', 0.0
-    return 'skip_retry', 0.0
+
+async def _check_exposure_async(client, symbols):
+    """ Position/order checks for all symbols concurrently. Returns {symbol: exposed}. """
+    async def _check(symbol):
+        has_position, has_order = await asyncio.gather(
+            client.has_open_position(symbol), client.has_open_order(symbol))
+        return symbol, has_position or has_order
+    return dict(await asyncio.gather(*(_check(s) for s in symbols)))
+
+
+async def _set_leverage_async(client, symbols):
+    """ Sets LEVERAGE on all symbols concurrently. """
+    await asyncio.gather(*(client.set_leverage(s, LEVERAGE) for s in symbols))
+
+
+def place_ready_orders(ready_orders, remaining_margin, snapshot=None):
+    """
+    Validates/sizes every READY_TO_PLACE order of this cycle and sends the valid ones in a
+    single create-batch request instead of one round trip per order.
+    Exposure comes from the cycle's AccountSnapshot; without one, the per-symbol checks run
+    concurrently. Leverage updates for the different symbols also run concurrently.
+    Returns the margin left after the placed orders.
+    """
+    batch = []  # (order, order_kwargs, margin_to_use)
+    batch_symbols = set()
+
+    symbols = sorted({o['symbol'] for o in ready_orders if o['symbol']})
+    if snapshot is not None:
+        exposure = {s: snapshot.has_exposure(s) for s in symbols}
+    else:
+        try:
+            exposure = async_trader.run(lambda client: _check_exposure_async(client, symbols))
+        except Exception as e:
+            print(f"⚠️ Concurrent exposure check failed ({e}); checking sequentially.")
+            exposure = {}
+
+    for order in ready_orders:
+        print(f"\n🚀 --- READY TO EXECUTE ORDER --- 🚀")
+        print(f"ID: {order['id']} | Pair: {order['symbol']} | "
+              f"Dir: {'LONG' if order['direction'] == 1 else 'SHORT'}")
+        print(f"Entry: {order['entry_price']} | TP: {order['take_profit']} | SL: {order['stop_loss']}")
+
+        # The exposure check cannot see orders still waiting in this batch.
+        if order['symbol'] in batch_symbols:
+            print(f"⏭️ Skip #{order['id']}: another order on {order['symbol']} is already in this batch.")
+            continue
+
+        try:
+            status, order_kwargs, margin_to_use = prepare_ready_order(
+                order, remaining_margin, exposed=exposure.get(order['symbol']))
+        except Exception as e:
+            # One bad order must not kill the loop or be silently dropped.
+            print(f"❌ Error preparing order #{order['id']}: {e}")
+            log_message(f"Order #{order['id']} placement error: {e}")
+            continue
+
+        if status == 'ready':
+            # Reserve the margin now so later orders in the batch size against what is left.
+            remaining_margin -= margin_to_use
+            batch.append((order, order_kwargs, margin_to_use))
+            batch_symbols.add(order['symbol'])
+        elif status == 'invalid':
+            mark_order_failed(order['id'])  # terminal; won't be retried forever
+        # 'skip_retry' -> leave as READY_TO_PLACE for the next cycle
+
+    if not batch:
+        return remaining_margin
+
+    # Set leverage explicitly so the orders are not rejected/oversized (skipped when already cached).
+    try:
+        async_trader.run(lambda client: _set_leverage_async(client, sorted(batch_symbols)))
+    except Exception as e:
+        print(f"⚠️ Concurrent set_leverage failed ({e}); setting sequentially.")
+        for symbol in sorted(batch_symbols):
+            trader.set_leverage(symbol, LEVERAGE)
+
+    try:
+        results = trader.place_limit_orders_batch([kwargs for _, kwargs, _ in batch])
+    except Exception as e:
+        print(f"❌ Error placing order batch: {e}")
+        log_message(f"Order batch placement error: {e}")
+        return remaining_margin + sum(margin for _, _, margin in batch)
+
+    for (order, _, margin_to_use), result in zip(batch, results):
+        print(f"Execution Result #{order['id']}: {result.get('retMsg')}")
+        status = classify_order_result(result)
+        if status == 'placed':
+            mark_order_placed(order['id'])
+            continue
+        remaining_margin += margin_to_use  # release the reservation
+        if status == 'invalid':
+            mark_order_failed(order['id'])
+    return remaining_margin
 
 
 if __name__ == '__main__':
@@ -108,6 +231,13 @@ if __name__ == '__main__':
     telegram_thread = threading.Thread(target=poll_telegram_updates, args=(TELEGRAM_BOT_TOKEN,), daemon=True)
     telegram_thread.start()
 
+    if BYBIT_WS_ENABLED:
+        print("Starting Bybit private stream...")
+        trader.start_private_stream()
+
+    # Warm the instrument filters so no order placement waits on a filter fetch.
+    trader.preload_instrument_filters()
+
     try:
         print("Starting the main trading loop. Press Ctrl+C to stop.")
         while True:
@@ -126,31 +256,16 @@ if __name__ == '__main__':
                 # Fetch orders where the database says 'READY_TO_PLACE'
                 ready_orders = get_ready_orders()
 
-                # Snapshot free margin once and decrement as we place, so concurrent
-                # READY orders cannot each size against the full balance.
-                remaining_margin = trader.get_available_balance('USDT')
-
-                for order in ready_orders:
-                    print(f"\n🚀 --- READY TO EXECUTE ORDER --- 🚀")
-                    print(f"ID: {order['id']} | Pair: {order['symbol']} | "
-                          f"Dir: {'LONG' if order['direction'] == 1 else 'SHORT'}")
-                    print(f"Entry: {order['entry_price']} | TP: {order['take_profit']} | SL: {order['stop_loss']}")
-
-                    try:
-                        status, margin_used = place_ready_order(order, remaining_margin)
-                    except Exception as e:
-                        # One bad order must not kill the loop or be silently dropped.
-                        print(f"❌ Error placing order #{order['id']}: {e}")
-                        log_message(f"Order #{order['id']} placement error: {e}")
-                        continue
-
-                    if status == 'placed':
-                        if remaining_margin is not None:
-                            remaining_margin -= margin_used
-                        mark_order_placed(order['id'])
-                    elif status == 'invalid':
-                        mark_order_failed(order['id'])  # terminal; won't be retried forever
-                    # 'skip_retry' -> leave as READY_TO_PLACE for the next cycle
+                if ready_orders:
+                    # One account snapshot per cycle: every position, open order and the free
+                    # margin. Free margin is decremented as we place, so concurrent READY
+                    # orders cannot each size against the full balance.
+                    snapshot = trader.get_account_snapshot()
+                    if snapshot is not None:
+                        remaining_margin = snapshot.free_margin
+                    else:
+                        remaining_margin = trader.get_available_balance('USDT')
+                    place_ready_orders(ready_orders, remaining_margin, snapshot)
             except KeyboardInterrupt:
                 raise
             except Exception as e:
@@ -168,4 +283,6 @@ if __name__ == '__main__':
 
     except KeyboardInterrupt:
         print("\nLoop stopped by user. Exiting.")
+    finally:
+        async_trader.close()
 